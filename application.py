@@ -1,47 +1,158 @@
-from flask import Flask, request, render_template
+import time
+_IMPORT_START = time.perf_counter()
+
+from flask import Flask, request, render_template, jsonify, g, Response
 import os
-import joblib
+import json
+import queue
+import numpy as np
+
+from src.pipelines.prediction_pipeline import (
+    CustomData, CustomBatchData, PredictPipeline, SENSOR_COLUMNS, STAGE_SECONDS, STAGE_HELP
+)
+from src.pipelines.inference_queue import InferenceQueue
+from src.pipelines.stream_detector import StreamDetector
+from src.pipelines.sensor_metadata import get_sensor_metadata
+from src.pipelines.model_registry import model_registry
+from src.pipelines.artifact_store import artifact_store
+from src.pipelines.startup import preload_artifacts
+from src.pipelines.metrics import metrics, BATCH_SIZE_BUCKETS
+from src.logger import logger, configure_logging
+from src.exception import client_message
 
-from src.pipelines.prediction_pipeline import CustomData, PredictPipeline
-from src.logger import logger
+# Serving logs through a background writer thread unless LOG_MODE says otherwise
+configure_logging(mode=os.environ.get("LOG_MODE", "async"))
 
 application = Flask(__name__)
 app = application
 
+# Single-reading form posts are coalesced; /api/v1/predict batches are scored directly.
+# The form sends the 10 water-property sensors, so it uses the fallback model trained on them
+predict_pipeline = PredictPipeline(micro_batching=True, fallback=True)
+batch_predict_pipeline = PredictPipeline()
+fallback_predict_pipeline = PredictPipeline(fallback=True)
+
+MAX_BATCH_ROWS = 10000
+
+# Load the preprocessor, model and sensor metadata before serving. With gunicorn's
+# preload_app this runs once in the master and forked workers share the pages;
+# the registry still reloads any artifact whose file changes afterwards
+if os.environ.get("PRELOAD_ARTIFACTS", "1") != "0":
+    startup_report = preload_artifacts(import_seconds=time.perf_counter() - _IMPORT_START)
+    startup_report.log()
+    metrics.register_collector(startup_report.collect_metrics)
+
+
+def parse_readings(req) -> list:
+    """Read a JSON array (or {"readings": [...]}) or an NDJSON body into a list of readings."""
+    body = req.get_data(as_text=True)
+    if req.mimetype in ("application/x-ndjson", "application/jsonl"):
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
 
-def load_sensor_labels():
-    """Loads labels from calibration_params.pkl, defaults if not available."""
     try:
-        calib_path = os.path.join('artifacts', 'calibration_params.pkl')
-        calibration_params = joblib.load(calib_path)
-        property_names = {
-            "Sensor-1": "pH",
-            "Sensor-2": "Turbidity",
-            "Sensor-3": "Conductivity",
-            "Sensor-4": "Dissolved Oxygen",
-            "Sensor-5": "Chlorine Level",
-            "Sensor-6": "Nitrate",
-            "Sensor-7": "Hardness",
-            "Sensor-8": "Temperature",
-            "Sensor-9": "Iron Content",
-            "Sensor-10": "BOD"
-        }
-        sensor_labels = []
-        for i in range(1, 11):
-            key = f"Sensor-{i}"
-            if key in calibration_params:
-                ymin = calibration_params[key].get("ymin", 0)
-                ymax = calibration_params[key].get("ymax", 0)
-                prop_name = property_names.get(key, key)
-                label = f"{prop_name} ({ymin} - {ymax})"
-                sensor_labels.append(label)
-            else:
-                sensor_labels.append(f"Sensor-{i}")
-        logger.info(f"Sensor labels loaded: {sensor_labels}")
-        return sensor_labels
-    except Exception as e:
-        logger.error(f"Error loading calibration params: {e}")
-        return [f"Sensor-{i}" for i in range(1, 11)]
+        payload = json.loads(body)
+    except json.JSONDecodeError:
+        # Fall back to NDJSON when the content type was not set
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+
+    if isinstance(payload, dict):
+        payload = payload.get("readings", [payload])
+    if not isinstance(payload, list):
+        raise ValueError("Body must be a JSON array of readings or NDJSON")
+    return payload
+
+
+def score_readings(pred_df) -> list:
+    """
+    Range-check and score a batch of readings.
+
+    Range checks run as one mask over the batch; in-range rows go through
+    one preprocessor.transform / model.predict call per model. A reading
+    that lacks most of the served model's features is scored by the
+    fallback model (Sensor-1..10 only) if it carries most of those, and
+    is not scored otherwise. Each reading reports the model used and how
+    many of its features were imputed.
+    """
+    sensor_metadata = get_sensor_metadata()
+    with metrics.timed(STAGE_SECONDS, STAGE_HELP, stage="validate"):
+        # Only Sensor-1..10 have water-property ranges; other selected channels are not range-checked
+        mask = sensor_metadata.out_of_range_mask(pred_df.reindex(columns=list(sensor_metadata.columns)).to_numpy())
+        faulty_rows = mask.any(axis=1)
+        pipelines = {"main": batch_predict_pipeline, "fallback": fallback_predict_pipeline}
+        n_missing = {name: p.missing_features(pred_df) for name, p in pipelines.items()}
+        covered = {name: 1 - n_missing[name] / len(p.feature_names()) >= p.min_feature_coverage
+                   for name, p in pipelines.items()}
+        model_used = np.where(covered["main"], "main", np.where(covered["fallback"], "fallback", ""))
+
+    preds = np.full(len(pred_df), np.nan)
+    for name, pipeline in pipelines.items():
+        rows = ~faulty_rows & (model_used == name)
+        if rows.any():
+            preds[rows] = pipeline.predict(pred_df[rows])
+
+    sensor_names = np.array(sensor_metadata.columns)
+    predictions = []
+    for i in range(len(pred_df)):
+        name = model_used[i] or "main"
+        if faulty_rows[i]:
+            predictions.append({
+                "label": "Faulty Water Sensor (out of range values)",
+                "prediction": None,
+                "out_of_range": sensor_names[mask[i]].tolist(),
+                "model": None,
+                "imputed": int(n_missing[name][i]),
+            })
+        elif not model_used[i]:
+            predictions.append({
+                "label": "Insufficient sensor data",
+                "prediction": None,
+                "out_of_range": [],
+                "model": None,
+                "imputed": int(n_missing[name][i]),
+            })
+        else:
+            predictions.append({
+                "label": "Good Water Sensor" if preds[i] == 1 else "Faulty Water Sensor",
+                "prediction": int(preds[i]),
+                "out_of_range": [],
+                "model": name,
+                "imputed": int(n_missing[name][i]),
+            })
+    return predictions
+
+
+# Readings accepted by /api/v1/ingest are scored in the background
+inference_queue = InferenceQueue(score_readings)
+
+metrics.register_collector(model_registry.collect_metrics)
+metrics.register_collector(inference_queue.collect_metrics)
+
+# Rolling per-unit statistics for /api/v1/stream (state is per worker process)
+stream_detector = StreamDetector(sensor_names=SENSOR_COLUMNS)
+metrics.register_collector(stream_detector.collect_metrics)
+metrics.register_histogram("micro_batch_rows", predict_pipeline.batcher.batch_size_hist,
+                           "Rows per coalesced form-prediction batch")
+metrics.register_histogram("micro_batch_queue_wait_seconds", predict_pipeline.batcher.queue_wait_hist,
+                           "Time form predictions wait to be batched")
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.endpoint or "unmatched"
+    metrics.counter("http_requests_total", "HTTP requests by endpoint and status",
+                    endpoint=endpoint, method=request.method, status=response.status_code).inc()
+    if response.status_code >= 400:
+        metrics.counter("http_request_errors_total", "HTTP responses with a 4xx/5xx status",
+                        endpoint=endpoint).inc()
+    if "request_start" in g:
+        metrics.histogram("http_request_duration_seconds", "End-to-end request latency",
+                          endpoint=endpoint).observe(time.perf_counter() - g.request_start)
+    return response
 
 
 @app.route('/')
@@ -51,7 +162,8 @@ def index():
 
 @app.route('/predictdata', methods=['GET', 'POST'])
 def predict_datapoint():
-    sensor_labels = load_sensor_labels()
+    sensor_metadata = get_sensor_metadata()
+    sensor_labels = list(sensor_metadata.labels)
 
     if request.method == 'GET':
         return render_template('home.html', results=None, error_message=None, sensor_labels=sensor_labels)
@@ -59,43 +171,32 @@ def predict_datapoint():
     else:
         try:
             # 📌 Step 1: Collect inputs
-            inputs = [
-                float(request.form.get('sensor_1')),  # pH
-                float(request.form.get('sensor_2')),  # Turbidity
-                float(request.form.get('sensor_3')),  # Conductivity
-                float(request.form.get('sensor_4')),  # Dissolved Oxygen
-                float(request.form.get('sensor_5')),  # Chlorine Level
-                float(request.form.get('sensor_6')),  # Nitrate
-                float(request.form.get('sensor_7')),  # Hardness
-                float(request.form.get('sensor_8')),  # Temperature
-                float(request.form.get('sensor_9')),  # Iron Content
-                float(request.form.get('sensor_10'))  # BOD
-            ]
-
-            # 📌 Step 2: Define valid ranges (ymin, ymax from calibration)
-            limits = [
-                (0, 14),    # pH
-                (0, 100),   # Turbidity
-                (0, 2000),  # Conductivity
-                (0, 50),    # Dissolved Oxygen
-                (0, 10),    # Chlorine Level
-                (0, 50),    # Nitrate
-                (0, 14),    # Hardness
-                (0, 500),   # Temperature
-                (0, 200),   # Iron Content
-                (0, 10)     # BOD
-            ]
-
-            # 📌 Step 3: Out-of-range check
-            for (val, (mn, mx)) in zip(inputs, limits):
-                if val < mn or val > mx:
+            with metrics.timed(STAGE_SECONDS, STAGE_HELP, stage="parse"):
+                inputs = [
+                    float(request.form.get('sensor_1')),  # pH
+                    float(request.form.get('sensor_2')),  # Turbidity
+                    float(request.form.get('sensor_3')),  # Conductivity
+                    float(request.form.get('sensor_4')),  # Dissolved Oxygen
+                    float(request.form.get('sensor_5')),  # Chlorine Level
+                    float(request.form.get('sensor_6')),  # Nitrate
+                    float(request.form.get('sensor_7')),  # Hardness
+                    float(request.form.get('sensor_8')),  # Temperature
+                    float(request.form.get('sensor_9')),  # Iron Content
+                    float(request.form.get('sensor_10'))  # BOD
+                ]
+
+            # 📌 Step 2/3: Out-of-range check against the calibrated ranges
+            with metrics.timed(STAGE_SECONDS, STAGE_HELP, stage="validate"):
+                mask = sensor_metadata.out_of_range_mask(np.array([inputs]))[0]
+            if mask.any():
+                for val, mn, mx in zip(np.array(inputs)[mask], sensor_metadata.ymin[mask], sensor_metadata.ymax[mask]):
                     logger.warning(f"Out-of-range value detected: {val} not in ({mn}, {mx})")
-                    return render_template(
-                        'home.html',
-                        results="Faulty Water Sensor (out of range values)",
-                        error_message=None,
-                        sensor_labels=sensor_labels
-                    )
+                return render_template(
+                    'home.html',
+                    results="Faulty Water Sensor (out of range values)",
+                    error_message=None,
+                    sensor_labels=sensor_labels
+                )
 
             # 📌 Step 4: Prepare for prediction if all OK
             data = CustomData(
@@ -112,20 +213,177 @@ def predict_datapoint():
             )
 
             pred_df = data.get_data_as_data_frame()
-            pred_df.columns = [f"Sensor-{i}" for i in range(1, 11)]
-            logger.info(f"Prediction input DataFrame:\n{pred_df}")
+            pred_df.columns = SENSOR_COLUMNS
+            logger.debug("Prediction input DataFrame:\n%s", pred_df)
+
+            # 📌 Step 5: Run prediction pipeline (the fallback model, when one was published)
+            n_missing = int(predict_pipeline.missing_features(pred_df)[0])
+            n_features = len(predict_pipeline.feature_names())
+            if 1 - n_missing / n_features < predict_pipeline.min_feature_coverage:
+                # No fallback model: the served model needs wafer channels the form does not collect
+                prediction_text = f"Insufficient sensor data ({n_missing} of {n_features} model features missing)"
+                return render_template('home.html', results=prediction_text, error_message=None, sensor_labels=sensor_labels)
 
-            # 📌 Step 5: Run prediction pipeline
-            predict_pipeline = PredictPipeline()
             results = predict_pipeline.predict(pred_df)
 
             prediction_text = "Good Water Sensor" if results[0] == 1 else "Faulty Water Sensor"
+            if n_missing:
+                prediction_text += f" ({n_missing} of {n_features} model features imputed)"
 
             return render_template('home.html', results=prediction_text, error_message=None, sensor_labels=sensor_labels)
 
         except Exception as e:
+            metrics.counter("inference_errors_total", "Requests that failed during prediction",
+                            endpoint="predict_datapoint").inc()
             logger.error(f"Error during prediction: {e}")
-            return render_template('home.html', results=None, error_message=str(e), sensor_labels=sensor_labels)
+            return render_template('home.html', results=None, error_message=client_message(e), sensor_labels=sensor_labels)
+
+
+@app.route('/api/v1/predict', methods=['POST'])
+def predict_batch():
+    """Score a batch of readings sent as a JSON array or NDJSON."""
+    try:
+        with metrics.timed(STAGE_SECONDS, STAGE_HELP, stage="parse"):
+            readings = parse_readings(request)
+            if len(readings) > MAX_BATCH_ROWS:
+                return jsonify(error=f"Batch too large ({len(readings)} > {MAX_BATCH_ROWS} rows)"), 413
+            pred_df = CustomBatchData(readings, batch_predict_pipeline.feature_names()).get_data_as_data_frame()
+    except Exception as e:
+        logger.warning(f"Rejected batch request: {e}")
+        return jsonify(error=client_message(e)), 400
+
+    try:
+        metrics.histogram("request_batch_rows", "Readings per API request",
+                          buckets=BATCH_SIZE_BUCKETS, endpoint="predict_batch").observe(len(pred_df))
+        predictions = score_readings(pred_df)
+        n_unscored = sum(p["prediction"] is None for p in predictions)
+        logger.info(f"Scored batch of {len(pred_df)} readings ({n_unscored} out of range or insufficient)")
+        return jsonify(count=len(predictions), predictions=predictions)
+
+    except Exception as e:
+        metrics.counter("inference_errors_total", "Requests that failed during prediction",
+                        endpoint="predict_batch").inc()
+        logger.error(f"Error during batch prediction: {e}")
+        return jsonify(error=client_message(e)), 500
+
+
+@app.route('/api/v1/features', methods=['GET'])
+def features():
+    """Features the served model takes as input, with their importance from feature selection."""
+    names = batch_predict_pipeline.feature_names()
+    importance = {}
+    selected_features_path = artifact_store.resolve("selected_features.json")
+    if os.path.exists(selected_features_path):
+        with open(selected_features_path) as file_obj:
+            importance = json.load(file_obj).get("importance", {})
+    return jsonify(version=artifact_store.current_version(), count=len(names), features=names,
+                   importance={name: importance.get(name) for name in names},
+                   validated=[name for name in get_sensor_metadata().columns if name in names],
+                   fallback_features=fallback_predict_pipeline.feature_names(),
+                   min_feature_coverage=batch_predict_pipeline.min_feature_coverage)
+
+
+@app.route('/api/v1/ingest', methods=['POST'])
+def ingest():
+    """
+    Accept readings for background scoring and return 202 with a job id.
+
+    Poll GET /api/v1/results/<job_id>, or pass ?callback_url=... to have the
+    result POSTed back. Answers 429 with Retry-After when the queue is full.
+    """
+    try:
+        with metrics.timed(STAGE_SECONDS, STAGE_HELP, stage="parse"):
+            readings = parse_readings(request)
+            if len(readings) > MAX_BATCH_ROWS:
+                return jsonify(error=f"Batch too large ({len(readings)} > {MAX_BATCH_ROWS} rows)"), 413
+            pred_df = CustomBatchData(readings, batch_predict_pipeline.feature_names()).get_data_as_data_frame()
+        callback_url = request.args.get('callback_url')
+        if callback_url:
+            inference_queue.validate_callback_url(callback_url)
+    except Exception as e:
+        logger.warning(f"Rejected ingest request: {e}")
+        return jsonify(error=client_message(e)), 400
+
+    try:
+        metrics.histogram("request_batch_rows", "Readings per API request",
+                          buckets=BATCH_SIZE_BUCKETS, endpoint="ingest").observe(len(pred_df))
+        job_id = inference_queue.submit(pred_df, callback_url=callback_url)
+    except queue.Full:
+        retry_after = inference_queue.config.retry_after_s
+        logger.warning(f"Ingest queue full, rejected {len(pred_df)} readings")
+        response = jsonify(error="Ingest queue is full, retry later", retry_after=retry_after)
+        response.headers['Retry-After'] = str(retry_after)
+        return response, 429
+
+    status_url = f"/api/v1/results/{job_id}"
+    response = jsonify(job_id=job_id, status="queued", count=len(pred_df), status_url=status_url)
+    response.headers['Location'] = status_url
+    return response, 202
+
+
+@app.route('/api/v1/stream', methods=['POST'])
+def stream():
+    """
+    Score readings that carry a "unit_id" and run them through the streaming detector.
+
+    Alongside the model predictions, returns the spike/stuck/drift events the
+    readings raised against each unit's sliding window.
+    """
+    try:
+        with metrics.timed(STAGE_SECONDS, STAGE_HELP, stage="parse"):
+            readings = parse_readings(request)
+            if len(readings) > MAX_BATCH_ROWS:
+                return jsonify(error=f"Batch too large ({len(readings)} > {MAX_BATCH_ROWS} rows)"), 413
+            if not all(isinstance(r, dict) and "unit_id" in r for r in readings):
+                raise ValueError('Each reading must be an object with a "unit_id"')
+            unit_ids = [str(r["unit_id"]) for r in readings]
+            pred_df = CustomBatchData(
+                [{k: v for k, v in r.items() if k != "unit_id"} for r in readings],
+                batch_predict_pipeline.feature_names()
+            ).get_data_as_data_frame()
+    except Exception as e:
+        logger.warning(f"Rejected stream request: {e}")
+        return jsonify(error=client_message(e)), 400
+
+    try:
+        metrics.histogram("request_batch_rows", "Readings per API request",
+                          buckets=BATCH_SIZE_BUCKETS, endpoint="stream").observe(len(pred_df))
+        with metrics.timed(STAGE_SECONDS, STAGE_HELP, stage="stream_detect"):
+            events = stream_detector.update_batch(unit_ids, pred_df.reindex(columns=SENSOR_COLUMNS).to_numpy())
+        predictions = score_readings(pred_df)
+        for unit_id, prediction in zip(unit_ids, predictions):
+            prediction["unit_id"] = unit_id
+        if events:
+            logger.info(f"Streaming detector raised {len(events)} events on {len(pred_df)} readings")
+        return jsonify(count=len(predictions), predictions=predictions, events=[e.to_dict() for e in events])
+
+    except Exception as e:
+        metrics.counter("inference_errors_total", "Requests that failed during prediction",
+                        endpoint="stream").inc()
+        logger.error(f"Error during stream scoring: {e}")
+        return jsonify(error=client_message(e)), 500
+
+
+@app.route('/api/v1/results/<job_id>', methods=['GET'])
+def ingest_result(job_id):
+    """Status of an ingest job and, once done, its predictions."""
+    job = inference_queue.get_result(job_id)
+    if job is None:
+        return jsonify(error=f"Unknown job {job_id}"), 404
+    return jsonify(
+        job_id=job_id,
+        status=job["status"],
+        count=job["n_rows"],
+        predictions=job["result"],
+        error=job["error"],
+        callback_status=job["callback_status"],
+    )
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus scrape endpoint for this worker process."""
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,74 @@
+"""
+Imputation latency of IndexedKNNImputer vs sklearn's KNNImputer as the
+training set grows.
+
+    python -m benchmarks.bench_knn_imputer --sizes 1000 10000 100000 1000000
+
+Training rows have a few missing cells; each query row misses one sensor.
+"cold" includes building the spatial indexes for the query patterns,
+"warm" is the steady state once they are cached.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from sklearn.impute import KNNImputer
+
+from src.pipelines.knn_imputer import IndexedKNNImputer
+
+
+def make_data(n_rows: int, n_features: int, missing_rate: float, n_queries: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+    X_fit = rng.normal(size=(n_rows, n_features))
+    X_fit[rng.random(X_fit.shape) < missing_rate] = np.nan
+
+    X_query = rng.normal(size=(n_queries, n_features))
+    X_query[np.arange(n_queries), rng.integers(0, n_features, n_queries)] = np.nan
+    return X_fit, X_query
+
+
+def time_transform(imputer, X_query, repeats: int) -> float:
+    """Median seconds per single-row transform"""
+    timings = []
+    for _ in range(repeats):
+        for row in X_query:
+            start = time.perf_counter()
+            imputer.transform(row[None, :])
+            timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def run(sizes, n_features=10, missing_rate=0.02, n_queries=50, repeats=3, max_brute_rows=100_000):
+    results = []
+    for n_rows in sizes:
+        X_fit, X_query = make_data(n_rows, n_features, missing_rate, n_queries)
+        row = {"n_rows": n_rows, "n_features": n_features}
+
+        indexed = IndexedKNNImputer(n_neighbors=3).fit(X_fit)
+        start = time.perf_counter()
+        indexed_out = indexed.transform(X_query)
+        row["indexed_cold_batch_s"] = time.perf_counter() - start
+        row["indexed_warm_row_s"] = time_transform(indexed, X_query, repeats)
+
+        if n_rows <= max_brute_rows:
+            brute = KNNImputer(n_neighbors=3).fit(X_fit)
+            row["sklearn_row_s"] = time_transform(brute, X_query, 1)
+            row["speedup"] = row["sklearn_row_s"] / row["indexed_warm_row_s"]
+            row["max_abs_diff"] = float(np.nanmax(np.abs(brute.transform(X_query) - indexed_out)))
+
+        results.append(row)
+        print(json.dumps(row))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--features", type=int, default=10)
+    parser.add_argument("--missing-rate", type=float, default=0.02)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--max-brute-rows", type=int, default=100_000,
+                        help="skip sklearn's brute-force imputer above this training size")
+    args = parser.parse_args()
+    run(args.sizes, args.features, args.missing_rate, args.queries, max_brute_rows=args.max_brute_rows)
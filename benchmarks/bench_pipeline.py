@@ -0,0 +1,153 @@
+"""
+End-to-end benchmarks of the training and serving code paths on synthetic data.
+
+    python -m benchmarks.bench_pipeline --rows 10000 --sensors 590 --output bench.json
+    python -m benchmarks.bench_pipeline --rows 10000 --baseline bench.json --threshold 0.2
+
+Stages, run in order inside a temporary workspace:
+  ingestion       DataIngestion.initiate_data_ingestion on a CSV from SyntheticDataGenerator
+  calibration     DataCalibration.initiate_calibration on the train split
+  transformation  DataTransformation.initiate_data_transformation
+  model/<name>    grid search of each ModelTrainer candidate (one process)
+  predict/*       PredictPipeline.predict on one row and on a batch
+  flask/*         /predictdata and /api/v1/predict through Flask's test client
+
+Results are written as JSON; with --baseline the run exits non-zero when any
+median time regressed by more than --threshold.
+"""
+import os
+import sys
+import argparse
+
+from sklearn.base import clone
+
+from benchmarks.common import (
+    make_sensor_frame, make_serving_readings, measure, isolated_workspace, run_metadata, save_results, report_regressions
+)
+
+STAGES = ("ingestion", "calibration", "transformation", "models", "predict", "flask")
+
+
+def bench_training(results: dict, repeats: int, stages: set):
+    from src.components.data_ingestion import DataIngestion
+    from src.components.data_calibration import DataCalibration
+    from src.components.data_transformation import DataTransformation
+    from src.components.model_trainer import ModelTrainer
+    from src.utils import evaluate_models
+
+    ingestion = DataIngestion()
+    ingestion.ingestion_config.source_data_path = "source.csv"
+    paths = {}
+
+    def ingest():
+        paths["train"], paths["test"] = ingestion.initiate_data_ingestion()
+
+    def calibrate():
+        DataCalibration().initiate_calibration([paths["train"]])
+
+    arrays = {}
+
+    def transform():
+        arrays["train"], arrays["test"], _ = DataTransformation().initiate_data_transformation(
+            paths["train"], paths["test"]
+        )
+
+    # Later stages need the artifacts of earlier ones, so those always run once
+    for name, fn in (("ingestion", ingest), ("calibration", calibrate), ("transformation", transform)):
+        if name in stages:
+            results[name] = measure(fn, repeats=repeats, warmup=0)
+        else:
+            fn()
+
+    train_arr, test_arr = arrays["train"], arrays["test"]
+    X_train, y_train = train_arr[:, :-1], train_arr[:, -1]
+    X_test, y_test = test_arr[:, :-1], test_arr[:, -1]
+
+    trainer = ModelTrainer()
+    models, params = trainer.get_models_and_params()
+    if "models" in stages:
+        for name, model in models.items():
+            results[f"model/{name}"] = measure(
+                lambda: evaluate_models(X_train, y_train, X_test, y_test,
+                                        {name: clone(model)}, {name: params[name]}, n_jobs=1, cv_n_jobs=1),
+                repeats=1, warmup=0, rows=len(X_train),
+            )
+
+    # Serving stages need a model.pkl
+    trainer.model_trainer_config.n_jobs = 1
+    trainer.initiate_model_trainer(X_train, y_train, X_test, y_test)
+
+
+def bench_serving(results: dict, repeats: int, batch_rows: int, stages: set):
+    from src.pipelines.prediction_pipeline import PredictPipeline
+
+    batch = make_serving_readings(batch_rows, seed=1)
+    single = batch.iloc[[0]]
+
+    if "predict" in stages:
+        pipeline = PredictPipeline()
+        sparse_batch = make_serving_readings(batch_rows, missing_rate=0.02, seed=2)
+        results["predict/single_row"] = measure(lambda: pipeline.predict(single), repeats=repeats * 20, rows=1)
+        results["predict/batch"] = measure(lambda: pipeline.predict(batch), repeats=repeats, rows=batch_rows)
+        # 2% missing cells: exercises the KNN imputer on the serving path
+        results["predict/batch_with_missing"] = measure(
+            lambda: pipeline.predict(sparse_batch), repeats=repeats, rows=batch_rows
+        )
+
+    if "flask" in stages:
+        import application
+
+        client = application.app.test_client()
+        row = single.iloc[0]
+        form = {f"sensor_{i}": str(row[f"Sensor-{i}"]) for i in range(1, 11)}
+        readings = batch.to_numpy().tolist()
+
+        def post_form():
+            response = client.post("/predictdata", data=form)
+            assert response.status_code == 200 and b"out of range" not in response.data
+
+        def post_batch():
+            response = client.post("/api/v1/predict", json=readings)
+            assert response.status_code == 200, response.get_data(as_text=True)
+
+        results["flask/predictdata"] = measure(post_form, repeats=repeats * 20, rows=1)
+        results["flask/api_v1_predict"] = measure(post_batch, repeats=repeats, rows=batch_rows)
+
+
+def run(rows: int, sensors: int, repeats: int = 3, batch_rows: int = 1000, stages=STAGES,
+        fault_rate: float = None) -> dict:
+    stages = set(stages)
+    results = {}
+    with isolated_workspace():
+        make_sensor_frame(rows, sensors, fault_rate=fault_rate).to_csv("source.csv", index=False)
+        bench_training(results, repeats, stages)
+        bench_serving(results, repeats, batch_rows, stages)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--sensors", type=int, default=590, help="number of Sensor-i columns (10 to 590)")
+    parser.add_argument("--fault-rate", type=float, default=None, help="share of faulty wafers in the data")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--batch-rows", type=int, default=1000, help="rows per batch-prediction call")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="earlier JSON results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, 0.2 = 20%%")
+    args = parser.parse_args()
+    if not 10 <= args.sensors <= 590:
+        parser.error("--sensors must be between 10 and 590")
+
+    # Quiet, synchronous logging so log I/O does not skew the timings
+    os.environ.setdefault("LOG_MODE", "sync")
+    from src.logger import configure_logging
+    configure_logging(mode="sync", level="WARNING", log_file="")
+
+    results = run(args.rows, args.sensors, args.repeats, args.batch_rows, args.stages, args.fault_rate)
+    meta = run_metadata(rows=args.rows, sensors=args.sensors, repeats=args.repeats,
+                        batch_rows=args.batch_rows, stages=args.stages, fault_rate=args.fault_rate)
+    doc = save_results(results, meta, args.output)
+    if args.baseline:
+        sys.exit(report_regressions(args.baseline, doc, args.threshold))
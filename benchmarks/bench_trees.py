@@ -0,0 +1,80 @@
+"""
+Latency of TreeEnsembleEvaluator against model.predict for the tree models ModelTrainer can pick.
+
+    python -m benchmarks.bench_trees --n-estimators 32 --batch-rows 10000 --output trees.json
+    python -m benchmarks.bench_trees --baseline trees.json --threshold 0.2
+
+Each model is fitted on synthetic wafer features, then timed on one row and
+on a batch. Predictions of the evaluator are checked to be identical to
+model.predict before anything is timed.
+"""
+import os
+import sys
+import argparse
+
+import numpy as np
+
+from benchmarks.common import make_sensor_frame, measure, run_metadata, save_results, report_regressions
+
+MODELS = ("random_forest", "gradient_boosting", "adaboost", "decision_tree")
+
+
+def make_models(n_estimators: int) -> dict:
+    from sklearn.ensemble import AdaBoostClassifier, GradientBoostingClassifier, RandomForestClassifier
+    from sklearn.tree import DecisionTreeClassifier
+
+    return {
+        "random_forest": RandomForestClassifier(n_estimators=n_estimators, random_state=42),
+        "gradient_boosting": GradientBoostingClassifier(n_estimators=n_estimators, random_state=42),
+        "adaboost": AdaBoostClassifier(n_estimators=n_estimators, random_state=42),
+        "decision_tree": DecisionTreeClassifier(random_state=42),
+    }
+
+
+def run(rows: int, batch_rows: int, n_estimators: int, repeats: int = 5, models=MODELS) -> dict:
+    from src.pipelines.tree_evaluator import build_tree_evaluator
+
+    frame = make_sensor_frame(rows + batch_rows, n_sensors=10)
+    features = frame.filter(like="Sensor-")
+    X = features.fillna(features.median()).to_numpy()
+    y = frame["Good/Bad"].to_numpy()
+    X_train, y_train, X_batch = X[:rows], y[:rows], X[rows:]
+    single = X_batch[:1]
+
+    results = {}
+    candidates = make_models(n_estimators)
+    for name in models:
+        model = candidates[name].fit(X_train, y_train)
+        evaluator = build_tree_evaluator(model)
+        if not np.array_equal(evaluator.predict(X_batch), model.predict(X_batch)):
+            raise AssertionError(f"{name}: evaluator predictions differ from model.predict")
+
+        results[f"trees/{name}/sklearn_single_row"] = measure(lambda: model.predict(single), repeats * 20, rows=1)
+        results[f"trees/{name}/evaluator_single_row"] = measure(lambda: evaluator.predict(single), repeats * 20, rows=1)
+        results[f"trees/{name}/sklearn_batch"] = measure(lambda: model.predict(X_batch), repeats, rows=batch_rows)
+        results[f"trees/{name}/evaluator_batch"] = measure(lambda: evaluator.predict(X_batch), repeats, rows=batch_rows)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000, help="training rows")
+    parser.add_argument("--batch-rows", type=int, default=10_000, help="rows in the batch measurement")
+    parser.add_argument("--n-estimators", type=int, default=32)
+    parser.add_argument("--models", nargs="+", choices=MODELS, default=list(MODELS))
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+    parser.add_argument("--baseline", help="earlier JSON results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, 0.2 = 20%%")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOG_MODE", "sync")
+    from src.logger import configure_logging
+    configure_logging(mode="sync", level="WARNING", log_file="")
+
+    results = run(args.rows, args.batch_rows, args.n_estimators, args.repeats, args.models)
+    meta = run_metadata(rows=args.rows, batch_rows=args.batch_rows, n_estimators=args.n_estimators,
+                        repeats=args.repeats)
+    doc = save_results(results, meta, args.output)
+    if args.baseline:
+        sys.exit(report_regressions(args.baseline, doc, args.threshold))
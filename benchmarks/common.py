@@ -0,0 +1,157 @@
+"""Shared helpers for the benchmark scripts: synthetic data, timing, JSON results."""
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import subprocess
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SOURCE_DATA = REPO_ROOT / "Water_Sensor_Prediction.csv"
+
+
+def make_sensor_frame(n_rows: int, n_sensors: int = 590, seed: int = 42,
+                      source_path: Path = SOURCE_DATA, **generator_options) -> pd.DataFrame:
+    """
+    Synthetic wafer table shaped like Water_Sensor_Prediction.csv:
+    'Unnamed: 0' wafer ids, Sensor-1..Sensor-n and a 'Good/Bad' label in {-1, 1}.
+
+    Rows come from SyntheticDataGenerator fitted on the first n_sensors
+    channels of the source file; generator_options (fault_rate, drift, ...)
+    are passed to its config.
+    """
+    from src.components.synthetic_data import SyntheticDataConfig, SyntheticDataGenerator
+
+    source = pd.read_csv(source_path)
+    sensor_cols = [c for c in source.columns if c.startswith("Sensor-")]
+    if n_sensors > len(sensor_cols):
+        raise ValueError(f"The source data has {len(sensor_cols)} sensors, asked for {n_sensors}")
+    config = SyntheticDataConfig(source_data_path=str(source_path), seed=seed, **generator_options)
+    source = source[[config.id_column] + sensor_cols[:n_sensors] + [config.target_column]]
+    return SyntheticDataGenerator(config).fit(source).generate_chunk(n_rows)
+
+
+def make_serving_readings(n_rows: int, missing_rate: float = 0.0, seed: int = 0) -> pd.DataFrame:
+    """Sensor-1..10 readings drawn inside the validated water-property ranges, so requests reach the model"""
+    from src.pipelines.water_properties import WATER_PROPERTY_RANGES
+
+    rng = np.random.default_rng(seed)
+    low, high = np.array(list(WATER_PROPERTY_RANGES.values())).T
+    values = rng.uniform(low, high, size=(n_rows, len(low)))
+    values[rng.random(values.shape) < missing_rate] = np.nan
+    return pd.DataFrame(values, columns=list(WATER_PROPERTY_RANGES))
+
+
+def measure(fn, repeats: int = 5, warmup: int = 1, rows: int = None) -> dict:
+    """Run fn warmup + repeats times; wall-time summary in seconds (plus rows/s when rows is given)"""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings = np.asarray(timings)
+    result = {
+        "median_s": float(np.median(timings)),
+        "min_s": float(timings.min()),
+        "mean_s": float(timings.mean()),
+        "repeats": repeats,
+    }
+    if rows:
+        result["rows"] = rows
+        result["rows_per_s"] = rows / result["median_s"] if result["median_s"] else None
+    return result
+
+
+@contextmanager
+def isolated_workspace():
+    """Run inside a temporary directory so benchmark artifacts never touch artifacts/ in the repo"""
+    from src.pipelines.model_registry import model_registry
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="water_sensor_bench_") as workdir:
+        os.chdir(workdir)
+        os.makedirs("artifacts", exist_ok=True)
+        try:
+            yield Path(workdir)
+        finally:
+            os.chdir(cwd)
+            model_registry.invalidate()
+
+
+def run_metadata(**extra) -> dict:
+    import sklearn
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        **extra,
+    }
+
+
+def save_results(results: dict, meta: dict, output: str = None) -> dict:
+    """Write {"meta", "results"} as JSON to output (or stdout)"""
+    doc = {"meta": meta, "results": results}
+    text = json.dumps(doc, indent=2)
+    if output:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as file_obj:
+            file_obj.write(text)
+    else:
+        print(text)
+    return doc
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = 0.2) -> list:
+    """
+    Benchmarks whose median time grew by more than threshold (0.2 = 20%) against baseline.
+
+    Both arguments are documents written by save_results; benchmarks present
+    in only one of them are ignored.
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base or not base.get("median_s"):
+            continue
+        ratio = result["median_s"] / base["median_s"]
+        if ratio > 1 + threshold:
+            regressions.append({
+                "benchmark": name,
+                "baseline_s": base["median_s"],
+                "current_s": result["median_s"],
+                "ratio": ratio,
+            })
+    return regressions
+
+
+def report_regressions(baseline_path: str, doc: dict, threshold: float) -> int:
+    """Print regressions against the baseline file; returns a process exit code"""
+    with open(baseline_path) as file_obj:
+        baseline = json.load(file_obj)
+    regressions = compare_results(baseline, doc, threshold)
+    for r in regressions:
+        print(f"REGRESSION {r['benchmark']}: {r['baseline_s']:.6f}s -> {r['current_s']:.6f}s "
+              f"({r['ratio']:.2f}x)", file=sys.stderr)
+    if not regressions:
+        print(f"No regressions above {threshold:.0%} against {baseline_path}", file=sys.stderr)
+    return 1 if regressions else 0
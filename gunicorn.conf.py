@@ -0,0 +1,31 @@
+"""
+gunicorn settings for the web app:  gunicorn -c gunicorn.conf.py application:app
+
+preload_app imports application.py (and so loads every artifact, see
+src/pipelines/startup.py) once in the master; workers are forked from it
+and share those pages copy-on-write instead of each unpickling the model.
+"""
+import gc
+import os
+
+# Workers are forked from the master, so a log file opened there would be shared
+# by all of them: log to stdout (gunicorn's own output) unless LOG_FILE is set.
+# With LOG_FILE set, rotate it externally (logrotate); workers only append
+os.environ.setdefault("LOG_FILE", "")
+os.environ.setdefault("LOG_ROTATION", "external")
+
+# bind and workers keep gunicorn's defaults ($PORT, $WEB_CONCURRENCY)
+worker_class = "gthread"
+threads = 8
+preload_app = True
+
+
+def when_ready(server):
+    # Objects loaded in the master are never collected; freezing them keeps the
+    # cyclic GC in the workers from touching (and so copying) their pages
+    gc.freeze()
+    server.log.info(f"Preloaded app, {gc.get_freeze_count()} objects frozen before forking workers")
+
+
+def post_fork(server, worker):
+    server.log.info(f"Worker {worker.pid} forked with artifacts already loaded")
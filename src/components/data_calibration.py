@@ -0,0 +1,234 @@
+import os
+import sys
+import warnings
+import joblib
+from joblib import Parallel, delayed
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Optional
+
+from src.exception import CustomException
+from src.logger import logger
+from src.pipelines.calibration import WATER_PROPERTY_RANGES, build_calibration_params
+from src.pipelines.model_registry import file_sha256
+
+
+@dataclass
+class DataCalibrationConfig:
+    """Configuration for the calibration statistics stage"""
+    calibration_params_path: str = os.path.join('artifacts', "calibration_params.pkl")
+    calibration_stats_path: str = os.path.join('artifacts', "calibration_stats.pkl")
+    quantiles: tuple = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+    reservoir_size: int = 10_000     # rows kept for quantiles; exact below this many rows
+    chunksize: int = 50_000
+    n_jobs: int = 1                  # files processed in parallel, then merged
+
+
+class CalibrationStats:
+    """
+    Mergeable per-channel statistics: count, NaN count, min, max, sum, sum of
+    squares and a uniform row reservoir for quantiles.
+
+    update() consumes one chunk with vectorized NumPy ops; merge() combines
+    partial results from other files or workers, so recalibrating on new
+    data never needs a rescan of old data.
+    """
+
+    def __init__(self, columns: list, reservoir_size: int = 10_000, seed: int = 42):
+        self.columns = list(columns)
+        self.reservoir_size = reservoir_size
+        n = len(self.columns)
+        self.count = 0
+        self.nan_count = np.zeros(n, dtype=np.int64)
+        self.min = np.full(n, np.nan)
+        self.max = np.full(n, np.nan)
+        self.sum = np.zeros(n)
+        self.sumsq = np.zeros(n)
+        self.reservoir = np.empty((0, n))
+        self.sources = {}            # content hash -> file path, to skip files already counted
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values: np.ndarray):
+        """Add a chunk of rows, shape (n_rows, n_columns) in self.columns order"""
+        values = np.asarray(values, dtype=float)
+        if values.size == 0:
+            return
+        nan_mask = np.isnan(values)
+        self.nan_count += nan_mask.sum(axis=0)
+        with np.errstate(invalid="ignore"), warnings.catch_warnings():
+            # All-NaN columns (e.g. channels missing from a batch) keep their previous min/max
+            warnings.simplefilter("ignore", RuntimeWarning)
+            self.min = np.fmin(self.min, np.nanmin(values, axis=0))
+            self.max = np.fmax(self.max, np.nanmax(values, axis=0))
+        filled = np.where(nan_mask, 0.0, values)
+        self.sum += filled.sum(axis=0)
+        self.sumsq += (filled * filled).sum(axis=0)
+
+        # Reservoir sampling (algorithm R), vectorized over the chunk
+        free = max(self.reservoir_size - len(self.reservoir), 0)
+        if free:
+            self.reservoir = np.vstack([self.reservoir, values[:free]])
+        rest = values[free:]
+        if len(rest):
+            seen = self.count + free + np.arange(len(rest))
+            slots = (self._rng.random(len(rest)) * (seen + 1)).astype(np.int64)
+            keep = slots < self.reservoir_size
+            self.reservoir[slots[keep]] = rest[keep]
+        self.count += len(values)
+
+    def merge(self, other: "CalibrationStats") -> "CalibrationStats":
+        """Fold another partial result (same columns) into this one"""
+        if other.columns != self.columns:
+            raise ValueError("Cannot merge calibration stats over different columns")
+        total = self.count + other.count
+        if total and len(self.reservoir) + len(other.reservoir) > self.reservoir_size:
+            # Keep each side in proportion to the rows it represents
+            take_self = min(len(self.reservoir), int(round(self.reservoir_size * self.count / total)))
+            take_other = min(len(other.reservoir), self.reservoir_size - take_self)
+            self.reservoir = np.vstack([
+                self.reservoir[self._rng.choice(len(self.reservoir), take_self, replace=False)],
+                other.reservoir[self._rng.choice(len(other.reservoir), take_other, replace=False)],
+            ])
+        else:
+            self.reservoir = np.vstack([self.reservoir, other.reservoir])
+
+        self.count = total
+        self.nan_count += other.nan_count
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        self.sum += other.sum
+        self.sumsq += other.sumsq
+        self.sources.update(other.sources)
+        return self
+
+    def quantiles(self, qs) -> np.ndarray:
+        """Quantiles per column, shape (len(qs), n_columns)"""
+        if not len(self.reservoir):
+            return np.full((len(qs), len(self.columns)), np.nan)
+        with np.errstate(invalid="ignore"):
+            return np.nanquantile(self.reservoir, qs, axis=0)
+
+    def mean(self) -> np.ndarray:
+        present = self.count - self.nan_count
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.sum / present
+
+    def std(self) -> np.ndarray:
+        present = self.count - self.nan_count
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = self.sumsq / present - self.mean() ** 2
+        return np.sqrt(np.clip(var, 0.0, None))
+
+    def to_calibration_params(self, qs) -> dict:
+        """calibration_params.pkl layout (xmin/xmax/ymin/ymax) plus nan_count and quantiles"""
+        params = build_calibration_params(
+            dict(zip(self.columns, self.min.tolist())), dict(zip(self.columns, self.max.tolist()))
+        )
+        quantiles = self.quantiles(qs)
+        for j, ch in enumerate(self.columns):
+            if ch in params:
+                params[ch]["count"] = int(self.count)
+                params[ch]["nan_count"] = int(self.nan_count[j])
+                params[ch]["quantiles"] = dict(zip(qs, quantiles[:, j].tolist()))
+        return params
+
+
+def sensor_columns(file_path: str) -> list:
+    """Sensor-* column names of a CSV/Parquet file, read from its header only"""
+    if file_path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        names = pq.read_schema(file_path).names
+    else:
+        names = pd.read_csv(file_path, nrows=0).columns
+    return [c for c in names if str(c).startswith("Sensor-")]
+
+
+def calibration_columns(source_paths: list) -> list:
+    """The calibrated channels followed by every other Sensor-* channel of the files"""
+    columns = list(WATER_PROPERTY_RANGES)
+    for path in source_paths:
+        columns += sensor_columns(path)
+    return list(dict.fromkeys(columns))
+
+
+def compute_file_stats(file_path: str, columns: list, chunksize: int = 50_000,
+                       reservoir_size: int = 10_000) -> CalibrationStats:
+    """Single streaming pass over one CSV/Parquet file, reading only the given columns (absent ones count as NaN)"""
+    stats = CalibrationStats(columns, reservoir_size)
+    if file_path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(file_path)
+        present = [c for c in columns if c in parquet_file.schema_arrow.names]
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=present):
+            stats.update(batch.to_pandas().reindex(columns=columns).to_numpy(dtype=float))
+    else:
+        for chunk in pd.read_csv(file_path, chunksize=chunksize, usecols=lambda c: c in columns):
+            stats.update(chunk.reindex(columns=columns).to_numpy(dtype=float))
+    return stats
+
+
+class DataCalibration:
+    """Calibration statistics stage: builds calibration_params.pkl from the train data"""
+
+    def __init__(self):
+        self.calibration_config = DataCalibrationConfig()
+
+    def load_stats(self) -> Optional[CalibrationStats]:
+        path = self.calibration_config.calibration_stats_path
+        return joblib.load(path) if os.path.exists(path) else None
+
+    def save(self, stats: CalibrationStats) -> dict:
+        """Persist the stats (for later merges) and the derived calibration params"""
+        config = self.calibration_config
+        params = stats.to_calibration_params(config.quantiles)
+        os.makedirs(os.path.dirname(config.calibration_params_path), exist_ok=True)
+        joblib.dump(stats, config.calibration_stats_path)
+        joblib.dump(params, config.calibration_params_path)
+        logger.info(f"Saved calibration params for {stats.count} rows to {config.calibration_params_path}")
+        return params
+
+    def initiate_calibration(self, source_paths: list, incremental: bool = False) -> dict:
+        """
+        Compute calibration statistics for all channels in one pass per file
+
+        Args:
+            source_paths: train-data files (CSV or Parquet)
+            incremental: merge into the saved stats and skip files already counted,
+                         instead of starting from scratch
+
+        Returns:
+            calibration params dict, as saved to calibration_params.pkl
+        """
+        logger.info("Entered the data calibration method or component")
+
+        try:
+            config = self.calibration_config
+
+            stats = self.load_stats() if incremental else None
+            if stats is None:
+                stats = CalibrationStats(calibration_columns(source_paths), config.reservoir_size)
+            # Merged partials must share the saved stats' columns; channels a file lacks count as NaN
+            columns = stats.columns
+
+            hashes = {path: file_sha256(path) for path in source_paths}
+            new_paths = [path for path in source_paths if hashes[path] not in stats.sources]
+            skipped = len(source_paths) - len(new_paths)
+            if skipped:
+                logger.info(f"Skipping {skipped} file(s) already included in the calibration stats")
+
+            partials = Parallel(n_jobs=config.n_jobs)(
+                delayed(compute_file_stats)(path, columns, config.chunksize, config.reservoir_size)
+                for path in new_paths
+            )
+            for path, partial in zip(new_paths, partials):
+                stats.merge(partial)
+                stats.sources[hashes[path]] = path
+
+            logger.info(f"Calibration statistics cover {len(columns)} channels over {stats.count} rows")
+            return self.save(stats)
+
+        except Exception as e:
+            raise CustomException(e, sys)
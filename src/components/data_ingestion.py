@@ -1,11 +1,16 @@
 import os
 import sys
+import json
+import glob
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from dataclasses import dataclass
 
 from src.exception import CustomException
-from src.logger import logger
+from src.logger import logger, configure_logging
+from src.utils import save_dataframe, compare_artifact_formats, ChunkedDataFrameWriter
+from src.components.data_calibration import DataCalibration, CalibrationStats, calibration_columns
 from src.components.data_transformation import DataTransformation, DataTransformationConfig
 from src.components.model_trainer import ModelTrainerConfig, ModelTrainer
 
@@ -13,9 +18,18 @@ from src.components.model_trainer import ModelTrainerConfig, ModelTrainer
 @dataclass
 class DataIngestionConfig:
     """Configuration for data ingestion component"""
-    train_data_path: str = os.path.join('artifacts', "train.csv")
-    test_data_path: str = os.path.join('artifacts', "test.csv")
-    raw_data_path: str = os.path.join('artifacts', "data.csv")
+    source_data_path: str = "Water_Sensor_Prediction.csv"
+    train_data_path: str = os.path.join('artifacts', "train.parquet")
+    test_data_path: str = os.path.join('artifacts', "test.parquet")
+    raw_data_path: str = os.path.join('artifacts', "data.parquet")
+    export_csv: bool = True      # also write train.csv/test.csv/data.csv for humans
+    format_report_path: str = os.path.join('artifacts', "artifact_format_report.json")
+
+    # Streaming mode: many large dumps read in chunks
+    stream_source_glob: str = os.path.join('notebooks', 'data', 'wafer_*.csv')
+    chunksize: int = 50_000
+    test_size: float = 0.2
+    split_key_column: str = "Unnamed: 0"     # wafer id; rows hash to train/test on it
 
 
 class DataIngestion:
@@ -36,31 +50,121 @@ class DataIngestion:
         try:
             # Read the dataset - assuming it's in a known location
             # In production, this could come from database, API, etc.
-            df = pd.read_csv('Water_Sensor_Prediction.csv')
+            df = pd.read_csv(self.ingestion_config.source_data_path)
             logger.info('Read the dataset as dataframe')
 
             os.makedirs(os.path.dirname(self.ingestion_config.train_data_path), exist_ok=True)
 
-            df.to_csv(self.ingestion_config.raw_data_path, index=False, header=True)
+            export_csv = self.ingestion_config.export_csv
+            save_dataframe(self.ingestion_config.raw_data_path, df, export_csv=export_csv)
 
             logger.info("Train test split initiated")
             train_set, test_set = train_test_split(df, test_size=0.2, random_state=42)
 
-            train_set.to_csv(self.ingestion_config.train_data_path, index=False, header=True)
-            test_set.to_csv(self.ingestion_config.test_data_path, index=False, header=True)
+            # Typed columnar splits: later stages read only the columns they need
+            train_path = save_dataframe(self.ingestion_config.train_data_path, train_set, export_csv=export_csv)
+            test_path = save_dataframe(self.ingestion_config.test_data_path, test_set, export_csv=export_csv)
+
+            if export_csv and train_path != os.path.splitext(train_path)[0] + ".csv":
+                self.record_format_report(train_path)
 
             logger.info("Data ingestion is completed")
 
             return (
-                self.ingestion_config.train_data_path,
-                self.ingestion_config.test_data_path
+                train_path,
+                test_path
             )
         
         except Exception as e:
             raise CustomException(e, sys)
 
+    def record_format_report(self, columnar_path: str):
+        """Log and save the size and read-time savings of the columnar split over its CSV export"""
+        sensor_cols = [f"Sensor-{i}" for i in range(1, 11)] + ["Good/Bad"]
+        report = compare_artifact_formats(
+            columnar_path, os.path.splitext(columnar_path)[0] + ".csv", columns=sensor_cols
+        )
+        logger.info(
+            f"Columnar split is {report['size_ratio']:.1f}x smaller than CSV; full read "
+            f"{report['read_speedup']:.1f}x faster, Sensor-1..10 read {report['subset_read_speedup']:.1f}x faster"
+        )
+        with open(self.ingestion_config.format_report_path, "w") as file_obj:
+            json.dump(report, file_obj, indent=2)
+
+    def _is_test_row(self, chunk: pd.DataFrame) -> np.ndarray:
+        """Deterministic split: a row goes to test when the hash of its wafer id falls in the test fraction"""
+        key_col = self.ingestion_config.split_key_column
+        keys = chunk[key_col] if key_col in chunk.columns else chunk
+        hashes = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+        return (hashes % 10_000) < int(self.ingestion_config.test_size * 10_000)
+
+    def initiate_streaming_ingestion(self, source_paths: list = None):
+        """
+        Stream one or more sensor dumps into train/test splits with bounded memory
+
+        Files are read chunksize rows at a time. Each row is assigned to train
+        or test by hashing its wafer id, so the split does not depend on file
+        order or chunk boundaries. Both splits are written incrementally, and
+        the calibration statistics of the train rows are accumulated in the same pass.
+
+        Args:
+            source_paths: CSV files to ingest; defaults to stream_source_glob
+
+        Returns:
+            Tuple of train and test data paths
+        """
+        logger.info("Entered the streaming data ingestion method")
+
+        try:
+            config = self.ingestion_config
+            source_paths = source_paths or sorted(glob.glob(config.stream_source_glob))
+            if not source_paths:
+                raise FileNotFoundError(f"No input files match {config.stream_source_glob}")
+
+            os.makedirs(os.path.dirname(config.train_data_path), exist_ok=True)
+            train_writer = ChunkedDataFrameWriter(config.train_data_path)
+            test_writer = ChunkedDataFrameWriter(config.test_data_path)
+
+            data_calibration = DataCalibration()
+            calib_cols = calibration_columns(source_paths[:1])
+            calib_stats = CalibrationStats(calib_cols, data_calibration.calibration_config.reservoir_size)
+
+            columns = None
+            try:
+                for path in source_paths:
+                    for chunk in pd.read_csv(path, chunksize=config.chunksize):
+                        # Fix the columns and dtypes so every chunk matches the first chunk's schema
+                        columns = columns if columns is not None else list(chunk.columns)
+                        chunk = chunk.reindex(columns=columns)
+                        sensor_cols = [c for c in chunk.columns if c.startswith("Sensor-")]
+                        chunk[sensor_cols] = chunk[sensor_cols].astype("float64")
+
+                        is_test = self._is_test_row(chunk)
+                        train_chunk = chunk[~is_test]
+                        train_writer.write(train_chunk)
+                        test_writer.write(chunk[is_test])
+
+                        calib_stats.update(train_chunk.reindex(columns=calib_cols).to_numpy(dtype=float))
+
+                    logger.info(f"Ingested {path}: train rows so far {train_writer.rows}, test rows {test_writer.rows}")
+            finally:
+                train_writer.close()
+                test_writer.close()
+
+            data_calibration.save(calib_stats)
+
+            logger.info("Streaming data ingestion is completed")
+            return (
+                train_writer.file_path,
+                test_writer.file_path
+            )
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
 
 if __name__ == "__main__":
+    configure_logging()
     obj = DataIngestion()
     train_data, test_data = obj.initiate_data_ingestion()
 
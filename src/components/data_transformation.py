@@ -1,22 +1,31 @@
 import sys
 import os
+import tempfile
+import joblib
 import numpy as np
 import pandas as pd
-from sklearn.impute import KNNImputer
 from sklearn.preprocessing import RobustScaler
 from sklearn.pipeline import Pipeline
 from dataclasses import dataclass
 
 from src.exception import CustomException
 from src.logger import logger
-from src.utils import save_object
+from src.utils import save_object, load_dataframe, save_numpy_column_blocks
 from src.pipelines.calibration import RescaleToWaterProperty
+from src.pipelines.knn_imputer import IndexedKNNImputer
+from src.pipelines.compiled_preprocessor import CompiledPreprocessor, check_parity
 
 
 @dataclass
 class DataTransformationConfig:
     """Configuration for data transformation"""
     preprocessor_obj_file_path: str = os.path.join('artifacts', "preprocessor.pkl")
+    # Transformed features + target, memory-mapped by the training stages
+    train_arr_file_path: str = os.path.join('artifacts', "train_arr.npy")
+    test_arr_file_path: str = os.path.join('artifacts', "test_arr.npy")
+    # Inputs arrive already in water-property units (the dashboard form): the splits are
+    # calibrated up front and the saved rescale step leaves every column as it is
+    water_property_inputs: bool = False
 
 
 class DataTransformation:
@@ -29,7 +38,7 @@ class DataTransformation:
         """
         Create and return the preprocessing pipeline:
           1) Rescale wafer channels to water-property units
-          2) Impute missing values with KNN
+          2) Impute missing values with KNN (tree-indexed neighbour search)
           3) Robust scale features
         """
         try:
@@ -37,7 +46,7 @@ class DataTransformation:
 
             preprocessing_pipeline = Pipeline([
                 ('rescale', RescaleToWaterProperty()),     # map into pH, NTU, etc.
-                ('imputer', KNNImputer(n_neighbors=3)),     # fill missing values
+                ('imputer', IndexedKNNImputer(n_neighbors=3)),  # fill missing values
                 ('scaler', RobustScaler())                  # normalize outliers
             ])
 
@@ -47,27 +56,36 @@ class DataTransformation:
         except Exception as e:
             raise CustomException(e, sys)
 
-    def initiate_data_transformation(self, train_path: str, test_path: str):
+    def initiate_data_transformation(self, train_path: str, test_path: str, feature_columns: list = None):
         """
-        Read train/test CSVs, apply transformations, and save the preprocessor.
+        Read train/test splits, apply transformations, and save the preprocessor.
+
+        Args:
+            feature_columns: channels to use, e.g. from FeatureSelection (default: Sensor-1..10)
         
         Returns:
-            train_arr: numpy array of transformed train features + target
-            test_arr: numpy array of transformed test features + target
+            train_arr: read-only memmap of transformed train features + target (last column)
+            test_arr: read-only memmap of transformed test features + target (last column)
             preprocessor_obj_file_path: path to the saved pipeline object
         """
         try:
-            # Read raw data
-            train_df = pd.read_csv(train_path)
-            test_df  = pd.read_csv(test_path)
+            # Identify sensor feature columns and target
+            target_column_name = "Good/Bad"
+            sensor_cols = list(feature_columns or [f"Sensor-{i}" for i in range(1, 11)])
+
+            # Read only the needed columns from the splits
+            train_df = load_dataframe(train_path, columns=sensor_cols + [target_column_name])
+            test_df  = load_dataframe(test_path, columns=sensor_cols + [target_column_name])
             logger.info("Read train and test data completed")
 
             # Build pipeline
             preprocessing_obj = self.get_data_transformer_object()
 
-            # Identify sensor feature columns and target
-            target_column_name = "Good/Bad"
-            sensor_cols = [f"Sensor-{i}" for i in range(1, 11)]
+            if self.data_transformation_config.water_property_inputs:
+                calibration = RescaleToWaterProperty().fit(train_df[sensor_cols])
+                train_df[sensor_cols] = calibration.transform(train_df[sensor_cols])
+                test_df[sensor_cols] = calibration.transform(test_df[sensor_cols])
+                logger.info("Calibrated train and test splits to water-property units")
 
             # Drop any extra columns if present
             cols_to_drop = [target_column_name] + [c for c in ['Wafers', 'Unnamed: 0'] if c in train_df.columns]
@@ -81,12 +99,36 @@ class DataTransformation:
             logger.info("Applying preprocessing object on training and testing dataframes")
 
             # Fit & transform training features, transform test features
-            input_feature_train_arr = preprocessing_obj.fit_transform(input_feature_train_df[sensor_cols])
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                if self.data_transformation_config.water_property_inputs:
+                    # No channel has calibration parameters, so the rescale step passes every column through
+                    identity_params_path = os.path.join(tmp_dir, "calibration_params.pkl")
+                    joblib.dump({}, identity_params_path)
+                    preprocessing_obj.set_params(rescale__param_path=identity_params_path)
+                input_feature_train_arr = preprocessing_obj.fit_transform(input_feature_train_df[sensor_cols])
             input_feature_test_arr  = preprocessing_obj.transform(input_feature_test_df[sensor_cols])
 
-            # Combine transformed features with target
-            train_arr = np.c_[input_feature_train_arr, target_feature_train_df.to_numpy()]
-            test_arr  = np.c_[input_feature_test_arr,  target_feature_test_df.to_numpy()]
+            # Serving compiles the pipeline into a NumPy fast path; make sure it matches exactly
+            if CompiledPreprocessor.is_compilable(preprocessing_obj):
+                compiled = CompiledPreprocessor(preprocessing_obj)
+                check_parity(preprocessing_obj, compiled, input_feature_train_df[sensor_cols])
+                check_parity(preprocessing_obj, compiled, input_feature_test_df[sensor_cols])
+                logger.info("Compiled preprocessor matches the sklearn pipeline on train and test data")
+
+            # Write features and target once into Fortran-order .npy files; later stages
+            # (and the model search workers) map them and slice X / y as views
+            train_arr = save_numpy_column_blocks(
+                self.data_transformation_config.train_arr_file_path,
+                [input_feature_train_arr, target_feature_train_df.to_numpy()]
+            )
+            test_arr = save_numpy_column_blocks(
+                self.data_transformation_config.test_arr_file_path,
+                [input_feature_test_arr, target_feature_test_df.to_numpy()]
+            )
+            del input_feature_train_arr, input_feature_test_arr
+            logger.info(f"Saved transformed arrays {train_arr.shape} and {test_arr.shape} "
+                        f"to {self.data_transformation_config.train_arr_file_path} and "
+                        f"{self.data_transformation_config.test_arr_file_path}")
 
             # Save the preprocessing pipeline
             save_object(
@@ -0,0 +1,239 @@
+"""
+Feature selection over every Sensor-* channel of the train split.
+
+The wafer dumps have about 590 channels. This stage decides, from the
+data, which of them the preprocessor and the serving API use:
+
+  1. per-channel statistics in one streaming pass, with the channels split
+     into blocks that are read and reduced in parallel (columnar files
+     read only their block's columns);
+  2. drop channels that are mostly missing, constant, or near-constant
+     (one value in almost every row);
+  3. rank the rest by random forest importance on a row sample;
+  4. walk them in importance order and drop any channel too correlated
+     with a channel already kept, then keep the top max_features.
+
+The water-property channels (Sensor-1..10) are always kept: they are the
+ones the dashboard form and older clients send, and the only ones with
+physical ranges that serving can validate. They bypass the filters and
+count towards max_features.
+
+The result is written to artifacts/selected_features.json, together with
+the importance of each kept channel and the reason each other channel
+was dropped.
+
+    python -m src.components.feature_selection artifacts/train.parquet
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from dataclasses import dataclass, field, asdict
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+
+from src.exception import CustomException
+from src.logger import logger, configure_logging
+from src.components.data_calibration import CalibrationStats, compute_file_stats, sensor_columns
+from src.pipelines.calibration import WATER_PROPERTY_RANGES
+
+
+@dataclass
+class FeatureSelectionConfig:
+    """Configuration for the feature selection stage"""
+    selected_features_path: str = os.path.join('artifacts', "selected_features.json")
+    target_column: str = "Good/Bad"
+    max_missing_fraction: float = 0.5     # drop channels missing in more rows than this
+    max_mode_fraction: float = 0.95       # near-constant: one value in more of the present rows than this
+    max_correlation: float = 0.95         # |Pearson r| above which the less important channel is dropped
+    max_features: int = 40                # including keep_features
+    keep_features: list = field(default_factory=lambda: list(WATER_PROPERTY_RANGES))  # always selected
+    sample_rows: int = 20_000             # row reservoir used for near-constant, correlation and importance
+    n_estimators: int = 200
+    block_size: int = 64                  # channels per parallel statistics task
+    chunksize: int = 50_000
+    n_jobs: int = -1
+    random_state: int = 42
+
+
+def load_selected_features(file_path: str) -> list:
+    """Feature list saved by FeatureSelection"""
+    with open(file_path) as file_obj:
+        return json.load(file_obj)["features"]
+
+
+def mode_fraction(values: np.ndarray) -> np.ndarray:
+    """
+    Share of the present values taken by the most frequent value, per column
+
+    Vectorized over all columns: each column is sorted, equal neighbours are
+    grouped into runs, and the longest run is counted with one bincount.
+    """
+    n_rows, n_cols = values.shape
+    if n_rows == 0:
+        return np.zeros(n_cols)
+    ordered = np.sort(values, axis=0)                # NaN sorts last
+    present = ~np.isnan(ordered)
+    new_run = np.ones_like(present)
+    new_run[1:] = ordered[1:] != ordered[:-1]
+    run_ids = np.cumsum(new_run, axis=0) + np.arange(n_cols) * (n_rows + 1)
+    counts = np.bincount(run_ids[present], minlength=n_cols * (n_rows + 1)).reshape(n_cols, n_rows + 1)
+    n_present = present.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n_present > 0, counts.max(axis=1) / n_present, 1.0)
+
+
+class FeatureSelection:
+    """Feature selection component: picks the channels the model is trained and served on"""
+
+    def __init__(self, config: FeatureSelectionConfig = None):
+        self.feature_selection_config = config or FeatureSelectionConfig()
+
+    def channel_statistics(self, train_path: str, channels: list) -> CalibrationStats:
+        """
+        Statistics of all channels plus the target, computed block-wise in parallel
+
+        Every block sees the same chunks and uses the same seed, so the row
+        reservoirs of all blocks hold the same rows and can be put side by side.
+        """
+        config = self.feature_selection_config
+        blocks = [channels[i:i + config.block_size] for i in range(0, len(channels), config.block_size)]
+        blocks.append([config.target_column])
+        partials = Parallel(n_jobs=config.n_jobs)(
+            delayed(compute_file_stats)(train_path, block, config.chunksize, config.sample_rows)
+            for block in blocks
+        )
+
+        stats = CalibrationStats(channels + [config.target_column], config.sample_rows)
+        stats.count = partials[0].count
+        stats.nan_count = np.concatenate([p.nan_count for p in partials])
+        stats.min = np.concatenate([p.min for p in partials])
+        stats.max = np.concatenate([p.max for p in partials])
+        stats.sum = np.concatenate([p.sum for p in partials])
+        stats.sumsq = np.concatenate([p.sumsq for p in partials])
+        stats.reservoir = np.hstack([p.reservoir for p in partials])
+        return stats
+
+    def rank_features(self, X: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Random forest impurity importance of each column of X (NaN filled with the column median)"""
+        config = self.feature_selection_config
+        forest = RandomForestClassifier(
+            n_estimators=config.n_estimators, class_weight="balanced",
+            random_state=config.random_state, n_jobs=config.n_jobs
+        )
+        return forest.fit(X, y).feature_importances_
+
+    def initiate_feature_selection(self, train_path: str) -> list:
+        """
+        Select the channels to train and serve on from the train split
+
+        Returns:
+            selected feature names, most important first
+        """
+        logger.info("Entered the feature selection method or component")
+
+        try:
+            config = self.feature_selection_config
+            start = time.perf_counter()
+            channels = sensor_columns(train_path)
+            if not channels:
+                raise ValueError(f"No Sensor-* columns in {train_path}")
+
+            stats = self.channel_statistics(train_path, channels)
+            n_rows = stats.count
+            missing = stats.nan_count[:-1] / max(n_rows, 1)
+            sample = stats.reservoir[:, :-1]
+            y = stats.reservoir[:, -1]
+            labeled = ~np.isnan(y)
+            sample, y = sample[labeled], y[labeled]
+            logger.info(f"Computed statistics of {len(channels)} channels over {n_rows} rows "
+                        f"({len(y)} sampled rows) in {time.perf_counter() - start:.2f}s")
+
+            # Univariate filters on the exact counts and the row sample
+            dropped = {"missing": [], "constant": [], "near_constant": [], "correlated": {}, "unimportant": []}
+            with np.errstate(invalid="ignore"):
+                is_constant = ~(stats.max[:-1] > stats.min[:-1])      # also all-NaN channels
+            mode_share = mode_fraction(sample)
+            reason = np.where(missing > config.max_missing_fraction, "missing",
+                              np.where(is_constant, "constant",
+                                       np.where(mode_share > config.max_mode_fraction, "near_constant", "")))
+            is_kept = np.isin(channels, config.keep_features)
+            reason = np.where(is_kept, "", reason)
+            for name, why in zip(channels, reason):
+                if why:
+                    dropped[why].append(name)
+            candidates = np.flatnonzero(reason == "")
+            if not len(candidates):
+                raise ValueError("Every channel was dropped by the missing/constant filters")
+
+            X = sample[:, candidates]
+            medians = np.nanmedian(X, axis=0)
+            X = np.where(np.isnan(X), medians, X)
+            importance = self.rank_features(X, y)
+
+            # Correlation of all candidate pairs as one matrix product of standardized columns
+            std = X.std(axis=0)
+            Z = (X - X.mean(axis=0)) / np.where(std > 0, std, 1.0)
+            corr = np.abs(Z.T @ Z) / len(Z)
+
+            order = np.argsort(-importance, kind="stable")
+            selected = [(j, channels[candidates[j]]) for j in order if is_kept[candidates[j]]]
+            n_kept = len(selected)
+            for j in order:
+                name = channels[candidates[j]]
+                if is_kept[candidates[j]]:
+                    continue
+                if importance[j] <= 0:
+                    dropped["unimportant"].append(name)
+                    continue
+                kept = [k for k, _ in selected]
+                if kept and corr[j, kept].max() > config.max_correlation:
+                    dropped["correlated"][name] = channels[candidates[kept[int(np.argmax(corr[j, kept]))]]]
+                    continue
+                selected.append((j, name))
+            if not selected:
+                raise ValueError("No channel has a non-zero importance")
+            n_selected = n_kept + max(config.max_features - n_kept, 0)
+            dropped["unimportant"] += [name for _, name in selected[n_selected:]]
+            selected = sorted(selected[:n_selected], key=lambda item: -importance[item[0]])
+            features = [name for _, name in selected]
+
+            document = {
+                "features": features,
+                "importance": {name: float(importance[j]) for j, name in selected},
+                "dropped": dropped,
+                "n_channels": len(channels),
+                "n_rows": int(n_rows),
+                "n_sampled_rows": int(len(y)),
+                "config": asdict(config),
+            }
+            os.makedirs(os.path.dirname(config.selected_features_path) or ".", exist_ok=True)
+            tmp_path = f"{config.selected_features_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as file_obj:
+                json.dump(document, file_obj, indent=2)
+            os.replace(tmp_path, config.selected_features_path)
+
+            logger.info(
+                f"Selected {len(features)} of {len(channels)} channels in {time.perf_counter() - start:.2f}s "
+                f"(dropped {len(dropped['missing'])} missing, {len(dropped['constant'])} constant, "
+                f"{len(dropped['near_constant'])} near-constant, {len(dropped['correlated'])} correlated, "
+                f"{len(dropped['unimportant'])} low importance, {n_kept} always kept); top: {features[:10]}"
+            )
+            return features
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("train_path", help="train split (CSV or Parquet) with Sensor-* columns and the target")
+    parser.add_argument("--max-features", type=int, default=FeatureSelectionConfig.max_features)
+    args = parser.parse_args()
+
+    configure_logging()
+    selection = FeatureSelection(FeatureSelectionConfig(max_features=args.max_features))
+    print("\n".join(selection.initiate_feature_selection(args.train_path)))
@@ -0,0 +1,402 @@
+"""
+Incremental retraining on small batches of newly labeled readings.
+
+    python -m src.pipelines.training_pipeline --incremental notebooks/data/labeled_2026_10_16.csv
+
+A batch is merged into the calibration statistics (mergeable, so old
+data is never rescanned), then the current model is updated on the batch
+instead of re-running ingestion, calibration, transformation and the
+six-model search:
+
+  * Random Forest / Gradient Boosting grow extra trees / stages fitted on
+    the new rows only (warm_start);
+  * estimators with partial_fit are updated with it;
+  * K-Neighbors and the remaining models are refitted with their current
+    hyperparameters on the stored training matrix plus the new rows
+    (Logistic Regression warm-starts from its current coefficients).
+
+The fitted preprocessor, including the robust scaler's center and scale,
+is kept as it is until the next full retrain, so the model keeps seeing
+the feature space it was trained in. When the batch drifts away from it
+(values outside the calibrated range, shifted medians or spreads, or the
+current model losing accuracy on the batch) a full retrain over the
+original source plus every batch is run instead.
+"""
+import os
+import sys
+import copy
+import json
+import shutil
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score
+
+from src.exception import CustomException
+from src.logger import logger
+from src.utils import save_object, load_object, load_dataframe, load_numpy_array_data, save_numpy_column_blocks
+from src.pipelines.calibration import WATER_PROPERTY_RANGES
+from src.pipelines.compiled_preprocessor import compile_preprocessor
+from src.pipelines.model_registry import file_sha256
+from src.pipelines.artifact_store import artifact_store
+from src.components.data_calibration import DataCalibration, CalibrationStats
+from src.components.data_ingestion import DataIngestion, DataIngestionConfig
+from src.components.data_transformation import DataTransformationConfig
+from src.components.model_trainer import ModelTrainer, ModelTrainerConfig
+
+
+@dataclass
+class IncrementalTrainerConfig:
+    """Configuration for incremental retraining"""
+    state_path: str = os.path.join('artifacts', "incremental_state.json")
+    target_column: str = "Good/Bad"
+
+    # Drift thresholds: crossing any of them triggers a full retrain
+    max_out_of_range_fraction: float = 0.05  # share of a channel's batch values outside the calibrated wafer range
+    max_median_shift: float = 1.0            # |batch median - fitted scaler center|, in fitted IQRs
+    max_iqr_ratio: float = 3.0               # batch IQR / fitted IQR (or its inverse)
+    max_accuracy_drop: float = 0.10          # current model on the batch vs its last recorded accuracy
+    min_drift_rows: int = 30                 # smaller batches skip the distribution checks
+
+    trees_per_update: float = 0.25           # warm-started ensembles grow by this share of their size
+    accept_tolerance: float = 0.01           # the updated model may score this much below the current one
+
+
+@dataclass
+class IncrementalTrainingReport:
+    """Outcome of one incremental training run"""
+    mode: str                                # "incremental", "full" or "skipped"
+    rows: int = 0
+    reasons: list = field(default_factory=list)
+    drift: dict = field(default_factory=dict)
+    strategy: Optional[str] = None
+    accuracy_before: Optional[float] = None
+    accuracy_after: Optional[float] = None
+    published: bool = False
+    model_version: Optional[str] = None
+    seconds: float = 0.0
+    full_retrain_seconds: Optional[float] = None
+
+    @property
+    def time_saved_s(self) -> Optional[float]:
+        if self.mode != "incremental" or self.full_retrain_seconds is None:
+            return None
+        return self.full_retrain_seconds - self.seconds
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "time_saved_s": self.time_saved_s, "finished_at": time.time()}
+
+
+class IncrementalTrainer:
+    """Updates the trained model on new labeled batches, falling back to a full retrain on drift"""
+
+    def __init__(self):
+        self.incremental_config = IncrementalTrainerConfig()
+        self.transformation_config = DataTransformationConfig()
+        self.trainer_config = ModelTrainerConfig()
+
+    # ----- state -----
+
+    def load_state(self) -> dict:
+        path = self.incremental_config.state_path
+        state = {"batches": {}, "full_training": None, "model_accuracy": None, "model_version": None, "history": []}
+        if os.path.exists(path):
+            with open(path) as file_obj:
+                state.update(json.load(file_obj))
+        return state
+
+    def save_state(self, state: dict):
+        path = self.incremental_config.state_path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file_obj:
+            json.dump(state, file_obj, indent=2)
+
+    def record_full_training(self, seconds: float, accuracy: float):
+        """Called after a full pipeline run: the baseline for time savings and accuracy drift"""
+        state = self.load_state()
+        state["full_training"] = {"seconds": seconds, "accuracy": accuracy, "finished_at": time.time()}
+        state["model_accuracy"] = accuracy
+        version = artifact_store.current_version()
+        if version is not None:
+            state["model_version"] = version
+            state["batches"] = dict(artifact_store.manifest(version)["metrics"].get("batches", state["batches"]))
+        self.save_state(state)
+
+    def sync_with_current(self, state: dict):
+        """
+        Reset the state to the served version when a rollback or promote moved CURRENT
+
+        The accuracy baseline and the batches trained on come from the
+        version's manifest, the train/test matrices from its directory, so
+        the next update continues from what that version was built on.
+        """
+        version = artifact_store.current_version()
+        if version is None or state.get("model_version") == version:
+            return
+        if state.get("model_version") is not None:
+            logger.warning(f"CURRENT moved from {state['model_version']} to {version}; "
+                           f"restoring its training matrices, accuracy and batch list")
+            metrics = artifact_store.manifest(version)["metrics"]
+            state["batches"] = dict(metrics.get("batches", {}))
+            state["model_accuracy"] = metrics.get("accuracy")
+            for name, path in (("train_arr.npy", self.transformation_config.train_arr_file_path),
+                               ("test_arr.npy", self.transformation_config.test_arr_file_path)):
+                version_path = os.path.join(artifact_store.version_dir(version), name)
+                if os.path.exists(version_path):
+                    tmp_path = f"{path}.{os.getpid()}.tmp"
+                    shutil.copyfile(version_path, tmp_path)
+                    os.replace(tmp_path, path)
+                elif os.path.exists(path):
+                    # Published before matrices were versioned: a full retrain rebuilds them
+                    os.remove(path)
+        state["model_version"] = version
+
+    # ----- statistics and drift -----
+
+    def check_drift(self, pipeline, model, batch_df: pd.DataFrame, X_new: np.ndarray, scaler_input: np.ndarray,
+                    y: np.ndarray, state: dict) -> tuple:
+        """
+        Compare a batch with what the current preprocessor and model were fitted on
+
+        Returns:
+            (reasons, drift): human-readable threshold crossings and the measured values
+        """
+        config = self.incremental_config
+        reasons, drift = [], {}
+
+        if len(batch_df) >= config.min_drift_rows:
+            # Calibration: raw values outside the wafer range the rescale step was fitted on
+            params = pipeline.named_steps["rescale"].params_
+            out_of_range = {}
+            for ch, p in params.items():
+                if ch not in batch_df.columns:
+                    continue
+                values = batch_df[ch].to_numpy(dtype=float)
+                values = values[~np.isnan(values)]
+                if values.size:
+                    out_of_range[ch] = float(np.mean((values < p["xmin"]) | (values > p["xmax"])))
+            drift["out_of_range_fraction"] = out_of_range
+            worst = max(out_of_range, key=out_of_range.get, default=None)
+            if worst is not None and out_of_range[worst] > config.max_out_of_range_fraction:
+                reasons.append(f"{worst}: {out_of_range[worst]:.1%} of values outside the calibrated range")
+
+            # Robust scaler: batch median and IQR against the fitted center_ and scale_
+            scaler = pipeline.named_steps["scaler"]
+            q_low, q_high = scaler.quantile_range
+            with np.errstate(invalid="ignore"):
+                lo, median, hi = np.nanpercentile(scaler_input, [q_low, 50.0, q_high], axis=0)
+            shift = np.abs(median - scaler.center_) / scaler.scale_
+            iqr = (hi - lo) / scaler.scale_
+            ratio = np.where(iqr > 0, np.maximum(iqr, 1.0 / np.where(iqr > 0, iqr, 1.0)), 1.0)
+            names = list(pipeline.feature_names_in_)
+            drift["median_shift_iqr"] = dict(zip(names, np.round(shift, 4).tolist()))
+            drift["iqr_ratio"] = dict(zip(names, np.round(ratio, 4).tolist()))
+            if np.nanmax(shift) > config.max_median_shift:
+                reasons.append(f"{names[int(np.nanargmax(shift))]}: median moved {np.nanmax(shift):.2f} IQRs")
+            if np.nanmax(ratio) > config.max_iqr_ratio:
+                reasons.append(f"{names[int(np.nanargmax(ratio))]}: spread changed {np.nanmax(ratio):.2f}x")
+
+        # Model: accuracy of the current model on the labeled batch
+        baseline = state.get("model_accuracy")
+        batch_accuracy = float(accuracy_score(y, model.predict(X_new)))
+        drift["batch_accuracy"] = batch_accuracy
+        if baseline is not None and baseline - batch_accuracy > config.max_accuracy_drop:
+            reasons.append(f"accuracy on the batch {batch_accuracy:.3f} vs {baseline:.3f} recorded")
+
+        return reasons, drift
+
+    # ----- model update -----
+
+    def update_model(self, model, X_new, y_new, X_old, y_old) -> tuple:
+        """
+        Return (updated copy of model, strategy name); model itself is left untouched
+        """
+        model = copy.deepcopy(model)
+        classes = getattr(model, "classes_", None)
+        has_all_classes = classes is not None and np.isin(classes, y_new).all()
+        is_ensemble = "n_estimators" in model.get_params() and hasattr(model, "estimators_")
+        # Growing an ensemble on the batch alone needs every class in it
+        if "warm_start" in model.get_params() and is_ensemble and has_all_classes:
+            n_trees = model.get_params()["n_estimators"]
+            extra = max(1, int(np.ceil(n_trees * self.incremental_config.trees_per_update)))
+            model.set_params(warm_start=True, n_estimators=n_trees + extra)
+            if "n_iter_no_change" in model.get_params():
+                # Early stopping would hold out part of a batch that may have only a few rows
+                model.set_params(n_iter_no_change=None)
+            model.fit(X_new, y_new)
+            model.set_params(warm_start=False)
+            return model, f"warm_start (+{extra} estimators on {len(y_new)} new rows)"
+
+        if hasattr(model, "partial_fit"):
+            model.partial_fit(X_new, y_new, classes=classes)
+            return model, f"partial_fit ({len(y_new)} new rows)"
+
+        X_all, y_all = np.concatenate([X_old, X_new]), np.concatenate([y_old, y_new])
+        # A warm-started ensemble with unchanged n_estimators fits nothing; refit those from scratch
+        if "warm_start" in model.get_params() and not is_ensemble:
+            # Starts from the current solution (e.g. logistic regression coefficients)
+            model.set_params(warm_start=True).fit(X_all, y_all)
+            model.set_params(warm_start=False)
+            return model, f"warm_start refit ({len(y_all)} rows)"
+        return clone(model).fit(X_all, y_all), f"refit with current hyperparameters ({len(y_all)} rows)"
+
+    # ----- entry points -----
+
+    def run_full_retrain(self, state: dict) -> float:
+        """Full pipeline over the original source plus every batch seen so far"""
+        from src.pipelines.training_pipeline import TrainingPipeline
+
+        # Deduplicated by content: a version's batch list also holds the source it was trained on
+        source_path = DataIngestionConfig().source_data_path
+        sources = {file_sha256(source_path): source_path}
+        for digest, path in sorted(state["batches"].items(), key=lambda item: item[1]):
+            sources.setdefault(digest, path)
+        return TrainingPipeline().start_training(streaming=True, source_paths=list(sources.values()))
+
+    def initiate_incremental_training(self, batch_paths: list) -> IncrementalTrainingReport:
+        """
+        Update the model with new labeled batches (CSV files with the source data's columns)
+
+        Returns:
+            IncrementalTrainingReport; its time_saved_s compares this run with the last full retrain
+        """
+        logger.info("Entered the incremental training method or component")
+        start = time.perf_counter()
+
+        try:
+            config = self.incremental_config
+            state = self.load_state()
+            self.sync_with_current(state)
+            full = state.get("full_training") or {}
+            report = IncrementalTrainingReport(mode="incremental", full_retrain_seconds=full.get("seconds"))
+
+            hashes = {path: file_sha256(path) for path in batch_paths}
+            new_paths = [path for path in batch_paths if hashes[path] not in state["batches"]]
+            if len(new_paths) < len(batch_paths):
+                logger.info(f"Skipping {len(batch_paths) - len(new_paths)} batch(es) already trained on")
+            if not new_paths:
+                report.mode = "skipped"
+                self.save_state(state)
+                return report
+
+            # Start from the version being served, which a rollback may have changed
+            preprocessor_path = artifact_store.resolve("preprocessor.pkl")
+            model_path = artifact_store.resolve("model.pkl")
+            required = [preprocessor_path, model_path, self.transformation_config.train_arr_file_path,
+                        self.transformation_config.test_arr_file_path]
+            missing = [path for path in required if not os.path.exists(path)]
+
+            if not missing:
+                pipeline, model = load_object(preprocessor_path), load_object(model_path)
+                features = list(pipeline.feature_names_in_)
+                batch_df, is_test = self._read_batches(new_paths, features)
+                report.rows = len(batch_df)
+                y = batch_df[config.target_column].to_numpy(dtype=float)
+
+                X_new = compile_preprocessor(pipeline).transform(batch_df[features])
+                scaler = pipeline.named_steps["scaler"]
+                scaler_input = X_new * scaler.scale_ + scaler.center_
+
+                report.reasons, report.drift = self.check_drift(pipeline, model, batch_df[features], X_new,
+                                                                scaler_input, y, state)
+            else:
+                report.reasons = [f"no trained model to update (missing {missing})"]
+
+            state["batches"].update({hashes[path]: path for path in new_paths})
+
+            if report.reasons:
+                logger.warning(f"Drift thresholds crossed, running a full retrain: {report.reasons}")
+                self.save_state(state)
+                report.mode = "full"
+                report.accuracy_after = self.run_full_retrain(state)
+                report.published = True
+                report.model_version = artifact_store.current_version()
+                state = self.load_state()
+            else:
+                self._update_statistics(batch_df, new_paths, hashes)
+                self._update_and_publish(pipeline, preprocessor_path, model, X_new, y, is_test, report, state)
+
+            report.seconds = time.perf_counter() - start
+            state["history"].append(report.to_dict())
+            self.save_state(state)
+
+            if report.time_saved_s is not None:
+                logger.info(f"Incremental update took {report.seconds:.2f}s vs {report.full_retrain_seconds:.2f}s "
+                            f"for the last full retrain: {report.time_saved_s:.2f}s saved")
+            return report
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _read_batches(self, paths: list, features: list) -> tuple:
+        """Labeled rows of all batches, and which of them are held out for evaluation"""
+        target = self.incremental_config.target_column
+        ingestion = DataIngestion()
+        frames, held_out = [], []
+        for path in paths:
+            df = load_dataframe(path).dropna(subset=[target])
+            # Same deterministic split as streaming ingestion (by wafer id when the column is there)
+            held_out.append(ingestion._is_test_row(df))
+            frames.append(df.reindex(columns=features + [target]))
+        return pd.concat(frames, ignore_index=True), np.concatenate(held_out)
+
+    def _update_statistics(self, batch_df, new_paths, hashes):
+        """Merge the batch into the calibration statistics"""
+        calibration = DataCalibration()
+        stats = calibration.load_stats() or CalibrationStats(list(WATER_PROPERTY_RANGES),
+                                                             calibration.calibration_config.reservoir_size)
+        batch_stats = CalibrationStats(stats.columns, calibration.calibration_config.reservoir_size)
+        batch_stats.update(batch_df.reindex(columns=stats.columns).to_numpy(dtype=float))
+        stats.merge(batch_stats)
+        stats.sources.update({hashes[path]: path for path in new_paths})
+        calibration.save(stats)
+
+    def _update_and_publish(self, pipeline, preprocessor_path, model, X_new, y, is_test, report, state):
+        """Update the model on the batch and publish it unless it scores more than accept_tolerance lower"""
+        config = self.incremental_config
+        train_arr = load_numpy_array_data(self.transformation_config.train_arr_file_path, mmap_mode="r")
+        test_arr = load_numpy_array_data(self.transformation_config.test_arr_file_path, mmap_mode="r")
+
+        candidate, report.strategy = self.update_model(
+            model, X_new[~is_test], y[~is_test], train_arr[:, :-1], train_arr[:, -1]
+        )
+        X_eval = np.concatenate([test_arr[:, :-1], X_new[is_test]])
+        y_eval = np.concatenate([test_arr[:, -1], y[is_test]])
+        report.accuracy_before = float(accuracy_score(y_eval, model.predict(X_eval)))
+        report.accuracy_after = float(accuracy_score(y_eval, candidate.predict(X_eval)))
+        logger.info(f"Incremental update ({report.strategy}): accuracy {report.accuracy_before:.4f} -> "
+                    f"{report.accuracy_after:.4f} on {len(y_eval)} held-out rows")
+
+        # The new rows join the stored matrices either way, for later refits and evaluations
+        train_rows = np.column_stack([X_new[~is_test], y[~is_test]])
+        test_rows = np.column_stack([X_new[is_test], y[is_test]])
+        save_numpy_column_blocks(self.transformation_config.train_arr_file_path,
+                                 [np.concatenate([train_arr, train_rows])])
+        save_numpy_column_blocks(self.transformation_config.test_arr_file_path,
+                                 [np.concatenate([test_arr, test_rows])])
+
+        if report.accuracy_after < report.accuracy_before - config.accept_tolerance:
+            logger.warning(f"Updated model scores more than {config.accept_tolerance} below the current one; "
+                           f"keeping the current model")
+            return
+
+        model_path = self.trainer_config.trained_model_file_path
+        save_object(file_path=model_path, obj=candidate)
+        trainer = ModelTrainer()
+        trainer.export_lite_model(pipeline, candidate, X_eval)
+        # Same preprocessor and calibration as the version it was updated from
+        report.model_version = trainer.publish(
+            preprocessor_path, model_path=model_path,
+            calibration_params_path=os.path.join(os.path.dirname(preprocessor_path), "calibration_params.pkl"),
+            selected_features_path=os.path.join(os.path.dirname(preprocessor_path), "selected_features.json"),
+            metrics={"mode": "incremental", "accuracy": report.accuracy_after, "strategy": report.strategy,
+                     "rows": report.rows, "batches": state["batches"]}
+        )
+        report.published = True
+        state["model_accuracy"] = report.accuracy_after
+        state["model_version"] = report.model_version
+        logger.info(f"Published model version {report.model_version}")
@@ -1,7 +1,9 @@
 import os
 import sys
+import numpy as np
 import pandas as pd
 from dataclasses import dataclass
+from typing import Optional
 from sklearn.ensemble import (
     AdaBoostClassifier,
     GradientBoostingClassifier,
@@ -15,12 +17,24 @@ from sklearn.tree import DecisionTreeClassifier
 from src.exception import CustomException
 from src.logger import logger
 from src.utils import save_object, evaluate_models, load_object
+from src.pipelines.model_export import export_lite_model, check_lite_parity, parity_inputs
+from src.pipelines.lite_runtime import LiteModel
+from src.pipelines.artifact_store import FALLBACK_PREFIX, artifact_store
+from src.pipelines.sensor_metadata import CALIBRATION_PARAMS_PATH
+from src.components.feature_selection import FeatureSelectionConfig
+from src.components.data_transformation import DataTransformationConfig
 
 
 @dataclass
 class ModelTrainerConfig:
     """Configuration for model trainer"""
     trained_model_file_path: str = os.path.join("artifacts", "model.pkl")
+    lite_model_file_path: str = os.path.join("artifacts", "model_lite.npz")   # NumPy-only export, see lite_runtime
+    n_jobs: int = -1          # worker processes across candidate models
+    cv_n_jobs: int = -1       # parallel CV folds inside each grid search
+    search_mode: str = "grid"           # "grid" or "halving" (successive halving, larger grids)
+    search_budget: Optional[int] = None # halving mode: max sample-fits per model
+    halving_factor: int = 3
 
 
 class ModelTrainer:
@@ -28,14 +42,136 @@ class ModelTrainer:
 
     def __init__(self):
         self.model_trainer_config = ModelTrainerConfig()
+        self.model_report = None
+        self.best_model_name = None
 
-    def initiate_model_trainer(self, X_train, y_train, X_test, y_test, preprocessor_path=None):
+    def get_models_and_params(self):
+        """
+        Candidate models and their hyperparameter grids for the configured search mode
+
+        Returns:
+            (models, params) dicts keyed by model name
+        """
+        halving = self.model_trainer_config.search_mode == "halving"
+
+        # ===== Define candidate models =====
+        models = {
+            "Random Forest": RandomForestClassifier(random_state=42),
+            "Decision Tree": DecisionTreeClassifier(random_state=42),
+            # In halving mode n_estimators is a cap: boosting stops once the validation score stalls
+            "Gradient Boosting": GradientBoostingClassifier(
+                random_state=42,
+                **({"n_iter_no_change": 5, "validation_fraction": 0.1} if halving else {})
+            ),
+            "Logistic Regression": LogisticRegression(max_iter=500),
+            "AdaBoost Classifier": AdaBoostClassifier(random_state=42),
+            "K-Neighbors Classifier": KNeighborsClassifier(),
+        }
+
+        # ===== Hyperparameters =====
+        params = {
+            "Decision Tree": {'criterion': ['gini']},
+            "Random Forest": {'n_estimators': [16, 32], 'criterion': ['gini']},
+            "Gradient Boosting": {'learning_rate': [0.1], 'n_estimators': [16, 32]},
+            "Logistic Regression": {},
+            "AdaBoost Classifier": {'learning_rate': [0.1], 'n_estimators': [16, 32]},
+            "K-Neighbors Classifier": {'n_neighbors': [5, 7]},
+        }
+
+        # Successive halving drops weak configurations on subsamples, so much larger grids fit in the same time
+        if halving:
+            params = {
+                "Decision Tree": {'criterion': ['gini', 'entropy'], 'max_depth': [None, 3, 5, 8, 12],
+                                  'min_samples_leaf': [1, 2, 4, 8]},
+                "Random Forest": {'n_estimators': [16, 32, 64, 128, 256], 'criterion': ['gini', 'entropy'],
+                                  'max_depth': [None, 4, 8, 16], 'min_samples_leaf': [1, 2, 4],
+                                  'max_features': ['sqrt', 'log2', None]},
+                "Gradient Boosting": {'learning_rate': [0.01, 0.05, 0.1, 0.2], 'n_estimators': [32, 64, 128, 256],
+                                      'max_depth': [2, 3, 4], 'subsample': [0.7, 1.0]},
+                "Logistic Regression": {'C': [0.01, 0.1, 1.0, 10.0, 100.0], 'class_weight': [None, 'balanced']},
+                "AdaBoost Classifier": {'learning_rate': [0.05, 0.1, 0.5, 1.0], 'n_estimators': [16, 32, 64, 128]},
+                "K-Neighbors Classifier": {'n_neighbors': [3, 5, 7, 9, 11, 15], 'weights': ['uniform', 'distance'],
+                                           'p': [1, 2]},
+            }
+
+        return models, params
+
+    def export_lite_model(self, preprocessor, model, X_test=None):
+        """
+        Export preprocessor and model for LiteModel and check it reproduces them
+
+        Args:
+            preprocessor : fitted preprocessing pipeline
+            model : fitted best model
+            X_test : optional transformed test features for a model-only parity check
+
+        Returns:
+            Path of the exported bundle
+        """
+        try:
+            path = export_lite_model(preprocessor, model, self.model_trainer_config.lite_model_file_path)
+            lite = LiteModel.load(path)
+
+            if X_test is not None and not np.array_equal(model.predict(X_test), lite.predict(X_test, preprocessed=True)):
+                raise ValueError("Lite model predictions differ from the trained model on the test set")
+            max_diff = check_lite_parity(preprocessor, model, lite, parity_inputs(preprocessor))
+            logger.info(f"Lite model matches the sklearn pipeline (max feature difference {max_diff:.3g})")
+            return path
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def publish(self, preprocessor_path: str, metrics: dict, model_path: str = None,
+                calibration_params_path: str = CALIBRATION_PARAMS_PATH, selected_features_path: str = None,
+                key: str = None) -> str:
+        """
+        Publish model, preprocessor, lite export, calibration params, the
+        selected feature list, the train/test matrices and the fallback
+        model as a new artifact version and make it the one served
+
+        Args:
+            key: run key of the inputs; a version with the same key is reused instead
+
+        Returns:
+            the version id
+        """
+        try:
+            config = self.model_trainer_config
+            files = {
+                "model.pkl": model_path or config.trained_model_file_path,
+                "preprocessor.pkl": preprocessor_path,
+                "calibration_params.pkl": calibration_params_path,
+            }
+            if os.path.exists(config.lite_model_file_path):
+                files["model_lite.npz"] = config.lite_model_file_path
+            selected_features_path = selected_features_path or FeatureSelectionConfig().selected_features_path
+            if os.path.exists(selected_features_path):
+                files["selected_features.json"] = selected_features_path
+            # The incremental trainer continues from the served version's matrices
+            transformation_config = DataTransformationConfig()
+            for name, path in (("train_arr.npy", transformation_config.train_arr_file_path),
+                               ("test_arr.npy", transformation_config.test_arr_file_path)):
+                if os.path.exists(path):
+                    files[name] = path
+            # The fallback model sits next to the preprocessor, in artifacts/ or the version it came from
+            for name in ("preprocessor.pkl", "model.pkl"):
+                path = os.path.join(os.path.dirname(preprocessor_path), FALLBACK_PREFIX + name)
+                if os.path.exists(path):
+                    files[FALLBACK_PREFIX + name] = path
+            feature_names = getattr(load_object(preprocessor_path), "feature_names_in_", None)
+            return artifact_store.publish(files, metrics=metrics, feature_names=feature_names, key=key)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def initiate_model_trainer(self, X_train, y_train, X_test, y_test, preprocessor_path=None, cache=None):
         """
         Initiate model training process
 
         Args:
             X_train, y_train, X_test, y_test : Split train/test data
-            preprocessor_path : Optional, path to saved preprocessor for logging rescaled features.
+            preprocessor_path : Optional, path to saved preprocessor for the lite export.
+            cache : Optional StageCache; unchanged candidate searches are loaded from it
 
         Returns:
             Best model accuracy score on test set
@@ -43,58 +179,26 @@ class ModelTrainer:
         try:
             logger.info("Initiating Model Training")
 
-            # ===== Optional logging of post-rescale values =====
-            if preprocessor_path and os.path.exists(preprocessor_path):
-                try:
-                    logger.info(f"Loading preprocessor from {preprocessor_path} to log rescaled values")
-                    preprocessor = load_object(preprocessor_path)
-
-                    # Expect that your preprocessor pipeline has 'rescale' as the first step
-                    if hasattr(preprocessor, "named_steps") and 'rescale' in preprocessor.named_steps:
-                        # Create a small DataFrame from first few samples
-                        feature_names = [f"Sensor-{i}" for i in range(1, 11)]
-                        # We can't directly log from already-scaled X_train (numpy array), so warn if not DF
-                        logger.info("Note: Logging expected ranges based on calibration parameters")
-                        params = preprocessor.named_steps['rescale'].params_
-                        for ch, p in params.items():
-                            logger.info(f"{ch} scaled to range {p['ymin']}–{p['ymax']} from wafer range {p['xmin']}–{p['xmax']}")
-                    else:
-                        logger.warning("Preprocessor has no 'rescale' step — skipping range log")
-
-                except Exception as e:
-                    logger.warning(f"Could not log rescaled values: {e}")
-
-            # ===== Define candidate models =====
-            models = {
-                "Random Forest": RandomForestClassifier(random_state=42),
-                "Decision Tree": DecisionTreeClassifier(random_state=42),
-                "Gradient Boosting": GradientBoostingClassifier(random_state=42),
-                "Logistic Regression": LogisticRegression(max_iter=500),
-                "AdaBoost Classifier": AdaBoostClassifier(random_state=42),
-                "K-Neighbors Classifier": KNeighborsClassifier(),
-            }
-
-            # ===== Hyperparameters =====
-            params = {
-                "Decision Tree": {'criterion': ['gini']},
-                "Random Forest": {'n_estimators': [16, 32], 'criterion': ['gini']},
-                "Gradient Boosting": {'learning_rate': [0.1], 'n_estimators': [16, 32]},
-                "Logistic Regression": {},
-                "AdaBoost Classifier": {'learning_rate': [0.1], 'n_estimators': [16, 32]},
-                "K-Neighbors Classifier": {'n_neighbors': [5, 7]},
-            }
+            models, params = self.get_models_and_params()
 
             # ===== Evaluate all models =====
             model_report: dict = evaluate_models(
                 X_train=X_train, y_train=y_train,
                 X_test=X_test, y_test=y_test,
-                models=models, param=params
+                models=models, param=params,
+                n_jobs=self.model_trainer_config.n_jobs,
+                cv_n_jobs=self.model_trainer_config.cv_n_jobs,
+                search_mode=self.model_trainer_config.search_mode,
+                search_budget=self.model_trainer_config.search_budget,
+                halving_factor=self.model_trainer_config.halving_factor,
+                cache=cache
             )
 
-            # ===== Select best model =====
-            best_model_score = max(model_report.values())
-            best_model_name = max(model_report, key=model_report.get)
-            best_model = models[best_model_name]
+            # ===== Select best model (already fitted by the search) =====
+            best_model_name = max(model_report, key=lambda name: model_report[name]["test_score"])
+            best_model_score = model_report[best_model_name]["test_score"]
+            best_model = model_report[best_model_name]["model"]
+            self.model_report, self.best_model_name = model_report, best_model_name
 
             if best_model_score < 0.6:
                 raise CustomException("No suitable model found (score < 0.6)")
@@ -113,6 +217,12 @@ class ModelTrainer:
             accuracy = accuracy_score(y_test, y_pred)
             logger.info(f"Final model accuracy on test set: {accuracy}")
 
+            # ===== Lightweight export (preprocessor + model, NumPy only) =====
+            if preprocessor_path and os.path.exists(preprocessor_path):
+                self.export_lite_model(load_object(preprocessor_path), best_model, X_test)
+            else:
+                logger.warning("No preprocessor available — skipping the lite model export")
+
             return accuracy
 
         except Exception as e:
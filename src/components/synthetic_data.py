@@ -0,0 +1,310 @@
+"""
+Synthetic wafer/sensor data for load and scale testing.
+
+    # 2M rows in 4 Parquet files, 15% faulty wafers, channels drifting by 0.5 IQR
+    python -m src.components.synthetic_data generate --rows 2000000 --files 4 \\
+        --output notebooks/data/wafer_synthetic.parquet --fault-rate 0.15 --drift 0.5
+
+    # Push single readings at 200 req/s into a running server for 60 s
+    python -m src.components.synthetic_data replay --url http://127.0.0.1:5000 \\
+        --endpoint /api/v1/predict --rate 200 --duration 60
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import warnings
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.exception import CustomException
+from src.logger import logger, configure_logging
+from src.utils import ChunkedDataFrameWriter
+
+
+@dataclass
+class SyntheticDataConfig:
+    """Configuration for the synthetic data generator"""
+    source_data_path: str = "Water_Sensor_Prediction.csv"
+    output_path: str = os.path.join('artifacts', "synthetic", "wafer_synthetic.parquet")
+    target_column: str = "Good/Bad"
+    id_column: str = "Unnamed: 0"
+    n_quantiles: int = 101             # points of the per-class empirical CDF kept per channel
+    chunksize: int = 100_000
+    fault_rate: Optional[float] = None # share of faulty (-1) wafers; None keeps the source balance
+    drift: float = 0.0                 # total shift across the run, in channel IQRs
+    seed: int = 42
+
+
+def _nanquantile(X: np.ndarray, probs) -> np.ndarray:
+    with warnings.catch_warnings():
+        # All-NaN channels give NaN quantiles; they are always missing anyway
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanquantile(X, probs, axis=0)
+
+
+class SyntheticDataGenerator:
+    """
+    Learns per-class, per-channel distributions from a wafer table and
+    samples new rows from them.
+
+    Each channel is sampled by inverse-CDF interpolation between empirical
+    quantiles of its class, and cells are dropped at that class's observed
+    missing rate. Channels are sampled independently: the marginals, class
+    balance and missingness match the source, cross-channel correlations do not.
+    """
+
+    def __init__(self, config: SyntheticDataConfig = None):
+        self.config = config or SyntheticDataConfig()
+        self._rng = np.random.default_rng(self.config.seed)
+
+    def fit(self, df: pd.DataFrame) -> "SyntheticDataGenerator":
+        try:
+            config = self.config
+            self.columns_ = [c for c in df.columns if c.startswith("Sensor-")]
+            X = df[self.columns_].to_numpy(dtype=float)
+            y = df[config.target_column].to_numpy()
+
+            probs = np.linspace(0.0, 1.0, config.n_quantiles)
+            self.classes_ = np.unique(y)
+            self.class_balance_ = {}
+            self.quantiles_ = {}
+            self.missing_rate_ = {}
+            for cls in self.classes_:
+                X_cls = X[y == cls]
+                self.class_balance_[cls] = len(X_cls) / len(X)
+                self.quantiles_[cls] = _nanquantile(X_cls, probs)
+                self.missing_rate_[cls] = np.isnan(X_cls).mean(axis=0)
+
+            q25, q75 = _nanquantile(X, [0.25, 0.75])
+            iqr = np.nan_to_num(q75 - q25)
+            self.scale_ = np.where(iqr > 0, iqr, 1.0)
+            logger.info(
+                f"Fitted synthetic data generator on {len(X)} rows, {len(self.columns_)} channels, "
+                f"class balance {self.class_balance_}"
+            )
+            return self
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _class_probs(self) -> dict:
+        fault_rate = self.config.fault_rate
+        if fault_rate is None or set(self.classes_) != {-1, 1}:
+            return self.class_balance_
+        return {-1: fault_rate, 1: 1.0 - fault_rate}
+
+    def generate_chunk(self, n_rows: int, start: int = 0, total: int = None) -> pd.DataFrame:
+        """
+        Sample n_rows wafers, numbered from start.
+
+        Args:
+            total: length of the whole run, for the drift ramp (defaults to start + n_rows)
+        """
+        try:
+            rng = self._rng
+            config = self.config
+            classes = np.array(list(self._class_probs()))
+            labels = rng.choice(classes, size=n_rows, p=list(self._class_probs().values()))
+
+            n_channels = len(self.columns_)
+            values = np.empty((n_rows, n_channels))
+            cols = np.arange(n_channels)
+            steps = config.n_quantiles - 1
+            for cls in classes:
+                rows = np.flatnonzero(labels == cls)
+                if not rows.size:
+                    continue
+                q = self.quantiles_[cls]
+                pos = rng.random((rows.size, n_channels)) * steps
+                lo = np.minimum(pos.astype(np.int64), steps - 1)
+                frac = pos - lo
+                sample = q[lo, cols] + frac * (q[lo + 1, cols] - q[lo, cols])
+                sample[rng.random(sample.shape) < self.missing_rate_[cls]] = np.nan
+                values[rows] = sample
+
+            if config.drift:
+                total = total or (start + n_rows)
+                ramp = (start + np.arange(n_rows)) / max(total - 1, 1)
+                values += config.drift * ramp[:, None] * self.scale_
+
+            df = pd.DataFrame(values, columns=self.columns_)
+            df.insert(0, config.id_column, [f"Wafer-{i}" for i in range(start, start + n_rows)])
+            df[config.target_column] = labels
+            return df
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def initiate_generation(self, n_rows: int, output_path: str = None, n_files: int = 1) -> list:
+        """
+        Write n_rows synthetic wafers in chunks, split over n_files files.
+
+        The format follows the extension of output_path (.parquet or .csv);
+        with several files, a _partNNN suffix is added to each name.
+
+        Returns:
+            list of written file paths
+        """
+        logger.info("Entered the synthetic data generation method")
+        try:
+            config = self.config
+            if not hasattr(self, "columns_"):
+                self.fit(pd.read_csv(config.source_data_path))
+
+            output_path = output_path or config.output_path
+            stem, ext = os.path.splitext(output_path)
+            per_file = -(-n_rows // n_files)
+            paths, start = [], 0
+            for part in range(n_files):
+                path = output_path if n_files == 1 else f"{stem}_part{part:03d}{ext}"
+                writer = ChunkedDataFrameWriter(path)
+                try:
+                    stop = min(start + per_file, n_rows)
+                    while start < stop:
+                        size = min(config.chunksize, stop - start)
+                        writer.write(self.generate_chunk(size, start=start, total=n_rows))
+                        start += size
+                finally:
+                    writer.close()
+                paths.append(writer.file_path)
+                logger.info(f"Wrote {writer.rows} synthetic rows to {writer.file_path}")
+            return paths
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+def to_water_units(df: pd.DataFrame, calibration_params: dict) -> pd.DataFrame:
+    """Map wafer channels to water-property units with the calibration params, as clients would send them"""
+    out = df.copy()
+    for ch, p in calibration_params.items():
+        if ch in out.columns:
+            denom = (p["xmax"] - p["xmin"]) if p["xmax"] != p["xmin"] else 1.0
+            out[ch] = (out[ch] - p["xmin"]) * (p["ymax"] - p["ymin"]) / denom + p["ymin"]
+    return out
+
+
+def replay(generator: SyntheticDataGenerator, url: str, endpoint: str = "/api/v1/predict",
+           rate: float = 50.0, duration: float = 10.0, batch_size: int = 1, concurrency: int = 16,
+           calibration_params_path: str = os.path.join('artifacts', "calibration_params.pkl"),
+           timeout: float = 10.0) -> dict:
+    """
+    Push synthetic readings into a prediction endpoint at a target request rate.
+
+    Requests are released on a fixed schedule (open loop), so a slow server
+    shows up as latency and errors rather than as a lower send rate.
+    /predictdata gets one form-encoded reading per request; the JSON APIs
+    (/api/v1/predict, /api/v1/ingest) get batch_size readings.
+
+    Returns:
+        summary with achieved rate, status-code counts and latency percentiles
+    """
+    sensor_cols = [f"Sensor-{i}" for i in range(1, 11)]
+    n_requests = max(int(rate * duration), 1)
+    per_request = 1 if endpoint == "/predictdata" else batch_size
+    readings = generator.generate_chunk(n_requests * per_request)[sensor_cols]
+    if os.path.exists(calibration_params_path):
+        readings = to_water_units(readings, joblib.load(calibration_params_path))
+    values = readings.to_numpy()
+    target = url.rstrip("/") + endpoint
+
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+
+    def send(i: int):
+        block = values[i * per_request:(i + 1) * per_request]
+        if endpoint == "/predictdata":
+            # The form has no way to send a missing reading
+            form = {f"sensor_{j + 1}": ("" if np.isnan(v) else repr(float(v))) for j, v in enumerate(block[0])}
+            data = urllib.parse.urlencode(form).encode()
+            headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        else:
+            rows = [{c: float(v) for c, v in zip(sensor_cols, row) if not np.isnan(v)} for row in block]
+            data = json.dumps(rows).encode()
+            headers = {"Content-Type": "application/json"}
+
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(urllib.request.Request(target, data=data, headers=headers),
+                                        timeout=timeout) as response:
+                response.read()
+                status = str(response.status)
+        except urllib.error.HTTPError as e:
+            status = str(e.code)
+        except Exception as e:
+            status = type(e).__name__
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    logger.info(f"Replaying {n_requests} requests to {target} at {rate}/s")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i in range(n_requests):
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, i)
+    elapsed = time.perf_counter() - started
+
+    lat = np.asarray(latencies)
+    return {
+        "endpoint": endpoint,
+        "requests": n_requests,
+        "readings": n_requests * per_request,
+        "target_rate": rate,
+        "achieved_rate": n_requests / elapsed,
+        "status_counts": statuses,
+        "latency_s": {
+            "p50": float(np.percentile(lat, 50)),
+            "p95": float(np.percentile(lat, 95)),
+            "p99": float(np.percentile(lat, 99)),
+            "max": float(lat.max()),
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=SyntheticDataConfig.source_data_path)
+    parser.add_argument("--fault-rate", type=float, default=None)
+    parser.add_argument("--drift", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gen = sub.add_parser("generate", help="write synthetic wafers to CSV/Parquet")
+    gen.add_argument("--rows", type=int, required=True)
+    gen.add_argument("--output", default=SyntheticDataConfig.output_path)
+    gen.add_argument("--files", type=int, default=1)
+    gen.add_argument("--chunksize", type=int, default=SyntheticDataConfig.chunksize)
+
+    rep = sub.add_parser("replay", help="push synthetic readings into a running server")
+    rep.add_argument("--url", default="http://127.0.0.1:5000")
+    rep.add_argument("--endpoint", default="/api/v1/predict",
+                     choices=["/api/v1/predict", "/api/v1/ingest", "/predictdata"])
+    rep.add_argument("--rate", type=float, default=50.0, help="requests per second")
+    rep.add_argument("--duration", type=float, default=10.0, help="seconds")
+    rep.add_argument("--batch-size", type=int, default=1, help="readings per JSON request")
+    rep.add_argument("--concurrency", type=int, default=16)
+
+    args = parser.parse_args()
+    configure_logging()
+    config = SyntheticDataConfig(source_data_path=args.source, fault_rate=args.fault_rate,
+                                 drift=args.drift, seed=args.seed)
+    if args.command == "generate":
+        config.chunksize = args.chunksize
+        SyntheticDataGenerator(config).initiate_generation(args.rows, args.output, args.files)
+    else:
+        generator = SyntheticDataGenerator(config).fit(pd.read_csv(config.source_data_path))
+        summary = replay(generator, args.url, args.endpoint, args.rate, args.duration,
+                         args.batch_size, args.concurrency)
+        print(json.dumps(summary, indent=2))
@@ -1,6 +1,6 @@
 import sys
 import os
-from src.logger import logger
+from src.logger import logger, configure_logging
 
 def error_message_detail(error, error_detail: sys):
     """
@@ -14,6 +14,16 @@ def error_message_detail(error, error_detail: sys):
     return error_message
 
 
+def client_message(error: Exception) -> str:
+    """
+    Text of the original error, without the script path and line number
+    CustomException adds; safe to return to API clients
+    """
+    while isinstance(error, CustomException) and error.args:
+        error = error.args[0]
+    return str(error)
+
+
 class CustomException(Exception):
     """
     Custom exception class for water sensor fault detection
@@ -27,6 +37,7 @@ class CustomException(Exception):
 
 
 if __name__ == "__main__":
+    configure_logging()
     try:
         a = 1/0
     except Exception as e:
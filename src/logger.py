@@ -1,29 +1,159 @@
+import os
 import sys
+import queue
+import atexit
 import logging
-from datetime import datetime
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, WatchedFileHandler
 
 # Configure logging format
 logging_str = "[%(asctime)s: %(levelname)s: %(module)s]: %(message)s"
 
-# Create logs directory if it doesn't exist
-import os
-log_dir = "logs"
-os.makedirs(log_dir, exist_ok=True)
-
-log_filepath = os.path.join(log_dir, f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log")
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format=logging_str,
-    
-    handlers=[
-        logging.FileHandler(log_filepath),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+DEFAULT_LOG_FILE = os.path.join("logs", "water_sensor.log")
 
+# Importing this module only creates the logger; handlers are attached by
+# configure_logging(), called once from each entry point
 logger = logging.getLogger("WaterSensorLogger")
 
+_lock = threading.Lock()
+_handlers = []           # handlers installed on the root logger by configure_logging
+_listener = None
+_listener_handlers = []
+
+
+class _LocalQueueHandler(QueueHandler):
+    """QueueHandler for an in-process queue: records are not pickled, so the
+    formatting (timestamps, tracebacks) is left to the writer thread"""
+
+    def prepare(self, record):
+        # Resolve %-args now so later mutation of the arguments cannot change the message
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def _start_listener(log_queue: queue.Queue):
+    global _listener
+    _listener = QueueListener(log_queue, *_listener_handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()       # drains the queue before returning
+        _listener = None
+
+
+def _watched(handler: RotatingFileHandler) -> WatchedFileHandler:
+    watched = WatchedFileHandler(handler.baseFilename)
+    watched.setFormatter(handler.formatter)
+    watched.setLevel(handler.level)
+    return watched
+
+
+def _detach_rotation_after_fork():
+    # A RotatingFileHandler inherited by several processes makes each of them
+    # rotate the same file on its own, clobbering the others' records. Children
+    # append through a WatchedFileHandler instead, which reopens the file once
+    # the parent (or logrotate) has rotated it
+    global _handlers, _listener_handlers
+    root = logging.getLogger()
+    for i, handler in enumerate(_handlers):
+        if isinstance(handler, RotatingFileHandler):
+            root.removeHandler(handler)
+            _handlers[i] = _watched(handler)
+            root.addHandler(_handlers[i])
+    _listener_handlers = [_watched(h) if isinstance(h, RotatingFileHandler) else h for h in _listener_handlers]
+
+
+def _restart_listener_after_fork():
+    _detach_rotation_after_fork()
+    # The writer thread does not survive fork(); give each child its own thread
+    # and a fresh queue (the inherited one still lists the dead thread as a waiter)
+    if _listener is not None:
+        log_queue = queue.Queue(-1)
+        for handler in _handlers:
+            handler.queue = log_queue
+        _start_listener(log_queue)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+
+def configure_logging(mode: str = None, level=None, log_file: str = None, rotation: str = None,
+                      max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5, force: bool = False):
+    """
+    Attach the stdout and rotating-file handlers to the root logger.
+
+    Args:
+        mode: "sync" writes from the calling thread; "async" only enqueues the
+              record and a single QueueListener thread does the formatting and
+              I/O. Defaults to $LOG_MODE, then "sync".
+        level: root log level, defaults to $LOG_LEVEL, then INFO.
+        log_file: rotating log file, defaults to $LOG_FILE, then logs/water_sensor.log.
+                  An empty string logs to stdout only. Under gunicorn.conf.py $LOG_FILE
+                  defaults to empty.
+        rotation: "size" rotates log_file at max_bytes, keeping backup_count files;
+                  "external" only appends and reopens the file when logrotate (or
+                  similar) has moved it. Defaults to $LOG_ROTATION, then "size".
+                  Forked child processes always append without rotating.
+        max_bytes, backup_count: size-based rotation of log_file.
+        force: replace an earlier configuration; otherwise repeated calls are no-ops.
+    """
+    global _handlers, _listener_handlers
+
+    with _lock:
+        if _handlers and not force:
+            return logger
+
+        mode = mode or os.environ.get("LOG_MODE", "sync")
+        if mode not in ("sync", "async"):
+            raise ValueError(f"Unknown logging mode {mode!r}, expected 'sync' or 'async'")
+        level = level or os.environ.get("LOG_LEVEL", "INFO")
+        if log_file is None:
+            log_file = os.environ.get("LOG_FILE", DEFAULT_LOG_FILE)
+        rotation = rotation or os.environ.get("LOG_ROTATION", "size")
+        if rotation not in ("size", "external"):
+            raise ValueError(f"Unknown log rotation {rotation!r}, expected 'size' or 'external'")
+
+        root = logging.getLogger()
+        for handler in _handlers:
+            root.removeHandler(handler)
+        _stop_listener()
+        for handler in _listener_handlers:
+            handler.close()
+
+        formatter = logging.Formatter(logging_str)
+        sinks = [logging.StreamHandler(sys.stdout)]
+        if log_file:
+            os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+            if rotation == "size":
+                sinks.append(RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count))
+            else:
+                sinks.append(WatchedFileHandler(log_file))
+        for handler in sinks:
+            handler.setFormatter(formatter)
+
+        if mode == "async":
+            log_queue = queue.Queue(-1)
+            _listener_handlers = sinks
+            _handlers = [_LocalQueueHandler(log_queue)]
+            _start_listener(log_queue)
+        else:
+            _listener_handlers = []
+            _handlers = sinks
+
+        for handler in _handlers:
+            root.addHandler(handler)
+        root.setLevel(level)
+        return logger
+
+
+atexit.register(_stop_listener)
+
+
 if __name__ == "__main__":
-    logger.info("Logging has started")
\ No newline at end of file
+    configure_logging()
+    logger.info("Logging has started")
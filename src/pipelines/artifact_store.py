@@ -0,0 +1,273 @@
+"""
+Versioned artifact store: every training run is published as its own directory.
+
+    artifacts/versions/
+        CURRENT                                   id of the version being served
+        20261016T234501Z-3f2a9c1b0d4e/
+            manifest.json                         hashes, metrics, feature list, parent version, run key
+            model.pkl  preprocessor.pkl  model_lite.npz  calibration_params.pkl
+            fallback_model.pkl  fallback_preprocessor.pkl   Sensor-1..10 model on water-property units
+            train_arr.npy  test_arr.npy           matrices the model was trained and evaluated on
+
+A version directory is complete before it appears: it is written under a
+temporary name and renamed into place. Publishing then replaces CURRENT
+with os.replace, so a reader sees either the old version id or the new one,
+never a mix. Serving resolves artifact paths through CURRENT on every
+batch, which makes a new version (or a rollback) live without a restart.
+
+A publish can carry a run key, a fingerprint of everything the run was
+built from. Publishing a key that an existing version already has does not
+create a new directory: that version becomes CURRENT instead, so re-running
+an unchanged pipeline does not push older versions out of the history.
+
+    python -m src.pipelines.artifact_store list
+    python -m src.pipelines.artifact_store rollback            # to the version before CURRENT
+    python -m src.pipelines.artifact_store promote <version>
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import threading
+from dataclasses import dataclass
+from typing import List, Optional
+
+from src.exception import CustomException
+from src.logger import logger
+from src.pipelines.model_registry import file_sha256
+
+LEGACY_ARTIFACTS_DIR = "artifacts"
+MANIFEST_NAME = "manifest.json"
+# Preprocessor and model trained on the water-property channels only, for clients that send just those
+FALLBACK_PREFIX = "fallback_"
+
+
+@dataclass
+class ArtifactStoreConfig:
+    """Configuration for the versioned artifact store"""
+    root: str = os.path.join('artifacts', "versions")
+    keep_versions: int = 10          # older versions are pruned after a publish (CURRENT is always kept)
+
+
+class ArtifactStore:
+    """Immutable version directories plus an atomically switched CURRENT pointer"""
+
+    def __init__(self, config: ArtifactStoreConfig = None):
+        self.config = config or ArtifactStoreConfig()
+        self._lock = threading.Lock()
+        self._pointer_state = None       # (inode, mtime_ns) of CURRENT when last read
+        self._current = None
+
+    @property
+    def pointer_path(self) -> str:
+        return os.path.join(self.config.root, "CURRENT")
+
+    def version_dir(self, version: str) -> str:
+        return os.path.join(self.config.root, version)
+
+    def current_version(self) -> Optional[str]:
+        """Version id in CURRENT, re-read only when the pointer file was replaced"""
+        try:
+            stat = os.stat(self.pointer_path)
+        except FileNotFoundError:
+            return None
+        state = (stat.st_ino, stat.st_mtime_ns)
+        with self._lock:
+            if state != self._pointer_state:
+                with open(self.pointer_path) as file_obj:
+                    self._current = file_obj.read().strip() or None
+                self._pointer_state = state
+            return self._current
+
+    def current_dir(self) -> Optional[str]:
+        version = self.current_version()
+        return self.version_dir(version) if version else None
+
+    def resolve(self, name: str) -> str:
+        """Path of artifact name in the current version, or under artifacts/ before the first publish"""
+        version_dir = self.current_dir()
+        return os.path.join(version_dir or LEGACY_ARTIFACTS_DIR, name)
+
+    def manifest(self, version: str) -> dict:
+        with open(os.path.join(self.version_dir(version), MANIFEST_NAME)) as file_obj:
+            return json.load(file_obj)
+
+    def list_versions(self) -> List[dict]:
+        """Manifests of all published versions, oldest first"""
+        if not os.path.isdir(self.config.root):
+            return []
+        manifests = []
+        for name in os.listdir(self.config.root):
+            if os.path.exists(os.path.join(self.version_dir(name), MANIFEST_NAME)):
+                manifests.append(self.manifest(name))
+        return sorted(manifests, key=lambda m: m["created_at"])
+
+    def find_key(self, key: str) -> Optional[str]:
+        """Newest version published with run key key, preferring CURRENT"""
+        current = self.current_version()
+        matches = [m["version"] for m in self.list_versions() if m.get("key") == key]
+        if current in matches:
+            return current
+        return matches[-1] if matches else None
+
+    def publish(self, files: dict, metrics: dict = None, feature_names: list = None,
+                make_current: bool = True, key: str = None) -> str:
+        """
+        Copy files into a new version directory and point CURRENT at it
+
+        Args:
+            files: artifact name -> path of the file to copy, e.g. {"model.pkl": "artifacts/model.pkl"}
+            metrics: scores and run details to record in the manifest
+            feature_names: input columns the preprocessor expects
+            make_current: switch serving to the new version right away
+            key: run key; if a version already has it, that version is reused
+
+        Returns:
+            the new (or reused) version id
+        """
+        try:
+            if key is not None:
+                existing = self.find_key(key)
+                if existing is not None:
+                    logger.info(f"Nothing changed since artifact version {existing}; not publishing a new one")
+                    if make_current and existing != self.current_version():
+                        self.set_current(existing)
+                    return existing
+
+            os.makedirs(self.config.root, exist_ok=True)
+            hashes = {name: file_sha256(path) for name, path in files.items()}
+            # Content id: the same artifacts always get the same suffix
+            content = hashlib.sha256(json.dumps(hashes, sort_keys=True).encode()).hexdigest()
+            version = f"{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}-{content[:12]}"
+            manifest = {
+                "version": version,
+                "created_at": time.time(),
+                "parent": self.current_version(),
+                "files": {name: {"sha256": hashes[name], "size": os.path.getsize(path)}
+                          for name, path in files.items()},
+                "metrics": metrics or {},
+                "feature_names": list(feature_names) if feature_names is not None else None,
+                "key": key,
+            }
+
+            tmp_dir = os.path.join(self.config.root, f".{version}.{os.getpid()}.tmp")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+            for name, path in files.items():
+                self._place(path, os.path.join(tmp_dir, name))
+            with open(os.path.join(tmp_dir, MANIFEST_NAME), "w") as file_obj:
+                json.dump(manifest, file_obj, indent=2)
+            if os.path.exists(self.version_dir(version)):
+                # Same artifacts published twice within a second: the directory already holds them
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            else:
+                os.replace(tmp_dir, self.version_dir(version))
+            logger.info(f"Published artifact version {version} ({', '.join(files)})")
+
+            if make_current:
+                self.set_current(version)
+            self.prune()
+            return version
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def _place(path: str, dst: str):
+        """
+        Copy path to dst; training matrices are hard-linked instead
+
+        The .npy matrices can be large and are only ever replaced (written
+        under a temporary name and renamed), never modified in place, so a
+        link keeps the version's copy intact without duplicating the data.
+        """
+        if path.endswith(".npy"):
+            try:
+                os.link(path, dst)
+                return
+            except OSError:
+                pass
+        shutil.copyfile(path, dst)
+
+    def verify(self, version: str):
+        """Raise if a file of version is missing or its hash differs from the manifest"""
+        manifest = self.manifest(version)
+        for name, info in manifest["files"].items():
+            path = os.path.join(self.version_dir(version), name)
+            if not os.path.exists(path) or file_sha256(path) != info["sha256"]:
+                raise ValueError(f"Artifact {name} of version {version} is missing or corrupted")
+
+    def set_current(self, version: str):
+        """Atomically point CURRENT at an existing, verified version"""
+        try:
+            self.verify(version)
+            tmp_path = f"{self.pointer_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as file_obj:
+                file_obj.write(version + "\n")
+                file_obj.flush()
+                os.fsync(file_obj.fileno())
+            os.replace(tmp_path, self.pointer_path)
+            logger.info(f"CURRENT artifact version is now {version}")
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def rollback(self, to: str = None) -> str:
+        """Point CURRENT at version to, or at the newest version older than the current one"""
+        try:
+            if to is None:
+                current = self.current_version()
+                versions = [m["version"] for m in self.list_versions()]
+                older = versions[:versions.index(current)] if current in versions else []
+                if not older:
+                    raise ValueError("No earlier version to roll back to")
+                to = older[-1]
+            self.set_current(to)
+            return to
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def prune(self) -> List[str]:
+        """Delete the oldest versions beyond keep_versions, never the current one"""
+        current = self.current_version()
+        versions = [m["version"] for m in self.list_versions()]
+        removed = [v for v in versions[:max(0, len(versions) - self.config.keep_versions)] if v != current]
+        for version in removed:
+            shutil.rmtree(self.version_dir(version), ignore_errors=True)
+        if removed:
+            logger.info(f"Pruned artifact versions {removed}")
+        return removed
+
+
+# One store per process; serving resolves artifact paths through it
+artifact_store = ArtifactStore()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="published versions, oldest first (* = CURRENT)")
+    sub.add_parser("current", help="print the CURRENT version id")
+    rollback = sub.add_parser("rollback", help="switch CURRENT to the previous version")
+    rollback.add_argument("--to", help="version id to switch to instead of the previous one")
+    promote = sub.add_parser("promote", help="switch CURRENT to a given version")
+    promote.add_argument("version")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        current = artifact_store.current_version()
+        for m in artifact_store.list_versions():
+            marker = "*" if m["version"] == current else " "
+            metrics = {k: v for k, v in m["metrics"].items() if k != "batches"}
+            print(f"{marker} {m['version']}  {json.dumps(metrics, sort_keys=True)}")
+    elif args.command == "current":
+        print(artifact_store.current_version() or "(none published)")
+    elif args.command == "rollback":
+        print(artifact_store.rollback(args.to))
+    else:
+        artifact_store.set_current(args.version)
+        print(args.version)
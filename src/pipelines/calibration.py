@@ -3,6 +3,9 @@ import joblib
 import sys
 from sklearn.base import TransformerMixin, BaseEstimator
 from src.exception import CustomException
+# Re-exported: the ranges live in a module without sklearn so serving can import them cheaply
+from src.pipelines.water_properties import WATER_PROPERTY_RANGES, build_calibration_params  # noqa: F401
+
 
 class RescaleToWaterProperty(BaseEstimator, TransformerMixin):
     def __init__(self, param_path="artifacts/calibration_params.pkl"):
@@ -27,6 +30,9 @@ class RescaleToWaterProperty(BaseEstimator, TransformerMixin):
             # Work on a copy
             df = X.copy()
             for ch, p in self.params_.items():
+                # Channels left out by feature selection have no column to rescale
+                if ch not in df.columns:
+                    continue
                 xmin, xmax = p["xmin"], p["xmax"]
                 ymin, ymax = p["ymin"], p["ymax"]
                 denom = (xmax - xmin) if xmax != xmin else 1.0
@@ -0,0 +1,105 @@
+import sys
+import numpy as np
+import pandas as pd
+
+from src.exception import CustomException
+from src.logger import logger
+from src.utils import load_object
+
+
+class CompiledPreprocessor:
+    """
+    Fitted rescale -> KNN imputer -> RobustScaler pipeline folded into NumPy.
+
+    Rescale and robust-scale become one affine pass over all columns at once
+    (per-column coefficient vectors), and the KNN imputer is only called for
+    the rows that actually contain NaNs. The element-wise operations are
+    applied in exactly the order the sklearn steps use, so the output is
+    bit-for-bit identical to pipeline.transform().
+    """
+
+    def __init__(self, pipeline):
+        rescale = pipeline.named_steps["rescale"]
+        self.imputer = pipeline.named_steps["imputer"]
+        scaler = pipeline.named_steps["scaler"]
+
+        self.feature_names_in_ = list(rescale.feature_names_in_)
+        n_features = len(self.feature_names_in_)
+
+        # Rescale: ((x - xmin) * (ymax - ymin) / denom) + ymin, identity for uncalibrated columns
+        self.xmin_ = np.zeros(n_features)
+        self.yrange_ = np.ones(n_features)
+        self.denom_ = np.ones(n_features)
+        self.ymin_ = np.zeros(n_features)
+        for ch, p in rescale.params_.items():
+            if ch not in self.feature_names_in_:
+                continue
+            j = self.feature_names_in_.index(ch)
+            xmin, xmax = p["xmin"], p["xmax"]
+            ymin, ymax = p["ymin"], p["ymax"]
+            self.xmin_[j] = xmin
+            self.yrange_[j] = ymax - ymin
+            self.denom_[j] = (xmax - xmin) if xmax != xmin else 1.0
+            self.ymin_[j] = ymin
+
+        # RobustScaler: (x - center) / scale
+        self.center_ = scaler.center_ if scaler.with_centering else np.zeros(n_features)
+        self.scale_ = scaler.scale_ if scaler.with_scaling else np.ones(n_features)
+
+    @staticmethod
+    def is_compilable(pipeline) -> bool:
+        """True for the rescale/imputer/scaler pipeline built by DataTransformation"""
+        steps = getattr(pipeline, "named_steps", {})
+        if list(steps) != ["rescale", "imputer", "scaler"]:
+            return False
+        imputer = steps["imputer"]
+        # Dropped all-NaN columns or missing indicators change the output shape
+        return not getattr(imputer, "add_indicator", False) and bool(np.all(imputer._valid_mask))
+
+    def transform(self, X) -> np.ndarray:
+        try:
+            if hasattr(X, "columns"):
+                X = X[self.feature_names_in_].to_numpy(dtype=float)
+
+            out = np.subtract(X, self.xmin_, dtype=float)
+            out *= self.yrange_
+            out /= self.denom_
+            out += self.ymin_
+
+            nan_rows = np.isnan(out).any(axis=1)
+            if nan_rows.any():
+                out[nan_rows] = self.imputer.transform(
+                    pd.DataFrame(out[nan_rows], columns=self.feature_names_in_)
+                )
+
+            out -= self.center_
+            out /= self.scale_
+            return out
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+def compile_preprocessor(pipeline):
+    """Return a CompiledPreprocessor for pipeline, or pipeline itself if it cannot be compiled"""
+    if CompiledPreprocessor.is_compilable(pipeline):
+        return CompiledPreprocessor(pipeline)
+    logger.warning("Preprocessor layout not recognised — serving the sklearn pipeline as is")
+    return pipeline
+
+
+def load_compiled_preprocessor(file_path: str):
+    """Registry loader: unpickle the preprocessor and compile it"""
+    return compile_preprocessor(load_object(file_path))
+
+
+def check_parity(pipeline, compiled, X) -> bool:
+    """Raise if compiled.transform(X) differs from pipeline.transform(X) in any element"""
+    try:
+        expected = np.asarray(pipeline.transform(X), dtype=float)
+        actual = compiled.transform(X)
+        if expected.shape != actual.shape or not np.array_equal(expected, actual, equal_nan=True):
+            raise ValueError("Compiled preprocessor output differs from the sklearn pipeline")
+        return True
+    except Exception as e:
+        raise CustomException(e, sys)
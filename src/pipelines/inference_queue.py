@@ -0,0 +1,359 @@
+import os
+import json
+import time
+import uuid
+import queue
+import socket
+import sqlite3
+import ipaddress
+import threading
+import http.client
+import urllib.parse
+import urllib.request
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+import pandas as pd
+
+from src.logger import logger
+from src.exception import client_message
+from src.pipelines.metrics import Histogram, LATENCY_BUCKETS
+
+
+@dataclass
+class InferenceQueueConfig:
+    """Configuration for the asynchronous ingest queue"""
+    results_db_path: str = os.path.join('artifacts', "inference_results.db")
+    max_queue_size: int = 1000      # pending jobs per worker process before ingest returns 429
+    n_workers: int = 2
+    retry_after_s: int = 1          # Retry-After hint sent with 429 responses
+    callback_timeout_s: float = 5.0
+    # Hosts callbacks may go to (CALLBACK_ALLOWED_HOSTS, comma-separated). Listed hosts are trusted
+    # as they are; when the list is empty, any host that resolves only to public addresses is allowed
+    callback_allowed_hosts: tuple = field(default_factory=lambda: tuple(
+        h.strip().lower() for h in os.environ.get("CALLBACK_ALLOWED_HOSTS", "").split(",") if h.strip()
+    ))
+    result_ttl_s: float = 24 * 3600    # finished jobs are deleted this long after completion
+    stale_job_s: float = 600           # queued/running jobs older than this are marked expired
+    sweep_interval_s: float = 60
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Refuse redirects, so a validated callback URL cannot bounce to another host"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def _pinned(connection_class, address: str):
+    """Connection factory for urllib handlers: connect to address, whatever the host resolves to now"""
+    def connect(host, **kwargs):
+        conn = connection_class(host, **kwargs)
+        # Host header, SNI and certificate checks still use the URL's host name
+        conn._create_connection = lambda addr, *args: socket.create_connection((address, addr[1]), *args)
+        return conn
+    return connect
+
+
+class _PinnedHTTPHandler(urllib.request.HTTPHandler):
+    def __init__(self, address: str):
+        super().__init__()
+        self.address = address
+
+    def http_open(self, req):
+        return self.do_open(_pinned(http.client.HTTPConnection, self.address), req)
+
+
+class _PinnedHTTPSHandler(urllib.request.HTTPSHandler):
+    def __init__(self, address: str):
+        super().__init__()
+        self.address = address
+
+    def https_open(self, req):
+        return self.do_open(_pinned(http.client.HTTPSConnection, self.address), req, context=self._context)
+
+
+def callback_opener(address: Optional[str] = None) -> urllib.request.OpenerDirector:
+    """
+    Opener for callbacks: no redirects, no proxies from the environment, and
+    when address is given, connections go to that (validated) address only,
+    so the host cannot be re-resolved to an internal one (DNS rebinding)
+    """
+    handlers = [urllib.request.ProxyHandler({}), _NoRedirect]
+    if address is not None:
+        handlers += [_PinnedHTTPHandler(address), _PinnedHTTPSHandler(address)]
+    return urllib.request.build_opener(*handlers)
+
+
+def validate_callback_url(url: str, allowed_hosts: tuple = ()) -> str:
+    """
+    Raise ValueError unless url is http(s) and may be called back.
+
+    Hosts in allowed_hosts are accepted as they are. Otherwise every address
+    the host resolves to must be public: loopback, link-local (e.g. cloud
+    metadata at 169.254.169.254), private, reserved and multicast addresses
+    are refused.
+    """
+    resolve_callback_url(url, allowed_hosts)
+    return url
+
+
+def resolve_callback_url(url: str, allowed_hosts: tuple = ()) -> Optional[str]:
+    """
+    Validate url like validate_callback_url and return the address to connect
+    to (None for a host in allowed_hosts, which is resolved normally)
+    """
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("callback_url must be an http(s) URL")
+    host = parts.hostname.lower()
+    if allowed_hosts:
+        if host not in allowed_hosts:
+            raise ValueError(f"callback_url host {host!r} is not in the allowed callback hosts")
+        return None
+    try:
+        infos = socket.getaddrinfo(host, parts.port or (443 if parts.scheme == "https" else 80),
+                                   type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise ValueError(f"callback_url host {host!r} does not resolve: {e}")
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not address.is_global or address.is_multicast:
+            raise ValueError(f"callback_url host {host!r} resolves to a non-public address ({address})")
+    return infos[0][4][0]
+
+
+class ResultStore:
+    """
+    SQLite table of ingest jobs and their results.
+
+    The database file is shared by all gunicorn workers, so a job queued in
+    one worker can be polled through any other.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    n_rows INTEGER NOT NULL,
+                    submitted_at REAL NOT NULL,
+                    completed_at REAL,
+                    callback_url TEXT,
+                    callback_status TEXT,
+                    result TEXT,
+                    error TEXT
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_completed_at ON jobs (completed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_submitted_at ON jobs (status, submitted_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread (and per process: connections do not survive fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def add(self, job_id: str, n_rows: int, callback_url: Optional[str]):
+        self._connect().execute(
+            "INSERT INTO jobs (job_id, status, n_rows, submitted_at, callback_url) VALUES (?, 'queued', ?, ?, ?)",
+            (job_id, n_rows, time.time(), callback_url),
+        )
+
+    def update(self, job_id: str, **fields):
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        self._connect().execute(f"UPDATE jobs SET {columns} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def sweep(self, result_ttl_s: float, stale_job_s: float) -> tuple:
+        """
+        Expire jobs left queued/running (e.g. by a worker process that died) and
+        delete finished jobs older than result_ttl_s. Returns (expired, deleted).
+        """
+        now = time.time()
+        conn = self._connect()
+        expired = conn.execute(
+            "UPDATE jobs SET status = 'expired', completed_at = ?, error = 'not finished in time' "
+            "WHERE status IN ('queued', 'running') AND submitted_at < ?",
+            (now, now - stale_job_s),
+        ).rowcount
+        deleted = conn.execute(
+            "DELETE FROM jobs WHERE completed_at IS NOT NULL AND completed_at < ?", (now - result_ttl_s,)
+        ).rowcount
+        return expired, deleted
+
+    def get(self, job_id: str) -> Optional[dict]:
+        cursor = self._connect().execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        job = dict(zip([c[0] for c in cursor.description], row))
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+
+class InferenceQueue:
+    """
+    Bounded in-process queue of ingest jobs drained by a pool of inference threads.
+
+    submit() stores the job as 'queued' and returns its id immediately, or
+    raises queue.Full when max_queue_size jobs are already waiting so the
+    caller can answer 429. Workers run score_fn on each job, persist the
+    result in the ResultStore and, if the job has a callback_url, POST the
+    result to it. Workers also sweep the store every sweep_interval_s:
+    stale jobs are marked expired and old results deleted.
+    """
+
+    def __init__(self, score_fn: Callable[[pd.DataFrame], list], config: InferenceQueueConfig = None):
+        self.score_fn = score_fn
+        self.config = config or InferenceQueueConfig()
+        self.queue_wait_hist = Histogram(LATENCY_BUCKETS)
+        self.job_time_hist = Histogram(LATENCY_BUCKETS)
+        self._store = None
+        self._queue: queue.Queue = queue.Queue(maxsize=self.config.max_queue_size)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pid = None
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.expired = 0
+        self._last_sweep = 0.0
+
+    @property
+    def store(self) -> ResultStore:
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = ResultStore(self.config.results_db_path)
+        return self._store
+
+    def _ensure_workers(self):
+        # Threads do not survive fork(), so (re)start lazily in each worker process
+        if self._pid == os.getpid() and all(t.is_alive() for t in self._threads):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and all(t.is_alive() for t in self._threads):
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.config.max_queue_size)
+            self._pid = os.getpid()
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(len(self._threads), self.config.n_workers):
+                thread = threading.Thread(target=self._run, name=f"InferenceWorker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def validate_callback_url(self, callback_url: str) -> str:
+        """Raise ValueError if the server must not POST results to callback_url"""
+        return validate_callback_url(callback_url, self.config.callback_allowed_hosts)
+
+    def submit(self, input_df: pd.DataFrame, callback_url: Optional[str] = None) -> str:
+        """Queue input_df for scoring and return the job id; raises queue.Full under backpressure"""
+        self._ensure_workers()
+        if self._queue.full():
+            self.rejected += 1
+            raise queue.Full
+        job_id = uuid.uuid4().hex
+        self.store.add(job_id, len(input_df), callback_url)
+        try:
+            self._queue.put_nowait((job_id, input_df, callback_url, time.perf_counter()))
+        except queue.Full:
+            # Lost the race for the last slot
+            self.store.update(job_id, status="rejected", completed_at=time.time())
+            self.rejected += 1
+            raise
+        return job_id
+
+    def get_result(self, job_id: str) -> Optional[dict]:
+        return self.store.get(job_id)
+
+    def sweep(self) -> tuple:
+        """Run ResultStore.sweep with the configured limits, at most every sweep_interval_s"""
+        with self._lock:
+            if time.time() - self._last_sweep < self.config.sweep_interval_s:
+                return 0, 0
+            self._last_sweep = time.time()
+        try:
+            expired, deleted = self.store.sweep(self.config.result_ttl_s, self.config.stale_job_s)
+        except Exception as e:
+            logger.warning(f"Could not sweep ingest results: {e}")
+            return 0, 0
+        self.expired += expired
+        if expired or deleted:
+            logger.info(f"Ingest result sweep: {expired} stale job(s) expired, {deleted} old result(s) deleted")
+        return expired, deleted
+
+    def _run(self):
+        while True:
+            self.sweep()
+            try:
+                job_id, input_df, callback_url, enqueued = self._queue.get(timeout=self.config.sweep_interval_s)
+            except queue.Empty:
+                continue
+            started = time.perf_counter()
+            self.queue_wait_hist.observe(started - enqueued)
+            try:
+                self.store.update(job_id, status="running")
+                result = self.score_fn(input_df)
+                self.store.update(job_id, status="done", completed_at=time.time(), result=json.dumps(result))
+                self.completed += 1
+                if callback_url:
+                    self._send_callback(job_id, callback_url, result)
+
+            except Exception as e:
+                logger.error(f"Ingest job {job_id} failed: {e}")
+                self.failed += 1
+                try:
+                    self.store.update(job_id, status="failed", completed_at=time.time(), error=client_message(e))
+                except Exception as store_error:
+                    logger.error(f"Could not record failure of ingest job {job_id}: {store_error}")
+            finally:
+                self.job_time_hist.observe(time.perf_counter() - started)
+                self._queue.task_done()
+
+    def _send_callback(self, job_id: str, callback_url: str, result: list):
+        body = json.dumps({"job_id": job_id, "status": "done", "predictions": result}).encode()
+        req = urllib.request.Request(callback_url, data=body, headers={"Content-Type": "application/json"})
+        try:
+            # Resolved again at send time (the DNS records may have changed since submit),
+            # and the request goes to exactly the address that was checked
+            address = resolve_callback_url(callback_url, self.config.callback_allowed_hosts)
+            with callback_opener(address).open(req, timeout=self.config.callback_timeout_s) as response:
+                status = str(response.status)
+        except Exception as e:
+            logger.warning(f"Callback for ingest job {job_id} to {callback_url} failed: {e}")
+            status = f"error: {e}"
+        self.store.update(job_id, callback_status=status)
+
+    def collect_metrics(self):
+        """Metrics collector: queue depth and job counters"""
+        yield "ingest_queue_depth", "gauge", "Ingest jobs waiting for a worker", {}, self._queue.qsize()
+        yield "ingest_queue_capacity", "gauge", "Maximum pending ingest jobs", {}, self.config.max_queue_size
+        yield "ingest_jobs_total", "counter", "Ingest jobs by outcome", {"outcome": "completed"}, self.completed
+        yield "ingest_jobs_total", "counter", "Ingest jobs by outcome", {"outcome": "failed"}, self.failed
+        yield "ingest_jobs_total", "counter", "Ingest jobs by outcome", {"outcome": "rejected"}, self.rejected
+        yield "ingest_jobs_total", "counter", "Ingest jobs by outcome", {"outcome": "expired"}, self.expired
+
+    def stats(self) -> dict:
+        """Queue depth, job counters and wait/processing histograms"""
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue_size": self.config.max_queue_size,
+            "workers": self.config.n_workers,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "queue_wait_seconds": self.queue_wait_hist.snapshot(),
+            "job_seconds": self.job_time_hist.snapshot(),
+        }
+
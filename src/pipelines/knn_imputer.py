@@ -0,0 +1,227 @@
+# src/pipelines/knn_imputer.py
+import sys
+from collections import OrderedDict
+from numbers import Integral
+
+import numpy as np
+from sklearn.impute import KNNImputer
+from sklearn.metrics.pairwise import nan_euclidean_distances
+from sklearn.neighbors import BallTree, KDTree
+from sklearn.utils._param_validation import Interval
+from sklearn.utils.validation import FLOAT_DTYPES, check_is_fitted
+
+from src.exception import CustomException
+
+
+class IndexedKNNImputer(KNNImputer):
+    """
+    KNNImputer that answers neighbour queries from spatial indexes instead of
+    a brute-force nan-euclidean scan over every training row.
+
+    Training rows are grouped by their own missing-value pattern at fit time.
+    For a receiver observing columns O, the nan-euclidean distance to a donor
+    group with pattern D is a plain Euclidean distance on O & D times a
+    constant, so every large group is queried through a KD-tree (ball tree
+    for wide data) built on those shared columns; rows from rare patterns are
+    scanned directly. Trees are built lazily per (group, shared columns) and
+    kept in an LRU cache, so repeated receiver patterns reuse them.
+
+    Imputations match KNNImputer; only neighbour ties and the last bits of
+    the averages can differ.
+    """
+
+    _parameter_constraints: dict = {
+        **KNNImputer._parameter_constraints,
+        "leaf_size": [Interval(Integral, 1, None, closed="left")],
+        "max_cached_indexes": [Interval(Integral, 1, None, closed="left")],
+    }
+
+    # Training patterns with fewer rows than this are scanned instead of indexed
+    _BRUTE_FORCE_ROWS = 256
+    # Above this many shared columns KD-trees stop pruning well
+    _KD_TREE_MAX_DIMS = 16
+
+    def __init__(
+        self,
+        *,
+        missing_values=np.nan,
+        n_neighbors=5,
+        weights="uniform",
+        metric="nan_euclidean",
+        copy=True,
+        add_indicator=False,
+        keep_empty_features=False,
+        leaf_size=40,
+        max_cached_indexes=1024,
+    ):
+        super().__init__(
+            missing_values=missing_values,
+            n_neighbors=n_neighbors,
+            weights=weights,
+            metric=metric,
+            copy=copy,
+            add_indicator=add_indicator,
+            keep_empty_features=keep_empty_features,
+        )
+        self.leaf_size = leaf_size
+        self.max_cached_indexes = max_cached_indexes
+
+    def fit(self, X, y=None):
+        super().fit(X, y)
+        present = ~self._mask_fit_X
+        patterns, inverse = np.unique(present, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+
+        self._donor_groups, brute_idx = [], []
+        for g, pattern in enumerate(patterns):
+            idx = np.flatnonzero(inverse == g)
+            if idx.size >= self._BRUTE_FORCE_ROWS:
+                self._donor_groups.append((pattern, idx))
+            else:
+                brute_idx.append(idx)
+        self._brute_idx = np.sort(np.concatenate(brute_idx)) if brute_idx else np.empty(0, dtype=int)
+        self._n_donors = present.sum(axis=0)
+        self._col_means = np.ma.array(self._fit_X, mask=self._mask_fit_X).mean(axis=0).filled(np.nan)
+        self._index_cache = OrderedDict()
+        return self
+
+    def __getstate__(self):
+        # Trees are rebuilt lazily after unpickling
+        state = super().__getstate__()
+        state.pop("_index_cache", None)
+        return state
+
+    def _supports_indexing(self) -> bool:
+        return (
+            self.metric == "nan_euclidean"
+            and self.weights in ("uniform", "distance")
+            and isinstance(self.missing_values, float) and np.isnan(self.missing_values)
+        )
+
+    def _get_tree(self, group_id: int, shared: np.ndarray):
+        """Spatial index over one donor group, restricted to the shared columns"""
+        if not hasattr(self, "_index_cache"):
+            self._index_cache = OrderedDict()
+        key = (group_id, shared.tobytes())
+        tree = self._index_cache.get(key)
+        if tree is not None:
+            self._index_cache.move_to_end(key)
+            return tree
+
+        idx = self._donor_groups[group_id][1]
+        tree_cls = KDTree if shared.size <= self._KD_TREE_MAX_DIMS else BallTree
+        tree = tree_cls(self._fit_X[np.ix_(idx, shared)], leaf_size=self.leaf_size)
+        self._index_cache[key] = tree
+        if len(self._index_cache) > self.max_cached_indexes:
+            self._index_cache.popitem(last=False)
+        return tree
+
+    def _candidates(self, receivers: np.ndarray, observed: np.ndarray) -> list:
+        """(group pattern, distances, donor indices) of the n_neighbors nearest rows of every donor group"""
+        n_features = self._fit_X.shape[1]
+        candidates = []
+        for group_id, (pattern, idx) in enumerate(self._donor_groups):
+            k = min(self.n_neighbors, idx.size)
+            shared = np.flatnonzero(observed & pattern)
+            if shared.size == 0:
+                dist = np.full((receivers.shape[0], k), np.nan)
+                donor_idx = np.broadcast_to(idx[:k], dist.shape)
+            else:
+                dist, pos = self._get_tree(group_id, shared).query(receivers[:, shared], k=k)
+                # nan_euclidean rescales by n_features / n_present_coordinates
+                dist *= np.sqrt(n_features / shared.size)
+                donor_idx = idx[pos]
+            candidates.append((pattern, dist, donor_idx))
+        return candidates
+
+    @staticmethod
+    def _nearest(dist: np.ndarray, donor_idx: np.ndarray, k: int):
+        """Keep the k smallest distances per row, NaN distances last"""
+        order = np.argsort(np.where(np.isnan(dist), np.inf, dist), axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(dist, order, axis=1), np.take_along_axis(donor_idx, order, axis=1)
+
+    def _weights(self, dist: np.ndarray):
+        if self.weights == "uniform":
+            return None
+        # Same convention as sklearn: exact matches take all the weight
+        with np.errstate(divide="ignore"):
+            weights = 1.0 / dist
+        inf_mask = np.isinf(weights)
+        inf_row = np.any(inf_mask, axis=1)
+        weights[inf_row] = inf_mask[inf_row]
+        weights[np.isnan(weights)] = 0.0
+        return weights
+
+    def transform(self, X):
+        """Impute all missing values in X using the cached neighbour indexes."""
+        try:
+            check_is_fitted(self)
+            if not self._supports_indexing():
+                return super().transform(X)
+
+            X = self._validate_data(
+                X, accept_sparse=False, dtype=FLOAT_DTYPES,
+                force_all_finite="allow-nan", copy=self.copy, reset=False,
+            )
+            mask = np.isnan(X)
+            valid_mask = self._valid_mask
+            if not mask[:, valid_mask].any():
+                # Nothing to impute: the base class returns without computing distances
+                return super().transform(X)
+
+            X_indicator = super()._transform_indicator(mask)
+            row_missing_idx = np.flatnonzero(mask[:, valid_mask].any(axis=1))
+            brute_present = ~self._mask_fit_X[self._brute_idx]
+
+            # Group receivers by which (valid) columns they observe
+            observed = ~mask[row_missing_idx] & valid_mask
+            patterns, inverse = np.unique(observed, axis=0, return_inverse=True)
+            inverse = inverse.ravel()
+
+            X_filled = X.copy()
+            for g, pattern in enumerate(patterns):
+                rows = row_missing_idx[inverse == g]
+                missing_cols = np.flatnonzero(~pattern & valid_mask)
+                if not pattern.any():
+                    # No shared coordinates with any donor: column mean, as in KNNImputer
+                    X_filled[np.ix_(rows, missing_cols)] = self._col_means[missing_cols]
+                    continue
+
+                receivers = X[rows]
+                candidates = self._candidates(receivers, pattern)
+                brute_dist = (
+                    nan_euclidean_distances(receivers, self._fit_X[self._brute_idx])
+                    if self._brute_idx.size else None
+                )
+
+                for col in missing_cols:
+                    k = min(self.n_neighbors, self._n_donors[col])
+                    parts = [(d, i) for donor_pattern, d, i in candidates if donor_pattern[col]]
+                    if brute_dist is not None and brute_present[:, col].any():
+                        ok = brute_present[:, col]
+                        idx = np.broadcast_to(self._brute_idx[ok], (rows.size, int(ok.sum())))
+                        parts.append(self._nearest(brute_dist[:, ok], idx, k))
+
+                    dist, donor_idx = self._nearest(
+                        np.hstack([d for d, _ in parts]), np.hstack([i for _, i in parts]), k
+                    )
+
+                    all_nan = np.isnan(dist).all(axis=1)
+                    X_filled[rows[all_nan], col] = self._col_means[col]
+                    if all_nan.all():
+                        continue
+
+                    dist, donor_idx = dist[~all_nan], donor_idx[~all_nan]
+                    X_filled[rows[~all_nan], col] = np.ma.average(
+                        self._fit_X[donor_idx, col], axis=1, weights=self._weights(dist)
+                    )
+
+            if self.keep_empty_features:
+                Xc = X_filled
+                Xc[:, ~valid_mask] = 0
+            else:
+                Xc = X_filled[:, valid_mask]
+            return super()._concatenate_indicator(Xc, X_indicator)
+
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -0,0 +1,197 @@
+"""
+NumPy-only runtime for models exported by src.pipelines.model_export.
+
+The export is a single .npz file: plain arrays plus a JSON header stored
+under "meta", loaded with allow_pickle=False. Nothing here imports sklearn
+or pandas, so a worker can serve predictions from the bundle alone.
+
+Format (format_version 1):
+    meta                      JSON: format, format_version, feature_names,
+                              preprocessor and model descriptions
+    preprocessor/xmin, yrange, denom, ymin   rescale coefficients per feature
+    preprocessor/fit_X        imputer donor rows (rescaled, NaN = missing)
+    preprocessor/col_means    fallback value per feature
+    preprocessor/center, scale                RobustScaler
+    model/classes             class labels
+    model/...                 per model type, see model_export.export_model
+Tree models are flat node arrays (left, right, feature, threshold,
+value) with offsets[t] the root of tree t; children are absolute indices
+and -1 marks a leaf. They are evaluated by tree_evaluator.
+"""
+import sys
+import json
+
+import numpy as np
+
+from src.exception import CustomException
+from src.pipelines.tree_evaluator import TREE_MODEL_TYPES, TreeEnsembleEvaluator, labels_from_decision
+
+FORMAT_NAME = "water-sensor-lite"
+FORMAT_VERSION = 1
+
+MODEL_TYPES = (
+    "decision_tree", "random_forest", "gradient_boosting", "adaboost", "logistic_regression", "k_neighbors",
+)
+
+
+class LiteModel:
+    """Preprocessor and classifier loaded from an exported bundle"""
+
+    def __init__(self, meta: dict, arrays: dict):
+        if meta.get("format") != FORMAT_NAME:
+            raise ValueError(f"Not a {FORMAT_NAME} bundle")
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported format version {meta.get('format_version')} (expected {FORMAT_VERSION})")
+        if meta["model"]["type"] not in MODEL_TYPES:
+            raise ValueError(f"Unknown model type {meta['model']['type']!r}")
+
+        self.meta = meta
+        self.arrays = arrays
+        self.feature_names_in_ = list(meta["feature_names"])
+        self.model_type = meta["model"]["type"]
+        self.classes_ = arrays["model/classes"]
+        # Tree models run on the packed node arrays as they are
+        self._trees = None
+        if self.model_type in TREE_MODEL_TYPES:
+            model_arrays = {k[len("model/"):]: v for k, v in arrays.items() if k.startswith("model/")}
+            self._trees = TreeEnsembleEvaluator(meta["model"], model_arrays)
+
+        # Imputer donors in the form the nan-euclidean distance uses them
+        fit_X = arrays["preprocessor/fit_X"]
+        self._fit_missing = np.isnan(fit_X)
+        self._fit_zeroed = np.where(self._fit_missing, 0.0, fit_X)
+        self._fit_sq = self._fit_zeroed * self._fit_zeroed
+        self._fit_norms = np.einsum("ij,ij->i", self._fit_zeroed, self._fit_zeroed)
+        self._fit_present = ~self._fit_missing
+
+    @classmethod
+    def load(cls, file_path: str) -> "LiteModel":
+        try:
+            with np.load(file_path, allow_pickle=False) as bundle:
+                arrays = {key: bundle[key] for key in bundle.files}
+            meta = json.loads(str(arrays.pop("meta")))
+            return cls(meta, arrays)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # ----- preprocessing -----
+
+    def transform(self, X) -> np.ndarray:
+        """Rescale, KNN-impute and robust-scale X (array or DataFrame with the training columns)"""
+        try:
+            if hasattr(X, "columns"):
+                X = X.reindex(columns=self.feature_names_in_).to_numpy(dtype=float)
+            a = self.arrays
+            out = np.subtract(X, a["preprocessor/xmin"], dtype=float)
+            out *= a["preprocessor/yrange"]
+            out /= a["preprocessor/denom"]
+            out += a["preprocessor/ymin"]
+            self._impute(out)
+            out -= a["preprocessor/center"]
+            out /= a["preprocessor/scale"]
+            return out
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _nan_euclidean(self, X: np.ndarray) -> np.ndarray:
+        """Distances from X to the donor rows, computed the way KNNImputer computes them"""
+        missing = np.isnan(X)
+        X = np.where(missing, 0.0, X)
+        dist = -2 * (X @ self._fit_zeroed.T)
+        dist += np.einsum("ij,ij->i", X, X)[:, np.newaxis]
+        dist += self._fit_norms[np.newaxis, :]
+        np.maximum(dist, 0, out=dist)
+        dist -= np.dot(X * X, self._fit_missing.T)
+        dist -= np.dot(missing, self._fit_sq.T)
+        np.clip(dist, 0, None, out=dist)
+        present_count = np.dot(1 - missing, self._fit_present.T)
+        dist[present_count == 0] = np.nan
+        dist /= np.maximum(1, present_count)
+        dist *= X.shape[1]
+        return np.sqrt(dist, out=dist)
+
+    def _impute(self, X: np.ndarray, chunk_rows: int = 1024):
+        """Fill NaNs in place from the nearest donor rows, as KNNImputer.transform does"""
+        pre = self.meta["preprocessor"]
+        n_neighbors, weights = pre["n_neighbors"], pre["weights"]
+        fit_X, col_means = self.arrays["preprocessor/fit_X"], self.arrays["preprocessor/col_means"]
+        mask = np.isnan(X)
+        row_missing = np.flatnonzero(mask.any(axis=1))
+
+        for start in range(0, row_missing.size, chunk_rows):
+            rows = row_missing[start:start + chunk_rows]
+            dist = self._nan_euclidean(X[rows])
+            for col in np.flatnonzero(mask[rows].any(axis=0)):
+                donors = np.flatnonzero(self._fit_present[:, col])
+                receivers = np.flatnonzero(mask[rows, col])
+                d = dist[receivers][:, donors]
+                all_nan = np.isnan(d).all(axis=1)
+                X[rows[receivers[all_nan]], col] = col_means[col]
+                if all_nan.all():
+                    continue
+                d = d[~all_nan]
+                k = min(n_neighbors, donors.size)
+                nearest = np.argpartition(d, k - 1, axis=1)[:, :k]
+                nearest_dist = np.take_along_axis(d, nearest, axis=1)
+                if weights == "distance":
+                    with np.errstate(divide="ignore"):
+                        w = 1.0 / nearest_dist
+                    inf_mask = np.isinf(w)
+                    inf_row = inf_mask.any(axis=1)
+                    w[inf_row] = inf_mask[inf_row]
+                    w[np.isnan(w)] = 0.0
+                else:
+                    w = np.ones_like(nearest_dist)
+                    w[np.isnan(nearest_dist)] = 0.0
+                values = np.ma.array(fit_X[donors, col].take(nearest), mask=False)
+                X[rows[receivers[~all_nan]], col] = np.ma.average(values, axis=1, weights=w).data
+
+    # ----- model -----
+
+    def _decision(self, X: np.ndarray) -> np.ndarray:
+        """Decision values in the same layout the sklearn estimator uses before picking a class"""
+        a, kind = self.arrays, self.model_type
+        if self._trees is not None:
+            return self._trees.decision_function(X)
+
+        if kind == "logistic_regression":
+            scores = X @ a["model/coef"].T + a["model/intercept"]
+            return scores.ravel() if scores.shape[1] == 1 else scores
+
+        if kind == "k_neighbors":
+            return self._knn_proba(X)
+
+    def _knn_proba(self, X: np.ndarray, chunk_rows: int = 1024) -> np.ndarray:
+        a, m = self.arrays, self.meta["model"]
+        fit_X, y = a["model/fit_X"], a["model/y"]
+        k, p = m["n_neighbors"], m["p"]
+        proba = np.zeros((X.shape[0], self.classes_.size))
+        for start in range(0, X.shape[0], chunk_rows):
+            diff = np.abs(X[start:start + chunk_rows, np.newaxis, :] - fit_X[np.newaxis, :, :])
+            if p == 2:
+                dist = np.sqrt((diff * diff).sum(axis=2))
+            else:
+                dist = (diff ** p).sum(axis=2) ** (1.0 / p)
+            nearest = np.argsort(dist, axis=1, kind="stable")[:, :k]
+            if m["weights"] == "distance":
+                with np.errstate(divide="ignore"):
+                    w = 1.0 / np.take_along_axis(dist, nearest, axis=1)
+                inf_mask = np.isinf(w)
+                inf_row = inf_mask.any(axis=1)
+                w[inf_row] = inf_mask[inf_row]
+            else:
+                w = np.ones(nearest.shape)
+            block = proba[start:start + chunk_rows]
+            for c in range(self.classes_.size):
+                block[:, c] = np.where(y[nearest] == c, w, 0.0).sum(axis=1)
+        return proba
+
+    def predict(self, X, preprocessed: bool = False) -> np.ndarray:
+        """Class labels for raw readings X (or already transformed features with preprocessed=True)"""
+        try:
+            if not preprocessed:
+                X = self.transform(X)
+            X = np.asarray(X, dtype=float)
+            return labels_from_decision(self._decision(X), self.classes_, self.model_type)
+        except Exception as e:
+            raise CustomException(e, sys)
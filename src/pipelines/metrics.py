@@ -0,0 +1,173 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Sequence
+
+# Default buckets (seconds) for latency-style histograms
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Default buckets (rows) for batch-size histograms
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+class Histogram:
+    """Fixed-bucket histogram, cheap enough to observe on the hot path"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)   # last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> dict:
+        """Cumulative bucket counts, sum and count"""
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative, running = [], 0
+        for upper, c in zip(list(self.buckets) + [float("inf")], counts):
+            running += c
+            cumulative.append((upper, running))
+        return {
+            "buckets": cumulative,
+            "sum": total,
+            "count": count,
+            "mean": total / count if count else 0.0,
+        }
+
+
+class Counter:
+    """Monotonic counter"""
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels.items()
+    )
+    return "{" + inner + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    """
+    Named counters and histograms, rendered in the Prometheus text format.
+
+    Metrics are created on first use and keyed by (name, labels); lookups
+    after that are a dict access, so instrumenting the hot path costs a
+    couple of perf_counter() calls and one locked increment. Collectors
+    registered with register_collector() are called at scrape time for
+    values that live elsewhere (queue depths, model versions, ...).
+    """
+
+    def __init__(self):
+        self._metrics = {}          # (name, labels tuple) -> Counter | Histogram
+        self._help = {}             # name -> (type, help text)
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get(self, kind: str, name: str, help_text: str, labels: dict, factory):
+        key = (name, tuple(sorted(labels.items())) if labels else ())
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    registered = self._help.setdefault(name, (kind, help_text))
+                    if registered[0] != kind:
+                        raise ValueError(f"Metric {name} is already registered as a {registered[0]}")
+                    metric = self._metrics[key] = factory()
+        return metric
+
+    def counter(self, name: str, help_text: str = "", **labels) -> Counter:
+        return self._get("counter", name, help_text, labels, Counter)
+
+    def histogram(self, name: str, help_text: str = "", buckets: Sequence[float] = LATENCY_BUCKETS,
+                  **labels) -> Histogram:
+        return self._get("histogram", name, help_text, labels, lambda: Histogram(buckets))
+
+    def register_histogram(self, name: str, histogram: Histogram, help_text: str = "", **labels):
+        """Expose an existing Histogram (e.g. owned by the micro-batcher) under name"""
+        self._get("histogram", name, help_text, labels, lambda: histogram)
+
+    def register_collector(self, collector):
+        """collector() -> iterable of (name, type, help, labels, value), called on every scrape"""
+        self._collectors.append(collector)
+
+    @contextmanager
+    def timed(self, name: str, help_text: str = "", **labels):
+        """Observe the wall time of the with-block into histogram name"""
+        histogram = self.histogram(name, help_text, **labels)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            histogram.observe(time.perf_counter() - start)
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        families = {}
+        for (name, labels), metric in sorted(self._metrics.items(), key=lambda kv: kv[0]):
+            families.setdefault(name, []).append((dict(labels), metric))
+
+        lines = []
+        for name, series in families.items():
+            kind, help_text = self._help[name]
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in series:
+                if kind == "counter":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(metric.value)}")
+                    continue
+                snap = metric.snapshot()
+                for upper, count in snap["buckets"]:
+                    bucket_labels = {**labels, "le": _format_value(upper)}
+                    lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(snap['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {snap['count']}")
+
+        # Group collector samples by family; Prometheus wants each family contiguous
+        collected = {}
+        for collector in self._collectors:
+            for name, kind, help_text, labels, value in collector():
+                collected.setdefault(name, (kind, help_text, []))[2].append((labels, value))
+        for name, (kind, help_text, samples) in collected.items():
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# One registry per worker process
+metrics = MetricsRegistry()
@@ -0,0 +1,115 @@
+import os
+import sys
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from src.exception import CustomException
+from src.logger import logger
+from src.pipelines.metrics import Histogram, LATENCY_BUCKETS, BATCH_SIZE_BUCKETS
+
+
+@dataclass
+class MicroBatcherConfig:
+    """Configuration for the request coalescer"""
+    max_batch_size: int = 256      # flush once this many rows are queued
+    max_wait_ms: float = 5.0       # ... or once the oldest request waited this long
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent small predict requests into one batched call.
+
+    Callers submit a DataFrame and block on a Future. A single background
+    thread pulls requests off the queue until max_batch_size rows are
+    gathered or max_wait_ms has passed since the first one arrived, runs
+    predict_fn once on the concatenated frame and hands each caller back
+    its own slice of the result.
+    """
+
+    def __init__(self, predict_fn: Callable[[pd.DataFrame], np.ndarray], config: MicroBatcherConfig = None):
+        self.predict_fn = predict_fn
+        self.config = config or MicroBatcherConfig()
+        self.batch_size_hist = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_hist = Histogram(LATENCY_BUCKETS)
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_worker(self):
+        # Threads do not survive fork(), so (re)start lazily in each worker process
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="MicroBatcher", daemon=True)
+            self._thread.start()
+
+    def submit(self, input_df: pd.DataFrame) -> Future:
+        """Queue input_df for the next batch and return a Future of its predictions"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((input_df, future, time.perf_counter()))
+        return future
+
+    def predict(self, input_df: pd.DataFrame, timeout: float = None) -> np.ndarray:
+        """Blocking helper: submit and wait for the result"""
+        return self.submit(input_df).result(timeout=timeout)
+
+    def _collect(self) -> list:
+        first = self._queue.get()
+        batch = [first]
+        rows = len(first[0])
+        deadline = first[2] + self.config.max_wait_ms / 1000.0
+
+        while rows < self.config.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                self.queue_wait_hist.observe(started - enqueued)
+
+            try:
+                frames = [item[0] for item in batch]
+                combined = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+                self.batch_size_hist.observe(len(combined))
+                preds = self.predict_fn(combined)
+
+                offset = 0
+                for input_df, future, _ in batch:
+                    future.set_result(preds[offset:offset + len(input_df)])
+                    offset += len(input_df)
+
+            except Exception as e:
+                logger.error(f"Micro-batch of {len(batch)} requests failed: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e if isinstance(e, CustomException) else CustomException(e, sys))
+
+    def stats(self) -> dict:
+        """Batch-size and queue-wait histograms"""
+        return {
+            "max_batch_size": self.config.max_batch_size,
+            "max_wait_ms": self.config.max_wait_ms,
+            "batch_size": self.batch_size_hist.snapshot(),
+            "queue_wait_seconds": self.queue_wait_hist.snapshot(),
+        }
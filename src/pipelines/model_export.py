@@ -0,0 +1,237 @@
+import os
+import sys
+import json
+import time
+
+import numpy as np
+import sklearn
+from sklearn.ensemble import AdaBoostClassifier, GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from src.exception import CustomException
+from src.logger import logger
+from src.pipelines.compiled_preprocessor import CompiledPreprocessor
+from src.pipelines.lite_runtime import FORMAT_NAME, FORMAT_VERSION, LiteModel
+
+
+def pack_trees(trees: list) -> dict:
+    """
+    Concatenate fitted sklearn trees into flat node arrays.
+
+    Child indices are made absolute and leaves point to -1, so every tree
+    can be walked on the same arrays starting from offsets[t].
+    """
+    left, right, feature, threshold, value, offsets = [], [], [], [], [], [0]
+    for tree in trees:
+        t = tree.tree_
+        base = offsets[-1]
+        is_leaf = t.children_left < 0
+        left.append(np.where(is_leaf, -1, t.children_left + base))
+        right.append(np.where(is_leaf, -1, t.children_right + base))
+        feature.append(np.where(is_leaf, 0, t.feature))
+        threshold.append(t.threshold)
+        value.append(t.value[:, 0, :])
+        offsets.append(base + t.node_count)
+    return {
+        "left": np.concatenate(left).astype(np.int64),
+        "right": np.concatenate(right).astype(np.int64),
+        "feature": np.concatenate(feature).astype(np.int64),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "value": np.concatenate(value).astype(np.float64),
+        "offsets": np.asarray(offsets, dtype=np.int64),
+    }
+
+
+def export_preprocessor(pipeline):
+    """(meta, arrays) for the rescale -> KNN imputer -> RobustScaler pipeline"""
+    if not CompiledPreprocessor.is_compilable(pipeline):
+        raise ValueError("Only the rescale/imputer/scaler preprocessor can be exported")
+    compiled = CompiledPreprocessor(pipeline)
+    imputer = compiled.imputer
+    if imputer.metric != "nan_euclidean" or imputer.weights not in ("uniform", "distance"):
+        raise ValueError(f"Cannot export a KNN imputer with metric={imputer.metric!r}, weights={imputer.weights!r}")
+
+    fit_X, mask = imputer._fit_X, imputer._mask_fit_X
+    col_means = np.array([np.ma.array(fit_X[:, j], mask=mask[:, j]).mean() for j in range(fit_X.shape[1])])
+    meta = {"type": "rescale_knn_robust", "n_neighbors": int(imputer.n_neighbors), "weights": imputer.weights}
+    arrays = {
+        "xmin": compiled.xmin_, "yrange": compiled.yrange_, "denom": compiled.denom_, "ymin": compiled.ymin_,
+        "fit_X": np.where(mask, np.nan, fit_X), "col_means": col_means,
+        "center": np.asarray(compiled.center_, dtype=float), "scale": np.asarray(compiled.scale_, dtype=float),
+    }
+    return meta, compiled.feature_names_in_, arrays
+
+
+def export_model(model):
+    """(meta, arrays) for one of the classifiers ModelTrainer can select"""
+    meta = {"estimator": type(model).__name__}
+
+    if isinstance(model, DecisionTreeClassifier):
+        meta["type"] = "decision_tree"
+        arrays = pack_trees([model])
+    elif isinstance(model, RandomForestClassifier):
+        meta["type"] = "random_forest"
+        arrays = pack_trees(model.estimators_)
+    elif isinstance(model, GradientBoostingClassifier):
+        if model.init_ != "zero" and type(model.init_).__name__ != "DummyClassifier":
+            raise ValueError("Cannot export GradientBoostingClassifier with a custom init estimator")
+        meta.update(type="gradient_boosting", learning_rate=float(model.learning_rate))
+        arrays = pack_trees([tree for stage in model.estimators_ for tree in stage])
+        # The default init is a class prior: the same raw score for every row
+        arrays["init_raw"] = model._raw_predict_init(np.zeros((1, model.n_features_in_), dtype=np.float32))[0]
+    elif isinstance(model, AdaBoostClassifier):
+        if any(type(e) is not DecisionTreeClassifier for e in model.estimators_):
+            raise ValueError("AdaBoost export needs decision-tree base estimators")
+        meta.update(type="adaboost", algorithm=model.algorithm)
+        arrays = pack_trees(model.estimators_)
+        arrays["estimator_weights"] = np.asarray(model.estimator_weights_, dtype=float)
+    elif isinstance(model, LogisticRegression):
+        meta["type"] = "logistic_regression"
+        arrays = {"coef": model.coef_.astype(float), "intercept": model.intercept_.astype(float)}
+    elif isinstance(model, KNeighborsClassifier):
+        if model.effective_metric_ not in ("euclidean", "manhattan", "minkowski") or callable(model.weights):
+            raise ValueError(f"Cannot export KNeighborsClassifier with metric={model.effective_metric_!r}")
+        p = {"euclidean": 2, "manhattan": 1}.get(model.effective_metric_, model.effective_metric_params_.get("p", 2))
+        meta.update(type="k_neighbors", n_neighbors=int(model.n_neighbors), weights=model.weights, p=p)
+        arrays = {"fit_X": model._fit_X.astype(float), "y": model._y.astype(np.int64)}
+    else:
+        raise ValueError(f"No lite export for {type(model).__name__}")
+
+    arrays["classes"] = np.asarray(model.classes_)
+    return meta, arrays
+
+
+def export_lite_model(preprocessor, model, file_path: str) -> str:
+    """Write preprocessor and model into one versioned .npz bundle for LiteModel"""
+    try:
+        pre_meta, feature_names, pre_arrays = export_preprocessor(preprocessor)
+        model_meta, model_arrays = export_model(model)
+        meta = {
+            "format": FORMAT_NAME,
+            "format_version": FORMAT_VERSION,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "sklearn_version": sklearn.__version__,
+            "feature_names": feature_names,
+            "preprocessor": pre_meta,
+            "model": model_meta,
+        }
+        arrays = {f"preprocessor/{k}": v for k, v in pre_arrays.items()}
+        arrays.update({f"model/{k}": v for k, v in model_arrays.items()})
+        arrays["meta"] = np.array(json.dumps(meta))
+
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        # np.savez appends .npz to names without it; write through a file object to keep the path as given
+        with open(file_path, "wb") as file_obj:
+            np.savez_compressed(file_obj, **arrays)
+        logger.info(f"Exported {model_meta['type']} model and preprocessor to {file_path} "
+                    f"({os.path.getsize(file_path) / 1024:.1f} KB)")
+        return file_path
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def check_lite_parity(preprocessor, model, lite: LiteModel, X) -> float:
+    """
+    Raise unless lite reproduces model.predict(preprocessor.transform(X)).
+
+    Predictions must match exactly; transformed features may differ only in
+    the last bits of imputed values. Returns the largest feature difference.
+    """
+    try:
+        expected_features = np.asarray(preprocessor.transform(X), dtype=float)
+        features = lite.transform(X)
+        if expected_features.shape != features.shape:
+            raise ValueError("Lite preprocessor output has a different shape")
+        if not np.allclose(expected_features, features, rtol=1e-9, atol=1e-12, equal_nan=True):
+            raise ValueError("Lite preprocessor output differs from the sklearn pipeline")
+
+        # Model parity on identical inputs, then end to end
+        if not np.array_equal(model.predict(expected_features), lite.predict(expected_features, preprocessed=True)):
+            raise ValueError("Lite model predictions differ from the sklearn model")
+        if not np.array_equal(model.predict(expected_features), lite.predict(X)):
+            raise ValueError("Lite end-to-end predictions differ from the sklearn pipeline")
+        return float(np.nanmax(np.abs(expected_features - features), initial=0.0))
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def parity_inputs(preprocessor, n_rows: int = 500, missing_rate: float = 0.1, seed: int = 0):
+    """
+    Raw readings for a parity check, recovered from the imputer's training rows.
+
+    Inverting the rescale step gives inputs in the original wafer units. The
+    rows are used twice: as they are, and with missing_rate of the cells
+    blanked so the imputer path is always covered.
+    """
+    import pandas as pd
+
+    compiled = CompiledPreprocessor(preprocessor)
+    rescaled = compiled.imputer._fit_X[:n_rows].copy()
+    rescaled[compiled.imputer._mask_fit_X[:n_rows]] = np.nan
+    raw = (rescaled - compiled.ymin_) * compiled.denom_ / compiled.yrange_ + compiled.xmin_
+    blanked = raw.copy()
+    blanked[np.random.default_rng(seed).random(blanked.shape) < missing_rate] = np.nan
+    return pd.DataFrame(np.vstack([raw, blanked]), columns=compiled.feature_names_in_)
+
+
+def parity_models(random_state: int = 42) -> dict:
+    """One small instance of every model type export_model supports"""
+    return {
+        "Decision Tree": DecisionTreeClassifier(random_state=random_state),
+        "Random Forest": RandomForestClassifier(n_estimators=20, random_state=random_state),
+        "Gradient Boosting": GradientBoostingClassifier(n_estimators=20, random_state=random_state),
+        "AdaBoost SAMME.R": AdaBoostClassifier(n_estimators=20, random_state=random_state),
+        "AdaBoost SAMME": AdaBoostClassifier(n_estimators=20, algorithm="SAMME", random_state=random_state),
+        "Logistic Regression": LogisticRegression(max_iter=1000),
+        "K-Neighbors uniform": KNeighborsClassifier(n_neighbors=3),
+        "K-Neighbors distance": KNeighborsClassifier(n_neighbors=3, weights="distance", p=1),
+    }
+
+
+def check_all_model_types(preprocessor, X_train: np.ndarray, y_train: np.ndarray, X=None) -> dict:
+    """
+    Parity check of the lite format for every supported model type.
+
+    Each model from parity_models() is fitted on the transformed X_train,
+    exported together with preprocessor and compared with
+    model.predict(preprocessor.transform(X)) by check_lite_parity. X defaults
+    to parity_inputs(preprocessor). Raises on the first mismatch.
+
+    Returns:
+        model name -> largest transformed-feature difference
+    """
+    import tempfile
+
+    X = parity_inputs(preprocessor) if X is None else X
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, model in parity_models().items():
+            model.fit(X_train, y_train)
+            path = export_lite_model(preprocessor, model, os.path.join(tmp_dir, "model_lite.npz"))
+            results[name] = check_lite_parity(preprocessor, model, LiteModel.load(path), X)
+            logger.info(f"Lite parity OK for {name} (max feature difference {results[name]:.3g})")
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.logger import configure_logging
+    from src.pipelines.artifact_store import artifact_store
+    from src.utils import load_object, load_numpy_array_data
+
+    parser = argparse.ArgumentParser(description="Check the lite export against sklearn for every model type")
+    parser.add_argument("--preprocessor", help="fitted preprocessor (default: the CURRENT artifact version's)")
+    parser.add_argument("--train-arr", default=os.path.join('artifacts', "train_arr.npy"),
+                        help="transformed training matrix, target in the last column")
+    args = parser.parse_args()
+
+    configure_logging()
+    preprocessor = load_object(args.preprocessor or artifact_store.resolve("preprocessor.pkl"))
+    train_arr = load_numpy_array_data(args.train_arr)
+    results = check_all_model_types(preprocessor, train_arr[:, :-1], train_arr[:, -1])
+    print(json.dumps(results, indent=2))
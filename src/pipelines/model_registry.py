@@ -0,0 +1,148 @@
+import os
+import sys
+import time
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from src.exception import CustomException
+from src.logger import logger
+from src.utils import load_object
+
+
+@dataclass
+class ArtifactEntry:
+    """A loaded artifact together with the file state it was loaded from"""
+    obj: Any
+    path: str
+    mtime_ns: int
+    size: int
+    sha256: str
+    load_time_s: float
+    loaded_at: float = field(default_factory=time.time)
+
+    @property
+    def version(self) -> str:
+        return self.sha256[:12]
+
+
+def file_sha256(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """Return the hex sha256 digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file_obj:
+        for chunk in iter(lambda: file_obj.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of unpickled artifacts (model, preprocessor, ...).
+
+    Each artifact is loaded once per worker. On every lookup the file is
+    stat()-ed; it is only re-hashed when mtime/size change and only
+    re-loaded when the content hash changes. A reload builds a brand-new
+    entry and swaps the dict slot in one assignment, so callers that already
+    hold the old object keep using it until they are done.
+    """
+
+    def __init__(self):
+        self._entries: Dict[tuple, ArtifactEntry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def get(self, file_path: str, loader: Callable[[str], Any] = load_object) -> Any:
+        """Return the cached object for file_path, (re)loading it if the file changed"""
+        return self.get_entry(file_path, loader).obj
+
+    def get_entry(self, file_path: str, loader: Callable[[str], Any] = load_object) -> ArtifactEntry:
+        try:
+            path = os.path.abspath(file_path)
+            # The same file may be cached in several forms, e.g. raw and compiled
+            key = (path, loader)
+            stat = os.stat(path)
+            entry = self._entries.get(key)
+
+            if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                self.hits += 1
+                return entry
+
+            with self._lock:
+                # Another thread may have refreshed the entry while we waited
+                entry = self._entries.get(key)
+                if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                    self.hits += 1
+                    return entry
+
+                sha256 = file_sha256(path)
+                if entry is not None and entry.sha256 == sha256:
+                    # Touched but identical content: keep the loaded object
+                    self._entries[key] = ArtifactEntry(
+                        obj=entry.obj, path=path, mtime_ns=stat.st_mtime_ns, size=stat.st_size,
+                        sha256=sha256, load_time_s=entry.load_time_s, loaded_at=entry.loaded_at
+                    )
+                    self.hits += 1
+                    return self._entries[key]
+
+                self.misses += 1
+                start = time.perf_counter()
+                obj = loader(path)
+                load_time = time.perf_counter() - start
+
+                new_entry = ArtifactEntry(
+                    obj=obj, path=path, mtime_ns=stat.st_mtime_ns, size=stat.st_size,
+                    sha256=sha256, load_time_s=load_time
+                )
+                if entry is not None:
+                    self.reloads += 1
+                    logger.info(f"Reloaded {file_path} (version {entry.version} -> {new_entry.version}) in {load_time:.4f}s")
+                else:
+                    logger.info(f"Loaded {file_path} (version {new_entry.version}) in {load_time:.4f}s")
+                self._entries[key] = new_entry
+                return new_entry
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def invalidate(self, file_path: Optional[str] = None):
+        """Drop one cached artifact (in all its loaded forms), or all of them"""
+        with self._lock:
+            if file_path is None:
+                self._entries.clear()
+            else:
+                path = os.path.abspath(file_path)
+                for key in [k for k in self._entries if k[0] == path]:
+                    del self._entries[key]
+
+    def stats(self) -> dict:
+        """Hit/miss counters and per-artifact version and load time"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "artifacts": {
+                (path if loader is load_object else f"{path} [{loader.__name__}]"): {
+                    "version": entry.version,
+                    "load_time_s": entry.load_time_s,
+                    "loaded_at": entry.loaded_at,
+                }
+                for (path, loader), entry in list(self._entries.items())
+            },
+        }
+
+    def collect_metrics(self):
+        """Metrics collector: cache counters and the version of every loaded artifact"""
+        yield "model_registry_hits_total", "counter", "Artifact lookups served from the cache", {}, self.hits
+        yield "model_registry_misses_total", "counter", "Artifact (re)loads from disk", {}, self.misses
+        yield "model_registry_reloads_total", "counter", "Artifacts reloaded after a file change", {}, self.reloads
+        for (path, loader), entry in list(self._entries.items()):
+            labels = {"path": os.path.relpath(path), "loader": loader.__name__, "version": entry.version}
+            yield "model_artifact_info", "gauge", "Loaded artifact versions (sha256 prefix)", labels, 1
+            yield "model_artifact_load_seconds", "gauge", "Time taken to load each artifact", labels, entry.load_time_s
+
+
+# One registry per worker process
+model_registry = ModelRegistry()
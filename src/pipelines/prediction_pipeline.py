@@ -1,9 +1,21 @@
+import os
 import sys
 import numpy as np
 import pandas as pd
 from src.exception import CustomException
-from src.utils import load_object
 from src.logger import logger
+from src.pipelines.model_registry import model_registry
+from src.pipelines.artifact_store import FALLBACK_PREFIX, artifact_store
+from src.pipelines.compiled_preprocessor import load_compiled_preprocessor
+from src.pipelines.tree_evaluator import load_tree_evaluator
+from src.pipelines.micro_batcher import MicroBatcher, MicroBatcherConfig
+from src.pipelines.metrics import metrics, BATCH_SIZE_BUCKETS
+
+STAGE_SECONDS = "inference_stage_seconds"
+STAGE_HELP = "Wall time of each inference stage"
+
+SENSOR_COLUMNS = [f"Sensor-{i}" for i in range(1, 11)]
+
 
 class CustomData:
     """Custom data class for handling input data."""
@@ -47,45 +59,158 @@ class CustomData:
             raise CustomException(e, sys)
 
 
+class CustomBatchData:
+    """Batch of readings, as received from the JSON/NDJSON API."""
+
+    def __init__(self, readings: list, columns: list = None):
+        self.readings = readings
+        # Features of the served model; Sensor-1..10 are always accepted as well
+        self.columns = list(columns or SENSOR_COLUMNS)
+        self.accepted = self.columns + [c for c in SENSOR_COLUMNS if c not in self.columns]
+
+    def get_data_as_data_frame(self) -> pd.DataFrame:
+        """
+        Convert the readings to a float DataFrame with the served features followed by
+        any of 'Sensor-1' ... 'Sensor-10' not among them.
+
+        Each reading is either a list of 10 values in Sensor-1..10 order or a dict
+        keyed by 'Sensor-i' or 'sensor_i'. Served features other than Sensor-1..10
+        can only be sent as dicts, so a list is never ambiguous. Accepted columns
+        missing from a reading become NaN.
+        """
+        try:
+            if not self.readings:
+                return pd.DataFrame(columns=self.accepted, dtype=float)
+
+            if all(isinstance(r, (list, tuple)) for r in self.readings):
+                values = np.asarray(self.readings, dtype=float)
+                if values.ndim != 2 or values.shape[1] != len(SENSOR_COLUMNS):
+                    raise ValueError(f"Each reading list must have {len(SENSOR_COLUMNS)} values (Sensor-1..10); "
+                                     f"send other features as objects keyed by feature name")
+                return pd.DataFrame(values, columns=SENSOR_COLUMNS).reindex(columns=self.accepted)
+
+            if not all(isinstance(r, dict) for r in self.readings):
+                raise ValueError("Readings must be all lists or all objects")
+
+            df = pd.DataFrame.from_records([
+                {str(k).replace("sensor_", "Sensor-"): v for k, v in r.items()}
+                for r in self.readings
+            ])
+            unknown = [c for c in df.columns if c not in self.accepted]
+            if unknown:
+                raise ValueError(f"Unknown sensor fields: {unknown}")
+            return df.reindex(columns=self.accepted).astype(float)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
 class PredictPipeline:
     """Prediction pipeline for water sensor fault detection."""
     
-    def __init__(self):
+    # Tree models are evaluated on packed node arrays up to this batch size; past it
+    # sklearn's compiled per-tree loop is as fast or faster (see benchmarks/bench_trees.py)
+    TREE_EVALUATOR_MAX_ROWS = 512
+    # Readings carrying a smaller share of the served features are not scored by the main
+    # model; those with every water-property channel go to the fallback model instead
+    MIN_FEATURE_COVERAGE = 0.5
+    ARTIFACT_NAMES = ("preprocessor.pkl", "model.pkl")
+
+    def __init__(self, micro_batching: bool = False, batcher_config: MicroBatcherConfig = None,
+                 fallback: bool = False):
+        # fallback: serve the Sensor-1..10 model of the version (the main one when it has none)
+        self.fallback = fallback
+        # Used until a version is published to the artifact store
         self.preprocessor_path = "artifacts/preprocessor.pkl"
         self.model_path       = "artifacts/model.pkl"
+        self._version_dir = None
+        self.tree_evaluator_max_rows = self.TREE_EVALUATOR_MAX_ROWS
+        self.min_feature_coverage = self.MIN_FEATURE_COVERAGE
+        # Optional coalescer: concurrent small requests share one transform/predict call
+        self.batcher = MicroBatcher(self._predict_batch, batcher_config) if micro_batching else None
 
     def predict(self, input_df: pd.DataFrame) -> np.ndarray:
         """
-        Load preprocessor & model, pad missing features, transform, and predict.
-        
+        Predict for input_df, going through the micro-batcher when it is enabled.
+
         Args:
-            input_df: DataFrame containing only 'Sensor-1'...'Sensor-10'.
-            
+            input_df: DataFrame of sensor readings, one row per reading; columns the
+                      preprocessor does not use are ignored and missing ones imputed.
+
         Returns:
             numpy array of predictions.
         """
+        if self.batcher is not None and len(input_df) < self.batcher.config.max_batch_size:
+            return self.batcher.predict(input_df)
+        return self._predict_batch(input_df)
+
+    def artifact_paths(self) -> tuple:
+        """
+        (preprocessor, model) paths of the CURRENT artifact version, both from
+        the same version directory. When CURRENT moves, the previous
+        version's objects are dropped from the registry once.
+        """
+        version_dir = artifact_store.current_dir()
+        if version_dir is None:
+            paths = self.preprocessor_path, self.model_path
+            return self._fallback_paths(paths) if self.fallback else paths
+        if version_dir != self._version_dir:
+            if self._version_dir is not None:
+                logger.info(f"Serving artifact version {os.path.basename(version_dir)}")
+                for name in self.ARTIFACT_NAMES:
+                    model_registry.invalidate(os.path.join(self._version_dir, name))
+                    model_registry.invalidate(os.path.join(self._version_dir, FALLBACK_PREFIX + name))
+            self._version_dir = version_dir
+        paths = tuple(os.path.join(version_dir, name) for name in self.ARTIFACT_NAMES)
+        return self._fallback_paths(paths) if self.fallback else paths
+
+    @staticmethod
+    def _fallback_paths(paths: tuple) -> tuple:
+        """The fallback_ files next to paths, or paths themselves when there is no fallback"""
+        fallback = tuple(os.path.join(os.path.dirname(p), FALLBACK_PREFIX + os.path.basename(p)) for p in paths)
+        return fallback if all(os.path.exists(p) for p in fallback) else paths
+
+    def feature_names(self) -> list:
+        """Input features of the preprocessor being served (Sensor-1..10 before the first training run)"""
+        preprocessor_path, _ = self.artifact_paths()
+        if not os.path.exists(preprocessor_path):
+            return list(SENSOR_COLUMNS)
+        preprocessor = model_registry.get(preprocessor_path, loader=load_compiled_preprocessor)
+        return list(preprocessor.feature_names_in_)
+
+    def missing_features(self, input_df: pd.DataFrame) -> np.ndarray:
+        """Number of served features each row of input_df lacks (absent or NaN); these are imputed"""
+        return input_df.reindex(columns=self.feature_names()).isna().to_numpy().sum(axis=1)
+
+    def _predict_batch(self, input_df: pd.DataFrame) -> np.ndarray:
+        """
+        Fetch preprocessor & model from the registry, pad missing features, transform, and predict.
+        """
         try:
-            # 1. Load preprocessor and model objects
-            logger.info("Loading preprocessor and model")
-            preprocessor = load_object(file_path=self.preprocessor_path)
-            model        = load_object(file_path=self.model_path)
+            metrics.histogram("inference_batch_rows", "Rows per preprocessor/model call",
+                              buckets=BATCH_SIZE_BUCKETS).observe(len(input_df))
+
+            # 1. Get preprocessor and model objects (loaded once per worker, reloaded on change)
+            with metrics.timed(STAGE_SECONDS, STAGE_HELP, stage="artifact_load"):
+                preprocessor_path, model_path = self.artifact_paths()
+                preprocessor = model_registry.get(preprocessor_path, loader=load_compiled_preprocessor)
+                model        = model_registry.get(model_path)
+                if len(input_df) <= self.tree_evaluator_max_rows:
+                    # Same predictions as model.predict, without the per-estimator Python loop
+                    model = model_registry.get(model_path, loader=load_tree_evaluator) or model
 
             # 2. Determine all features seen during training
             expected_features = list(preprocessor.feature_names_in_)
 
-            # 3. Pad any missing columns with NaN
-            for feat in expected_features:
-                if feat not in input_df.columns:
-                    input_df[feat] = np.nan
-
-            # 4. Reorder columns to match training order
-            input_df = input_df[expected_features]
+            # 3. Pad any missing columns with NaN and reorder to match training order
+            input_df = input_df.reindex(columns=expected_features)
 
-            logger.info("Applying preprocessing to input data")
-            data_transformed = preprocessor.transform(input_df)
+            logger.debug("Applying preprocessing to %d rows", len(input_df))
+            with metrics.timed(STAGE_SECONDS, STAGE_HELP, stage="transform"):
+                data_transformed = preprocessor.transform(input_df)
 
-            logger.info("Performing prediction")
-            preds = model.predict(data_transformed)
+            logger.debug("Performing prediction")
+            with metrics.timed(STAGE_SECONDS, STAGE_HELP, stage="predict"):
+                preds = model.predict(data_transformed)
 
             return preds
 
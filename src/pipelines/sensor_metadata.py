@@ -0,0 +1,97 @@
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.logger import logger
+from src.pipelines.water_properties import WATER_PROPERTY_RANGES
+from src.pipelines.model_registry import model_registry
+from src.pipelines.artifact_store import artifact_store
+
+CALIBRATION_PARAMS_PATH = os.path.join('artifacts', "calibration_params.pkl")
+
+# Water property (name, unit) measured by each sensor channel
+SENSOR_PROPERTIES = {
+    "Sensor-1": ("pH", ""),
+    "Sensor-2": ("Turbidity", "NTU"),
+    "Sensor-3": ("Conductivity", "µS/cm"),
+    "Sensor-4": ("Dissolved Oxygen", "mg/L"),
+    "Sensor-5": ("Chlorine Level", "mg/L"),
+    "Sensor-6": ("Nitrate", "mg/L"),
+    "Sensor-7": ("Hardness", "gpg"),
+    "Sensor-8": ("Temperature", "°C"),
+    "Sensor-9": ("Iron Content", "µg/L"),
+    "Sensor-10": ("BOD", "mg/L"),
+}
+
+
+@dataclass(frozen=True)
+class SensorMetadata:
+    """Per-sensor names, units and (ymin, ymax) ranges, in SENSOR_PROPERTIES order"""
+    columns: tuple
+    names: tuple
+    units: tuple
+    ymin: np.ndarray
+    ymax: np.ndarray
+    labels: tuple            # form labels, e.g. "pH (0.0 - 14.0)"
+
+    @classmethod
+    def from_calibration_params(cls, calibration_params: dict) -> "SensorMetadata":
+        columns, names, units, ymin, ymax, labels = [], [], [], [], [], []
+        for ch, (name, unit) in SENSOR_PROPERTIES.items():
+            columns.append(ch)
+            names.append(name)
+            units.append(unit)
+            if ch in calibration_params:
+                lo = calibration_params[ch].get("ymin", 0)
+                hi = calibration_params[ch].get("ymax", 0)
+                labels.append(f"{name} ({lo} - {hi})")
+            else:
+                # No calibration for this channel: validate against the default range
+                lo, hi = WATER_PROPERTY_RANGES[ch]
+                labels.append(ch)
+            ymin.append(lo)
+            ymax.append(hi)
+        return cls(
+            columns=tuple(columns), names=tuple(names), units=tuple(units),
+            ymin=np.array(ymin, dtype=float), ymax=np.array(ymax, dtype=float), labels=tuple(labels),
+        )
+
+    @classmethod
+    def default(cls) -> "SensorMetadata":
+        """Metadata used when no calibration file is available"""
+        metadata = cls.from_calibration_params({})
+        return cls(
+            columns=metadata.columns, names=metadata.names, units=metadata.units,
+            ymin=metadata.ymin, ymax=metadata.ymax, labels=metadata.columns,
+        )
+
+    def out_of_range_mask(self, values: np.ndarray) -> np.ndarray:
+        """Boolean (n_rows, n_sensors) mask of readings outside [ymin, ymax]. NaN is not flagged."""
+        return (values < self.ymin) | (values > self.ymax)
+
+
+def load_sensor_metadata(file_path: str) -> SensorMetadata:
+    """Registry loader: build SensorMetadata from calibration_params.pkl"""
+    import joblib
+
+    metadata = SensorMetadata.from_calibration_params(joblib.load(file_path))
+    logger.info(f"Sensor labels loaded: {list(metadata.labels)}")
+    return metadata
+
+
+_DEFAULT_METADATA = SensorMetadata.default()
+
+
+def get_sensor_metadata(file_path: str = None) -> SensorMetadata:
+    """
+    Cached sensor metadata, rebuilt by the model registry only when the
+    calibration file changes (by default the one of the CURRENT artifact
+    version). Falls back to the default ranges if it cannot be read.
+    """
+    try:
+        file_path = file_path or artifact_store.resolve(os.path.basename(CALIBRATION_PARAMS_PATH))
+        return model_registry.get(file_path, loader=load_sensor_metadata)
+    except Exception as e:
+        logger.error(f"Error loading calibration params: {e}")
+        return _DEFAULT_METADATA
@@ -0,0 +1,210 @@
+"""
+Content-addressed cache for training pipeline stages.
+
+Every stage derives a key from everything its output depends on: content
+hashes of its input files, its config, the source of the modules that
+implement it and the library versions. When a key is already cached, the
+stage copies its outputs back into artifacts/ instead of running. Entries
+are evicted least-recently-used once the cache grows past max_bytes.
+
+    cache = StageCache()
+    key = fingerprint("transformation", train=file_sha256(train_path), config=asdict(config),
+                      code=code_version(data_transformation))
+    entry = cache.restore(key)
+    if entry is None:
+        ... run the stage ...
+        cache.put(key, "transformation", [preprocessor_path, ...], seconds=elapsed)
+"""
+import os
+import sys
+import json
+import time
+import pickle
+import shutil
+import hashlib
+import inspect
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from src.exception import CustomException
+from src.logger import logger
+
+
+@dataclass
+class StageCacheConfig:
+    """Configuration for the training stage cache"""
+    root: str = os.path.join('artifacts', "stage_cache")
+    max_bytes: int = 2 * 1024 ** 3
+    enabled: bool = True
+
+
+def _library_versions() -> dict:
+    import numpy
+    import pandas
+    import sklearn
+
+    return {"python": sys.version.split()[0], "numpy": numpy.__version__,
+            "pandas": pandas.__version__, "sklearn": sklearn.__version__}
+
+
+def code_version(*modules) -> str:
+    """sha256 over the source files of modules and the installed library versions"""
+    digest = hashlib.sha256(json.dumps(_library_versions(), sort_keys=True).encode())
+    for module in modules:
+        with open(inspect.getsourcefile(module), "rb") as file_obj:
+            digest.update(file_obj.read())
+    return digest.hexdigest()
+
+
+def fingerprint(stage: str, **parts) -> str:
+    """Cache key of a stage: sha256 of its name and canonical JSON of parts (non-JSON values use str())"""
+    payload = json.dumps({"stage": stage, **parts}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class StageCache:
+    """
+    Directory of cached stage outputs, one entry per key:
+
+        <root>/<key>/meta.json      stage, original file paths, size, compute time, last use
+        <root>/<key>/files/...      copies of the output files
+        <root>/<key>/result.pkl     optional in-memory result (e.g. fitted model and scores)
+    """
+
+    def __init__(self, config: StageCacheConfig = None):
+        self.config = config or StageCacheConfig()
+        self.hits = 0
+        self.misses = 0
+        # Compute time of the stages that were restored instead of run
+        self.saved_seconds = 0.0
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.config.root, key)
+
+    def _read_meta(self, key: str) -> Optional[dict]:
+        path = os.path.join(self._entry_dir(key), "meta.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as file_obj:
+            return json.load(file_obj)
+
+    def _write_meta(self, entry_dir: str, meta: dict):
+        tmp_path = os.path.join(entry_dir, f"meta.json.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as file_obj:
+            json.dump(meta, file_obj, indent=2)
+        os.replace(tmp_path, os.path.join(entry_dir, "meta.json"))
+
+    def get(self, key: str) -> Optional[dict]:
+        """meta of a cached entry (and mark it as used), or None"""
+        if not self.config.enabled:
+            return None
+        try:
+            meta = self._read_meta(key)
+            if meta is None:
+                self.misses += 1
+                return None
+            meta["last_used"] = time.time()
+            self._write_meta(self._entry_dir(key), meta)
+            self.hits += 1
+            self.saved_seconds += meta.get("seconds", 0.0)
+            return meta
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def restore(self, key: str) -> Optional[dict]:
+        """Copy a cached entry's files back to their original paths; None on a miss"""
+        meta = self.get(key)
+        if meta is None:
+            return None
+        try:
+            files_dir = os.path.join(self._entry_dir(key), "files")
+            for item in meta["files"]:
+                os.makedirs(os.path.dirname(item["path"]) or ".", exist_ok=True)
+                # Copy then rename: a process still mapping the old file keeps its copy
+                tmp_path = f"{item['path']}.{os.getpid()}.tmp"
+                shutil.copyfile(os.path.join(files_dir, item["name"]), tmp_path)
+                os.replace(tmp_path, item["path"])
+            logger.info(f"Stage '{meta['stage']}' unchanged (key {key[:12]}): restored "
+                        f"{len(meta['files'])} file(s), skipped {meta.get('seconds', 0.0):.2f}s of work")
+            return meta
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def load_result(self, key: str) -> Any:
+        with open(os.path.join(self._entry_dir(key), "result.pkl"), "rb") as file_obj:
+            return pickle.load(file_obj)
+
+    def put(self, key: str, stage: str, files: List[str] = (), result: Any = None, seconds: float = 0.0):
+        """Store copies of files (and a picklable result) under key, then evict down to max_bytes"""
+        if not self.config.enabled:
+            return
+        try:
+            entry_dir = self._entry_dir(key)
+            tmp_dir = f"{entry_dir}.{os.getpid()}.tmp"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(os.path.join(tmp_dir, "files"))
+
+            items = []
+            for i, path in enumerate(files):
+                name = f"{i}_{os.path.basename(path)}"
+                shutil.copyfile(path, os.path.join(tmp_dir, "files", name))
+                items.append({"path": path, "name": name})
+            if result is not None:
+                with open(os.path.join(tmp_dir, "result.pkl"), "wb") as file_obj:
+                    pickle.dump(result, file_obj)
+
+            size = sum(os.path.getsize(os.path.join(dirpath, f))
+                       for dirpath, _, filenames in os.walk(tmp_dir) for f in filenames)
+            now = time.time()
+            self._write_meta(tmp_dir, {"stage": stage, "key": key, "files": items, "seconds": seconds,
+                                       "size_bytes": size, "created_at": now, "last_used": now})
+
+            if os.path.exists(entry_dir):
+                # Another run stored the same key meanwhile; both hold the same content
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            else:
+                os.replace(tmp_dir, entry_dir)
+            self.evict(keep=key)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def entries(self) -> List[dict]:
+        if not os.path.isdir(self.config.root):
+            return []
+        metas = []
+        for name in os.listdir(self.config.root):
+            if name.endswith(".tmp"):
+                continue
+            meta = self._read_meta(name)
+            if meta is not None:
+                metas.append(meta)
+        return metas
+
+    def evict(self, keep: str = None) -> int:
+        """Drop least recently used entries until the cache fits in max_bytes; returns bytes freed"""
+        entries = sorted(self.entries(), key=lambda m: m["last_used"])
+        total = sum(m["size_bytes"] for m in entries)
+        freed = 0
+        for meta in entries:
+            if total - freed <= self.config.max_bytes:
+                break
+            if meta["key"] == keep:
+                continue
+            shutil.rmtree(self._entry_dir(meta["key"]), ignore_errors=True)
+            freed += meta["size_bytes"]
+            logger.info(f"Evicted cached stage '{meta['stage']}' ({meta['size_bytes'] / 2**20:.1f} MiB)")
+        return freed
+
+    def stats(self) -> dict:
+        entries = self.entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "saved_seconds": self.saved_seconds,
+            "entries": len(entries),
+            "size_bytes": sum(m["size_bytes"] for m in entries),
+            "max_bytes": self.config.max_bytes,
+        }
@@ -0,0 +1,209 @@
+"""
+Worker cold start: artifact preloading and a startup-time report.
+
+application.py calls preload_artifacts() at import time. Under gunicorn
+with preload_app (see gunicorn.conf.py) that import runs once in the
+master, so every forked worker starts with the preprocessor, model, tree
+evaluator and sensor metadata (and the fallback model, when published)
+already in the model registry.
+
+    python -m src.pipelines.startup            # import profile + artifact load times
+    python -m src.pipelines.startup --top 20 --output startup.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Tuple
+
+from src.exception import CustomException
+from src.logger import logger
+from src.pipelines.model_registry import model_registry
+from src.pipelines.compiled_preprocessor import load_compiled_preprocessor
+from src.pipelines.tree_evaluator import load_tree_evaluator
+from src.pipelines.sensor_metadata import CALIBRATION_PARAMS_PATH, load_sensor_metadata
+from src.pipelines.artifact_store import FALLBACK_PREFIX, artifact_store
+from src.utils import load_object
+
+# Modules the serving path should never import; their presence after startup
+# means a training dependency leaked into the web app's import graph
+TRAINING_ONLY_MODULES = (
+    "src.components", "src.pipelines.training_pipeline",
+    "dill", "matplotlib", "seaborn", "xgboost", "catboost",
+)
+
+
+@dataclass
+class StartupConfig:
+    # None: the file of the CURRENT artifact version (or artifacts/ before the first publish)
+    preprocessor_path: str = None
+    model_path: str = None
+    calibration_params_path: str = None
+
+    def artifacts(self) -> List[Tuple[str, str, Callable]]:
+        """(name, path, registry loader) for everything a prediction touches, in load order"""
+        preprocessor_path = self.preprocessor_path or artifact_store.resolve("preprocessor.pkl")
+        model_path = self.model_path or artifact_store.resolve("model.pkl")
+        calibration_params_path = (self.calibration_params_path
+                                   or artifact_store.resolve(os.path.basename(CALIBRATION_PARAMS_PATH)))
+        artifacts = [
+            ("preprocessor", preprocessor_path, load_compiled_preprocessor),
+            ("model", model_path, load_object),
+            ("tree_evaluator", model_path, load_tree_evaluator),
+            ("sensor_metadata", calibration_params_path, load_sensor_metadata),
+        ]
+        # Sensor-1..10 fallback model, only when the served version has one
+        fallback_preprocessor_path = artifact_store.resolve(FALLBACK_PREFIX + "preprocessor.pkl")
+        fallback_model_path = artifact_store.resolve(FALLBACK_PREFIX + "model.pkl")
+        if os.path.exists(fallback_preprocessor_path) and os.path.exists(fallback_model_path):
+            artifacts += [
+                ("fallback_preprocessor", fallback_preprocessor_path, load_compiled_preprocessor),
+                ("fallback_model", fallback_model_path, load_object),
+                ("fallback_tree_evaluator", fallback_model_path, load_tree_evaluator),
+            ]
+        return artifacts
+
+
+@dataclass
+class StartupReport:
+    """Where a worker's cold start went"""
+    import_seconds: float = 0.0
+    artifact_seconds: Dict[str, float] = field(default_factory=dict)
+    missing: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    training_modules: List[str] = field(default_factory=list)
+    max_rss_bytes: int = 0
+
+    @property
+    def total_seconds(self) -> float:
+        return self.import_seconds + sum(self.artifact_seconds.values())
+
+    def to_dict(self) -> dict:
+        return {
+            "import_seconds": self.import_seconds,
+            "artifact_seconds": self.artifact_seconds,
+            "total_seconds": self.total_seconds,
+            "missing": self.missing,
+            "failed": self.failed,
+            "training_modules": self.training_modules,
+            "max_rss_bytes": self.max_rss_bytes,
+        }
+
+    def log(self):
+        loads = ", ".join(f"{name} {secs:.3f}s" for name, secs in self.artifact_seconds.items()) or "none"
+        logger.info(f"Startup: imports {self.import_seconds:.3f}s, artifacts [{loads}], "
+                    f"total {self.total_seconds:.3f}s, max RSS {self.max_rss_bytes / 2**20:.1f} MiB")
+        if self.missing:
+            logger.warning(f"Startup: artifacts not found, loaded on first request instead: {self.missing}")
+        for name, error in self.failed.items():
+            logger.error(f"Startup: could not preload {name}: {error}")
+        if self.training_modules:
+            logger.warning(f"Startup: training-only modules imported by the serving path: {self.training_modules}")
+
+    def collect_metrics(self):
+        """Metrics collector: import and per-artifact load time of this process"""
+        yield "startup_import_seconds", "gauge", "Time spent importing the web app", {}, self.import_seconds
+        for name, secs in self.artifact_seconds.items():
+            yield "startup_artifact_seconds", "gauge", "Time spent preloading each artifact", {"artifact": name}, secs
+
+
+def loaded_training_modules() -> List[str]:
+    """TRAINING_ONLY_MODULES (or their submodules) currently in sys.modules"""
+    return sorted({
+        prefix for prefix in TRAINING_ONLY_MODULES
+        for name in list(sys.modules) if name == prefix or name.startswith(prefix + ".")
+    })
+
+
+def max_rss_bytes() -> int:
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def preload_artifacts(config: StartupConfig = None, import_seconds: float = 0.0) -> StartupReport:
+    """
+    Load every serving artifact into the model registry and time each load.
+
+    Missing or unreadable files are reported and skipped rather than failing
+    the import; the registry retries them on the first request.
+    """
+    try:
+        config = config or StartupConfig()
+        report = StartupReport(import_seconds=import_seconds)
+        for name, path, loader in config.artifacts():
+            if not os.path.exists(path):
+                report.missing.append(path)
+                continue
+            start = time.perf_counter()
+            try:
+                model_registry.get(path, loader=loader)
+            except Exception as load_error:
+                report.failed[name] = str(load_error)
+                continue
+            report.artifact_seconds[name] = time.perf_counter() - start
+        report.training_modules = loaded_training_modules()
+        report.max_rss_bytes = max_rss_bytes()
+        return report
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+\d+\s+\|\s*(\S+)")
+
+
+def profile_imports(module: str = "application") -> Dict[str, float]:
+    """
+    Import module in a fresh interpreter under -X importtime and return the
+    self time in seconds per top-level package, most expensive first.
+    """
+    try:
+        env = dict(os.environ, PRELOAD_ARTIFACTS="0", LOG_FILE="", LOG_MODE="sync")
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True, env=env
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+        totals: Dict[str, float] = {}
+        for line in result.stderr.splitlines():
+            match = _IMPORTTIME_LINE.match(line)
+            if match:
+                package = match.group(2).split(".")[0]
+                totals[package] = totals.get(package, 0.0) + int(match.group(1)) / 1e6
+        return dict(sorted(totals.items(), key=lambda kv: kv[1], reverse=True))
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="application", help="module to profile (default: application)")
+    parser.add_argument("--top", type=int, default=15, help="packages to show in the import profile")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    packages = profile_imports(args.module)
+    import_seconds = time.perf_counter() - start
+    report = preload_artifacts()
+    doc = {
+        # Wall time of the whole subprocess, interpreter start-up included
+        "import_wall_seconds": import_seconds,
+        "import_self_seconds_by_package": dict(list(packages.items())[:args.top]),
+        "artifacts": report.to_dict(),
+    }
+    text = json.dumps(doc, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
@@ -0,0 +1,298 @@
+import sys
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, asdict
+from typing import Hashable, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src.exception import CustomException
+from src.logger import logger
+
+
+@dataclass
+class StreamDetectorConfig:
+    """Configuration for the streaming fault detector"""
+    n_sensors: int = 10
+    window: int = 32                 # readings kept per unit and sensor
+    capacity: int = 100_000          # tracked units; the least recently seen is evicted beyond this
+    buffer_dtype: str = "float32"    # ring-buffer storage; statistics are accumulated in float64
+    min_samples: int = 16            # readings in the window before spike checks start
+    spike_z: float = 6.0             # |x - window mean| above this many window stds is a spike
+    stuck_readings: int = 10         # identical consecutive readings that make a stuck sensor
+    stuck_tolerance: float = 1e-9
+    drift_z: float = 4.0             # window mean this many standard errors off the baseline is drift
+    baseline_alpha: float = 0.001    # EWMA rate of the long-term baseline
+    max_events: int = 10_000         # recent events kept for inspection
+
+
+@dataclass
+class FaultEvent:
+    unit_id: Hashable
+    sensor: str
+    kind: str          # "spike", "stuck", "drift"
+    value: float
+    score: float       # z-score for spike/drift, run length for stuck
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class StreamDetector:
+    """
+    Sliding-window fault detector keeping rolling statistics per sensor unit.
+
+    State is a struct of arrays indexed by slot: a (capacity, window,
+    n_sensors) ring buffer plus running sums, sums of squares, valid counts,
+    last values, stuck-run counters and an EWMA baseline. Each reading
+    updates them in O(1) (the outgoing value is subtracted, the new one
+    added; sums are recomputed from the buffer every time the ring wraps to
+    keep float error bounded). Memory is fixed at allocation, about
+    window * n_sensors * 4 bytes plus ~90 bytes per sensor per unit.
+
+    Units map to slots through an LRU dict; when all slots are in use the
+    least recently seen unit is evicted. NaN readings are skipped.
+
+    Each worker process keeps its own state, so readings of one unit must
+    reach the same process.
+    """
+
+    def __init__(self, config: StreamDetectorConfig = None, sensor_names: Sequence[str] = None):
+        self.config = config or StreamDetectorConfig()
+        n_sensors = self.config.n_sensors
+        self.sensor_names = list(sensor_names or [f"Sensor-{i}" for i in range(1, n_sensors + 1)])
+        if len(self.sensor_names) != n_sensors:
+            raise ValueError(f"Expected {n_sensors} sensor names, got {len(self.sensor_names)}")
+        self.recent_events = deque(maxlen=self.config.max_events)
+        self.event_counts = {"spike": 0, "stuck": 0, "drift": 0}
+        self.evictions = 0
+        self._slots = OrderedDict()      # unit_id -> slot, least recently seen first
+        self._free = []
+        self._lock = threading.Lock()
+        self._allocated = False
+
+    def _allocate(self):
+        # Lazy, so importing the serving app does not reserve the full capacity up front
+        c, w, s = self.config.capacity, self.config.window, self.config.n_sensors
+        self._buffer = np.full((c, w, s), np.nan, dtype=self.config.buffer_dtype)
+        self._pos = np.zeros(c, dtype=np.int32)
+        self._count = np.zeros(c, dtype=np.int64)
+        self._n = np.zeros((c, s), dtype=np.int32)
+        self._sum = np.zeros((c, s))
+        self._sumsq = np.zeros((c, s))
+        self._last = np.full((c, s), np.nan)
+        self._roc = np.full((c, s), np.nan)
+        self._stuck_run = np.zeros((c, s), dtype=np.int32)
+        self._base_mean = np.full((c, s), np.nan)
+        self._base_var = np.full((c, s), np.nan)
+        self._drift_active = np.zeros((c, s), dtype=bool)
+        self._free = list(range(c - 1, -1, -1))
+        self._allocated = True
+        logger.info(f"Allocated streaming detector state for {c} units ({self.memory_bytes() / 1e6:.1f} MB)")
+
+    def _reset(self, slots: np.ndarray):
+        self._buffer[slots] = np.nan
+        for arr, value in ((self._pos, 0), (self._count, 0), (self._n, 0), (self._sum, 0.0),
+                           (self._sumsq, 0.0), (self._last, np.nan), (self._roc, np.nan),
+                           (self._stuck_run, 0), (self._base_mean, np.nan), (self._base_var, np.nan),
+                           (self._drift_active, False)):
+            arr[slots] = value
+
+    def _assign_slots(self, unit_ids: Sequence[Hashable]) -> np.ndarray:
+        slots = np.empty(len(unit_ids), dtype=np.int64)
+        fresh = []
+        for i, unit_id in enumerate(unit_ids):
+            slot = self._slots.get(unit_id)
+            if slot is not None:
+                self._slots.move_to_end(unit_id)
+            else:
+                if self._free:
+                    slot = self._free.pop()
+                else:
+                    _, slot = self._slots.popitem(last=False)
+                    self.evictions += 1
+                self._slots[unit_id] = slot
+                fresh.append(slot)
+            slots[i] = slot
+        if fresh:
+            self._reset(np.asarray(fresh))
+        return slots
+
+    def update(self, unit_id: Hashable, values) -> list:
+        """Add one reading of unit_id; returns the fault events it triggered"""
+        return self.update_batch([unit_id], np.asarray(values, dtype=float)[None, :])
+
+    def update_batch(self, unit_ids: Sequence[Hashable], values) -> list:
+        """
+        Add one reading per row of values (shape (n, n_sensors)) for the given units.
+
+        Readings of the same unit are applied in row order. Returns the fault events triggered.
+        """
+        try:
+            values = np.asarray(values, dtype=float)
+            if values.ndim != 2 or values.shape[1] != self.config.n_sensors:
+                raise ValueError(f"values must have shape (n, {self.config.n_sensors})")
+            if len(unit_ids) != len(values):
+                raise ValueError("unit_ids and values must have the same length")
+            if not len(values):
+                return []
+
+            with self._lock:
+                if not self._allocated:
+                    self._allocate()
+                if len(set(unit_ids)) > self.config.capacity:
+                    raise ValueError(f"Batch has more units than the detector capacity ({self.config.capacity})")
+                slots = self._assign_slots(unit_ids)
+
+                # Rows of a unit that repeats in the batch go in successive rounds
+                rank = pd.Series(slots).groupby(slots).cumcount().to_numpy()
+                events = []
+                for r in range(int(rank.max()) + 1):
+                    rows = np.flatnonzero(rank == r)
+                    events.extend(self._update_slots(slots[rows], values[rows], [unit_ids[i] for i in rows]))
+
+            self.recent_events.extend(events)
+            for event in events:
+                self.event_counts[event.kind] += 1
+            return events
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _update_slots(self, slots: np.ndarray, X: np.ndarray, unit_ids: list) -> list:
+        """One reading per (distinct) slot, vectorized across the batch"""
+        cfg = self.config
+        window = cfg.window
+        valid = ~np.isnan(X)
+        # Accumulate exactly what the buffer stores, so subtracting it later cancels exactly
+        Xq = X.astype(cfg.buffer_dtype).astype(float)
+
+        n = self._n[slots]
+        s, ss = self._sum[slots], self._sumsq[slots]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_prev = s / n
+            std_prev = np.sqrt(np.maximum(ss / n - mean_prev ** 2, 0.0))
+
+        # Spike: far outside the window seen so far (scale floor keeps constant channels sane)
+        floor = 1e-9 + 1e-6 * np.abs(mean_prev)
+        with np.errstate(invalid="ignore"):
+            spike_score = np.abs(Xq - mean_prev) / np.maximum(std_prev, floor)
+        spike = valid & (n >= cfg.min_samples) & (spike_score > cfg.spike_z)
+        # Spikes enter the window clipped to the spike bound, so one outlier cannot
+        # pass for drift while a genuine level shift still moves the window
+        bound = cfg.spike_z * np.maximum(std_prev, floor)
+        Xq = np.where(spike, np.clip(Xq, mean_prev - bound, mean_prev + bound), Xq)
+        Xq = Xq.astype(cfg.buffer_dtype).astype(float)
+
+        # Ring buffer: drop the outgoing reading, add the new one
+        pos = self._pos[slots]
+        old = self._buffer[slots, pos].astype(float)
+        old_valid = ~np.isnan(old)
+        old = np.where(old_valid, old, 0.0)
+        new = np.where(valid, Xq, 0.0)
+        s = s - old + new
+        ss = ss - old * old + new * new
+        n = n - old_valid + valid
+        self._buffer[slots, pos] = Xq
+        pos = (pos + 1) % window
+
+        wrapped = pos == 0
+        if wrapped.any():
+            # Resync the running sums once per window: amortized O(1), no float creep
+            buf = self._buffer[slots[wrapped]].astype(float)
+            s[wrapped] = np.nansum(buf, axis=1)
+            ss[wrapped] = np.nansum(buf * buf, axis=1)
+            n[wrapped] = (~np.isnan(buf)).sum(axis=1)
+
+        self._sum[slots], self._sumsq[slots], self._n[slots], self._pos[slots] = s, ss, n, pos
+        count = self._count[slots] + 1
+        self._count[slots] = count
+
+        # Rate of change and stuck-value runs
+        last = self._last[slots]
+        raw = X.astype(cfg.buffer_dtype).astype(float)
+        self._roc[slots] = np.where(valid, raw - last, self._roc[slots])
+        same = valid & (np.abs(raw - last) <= cfg.stuck_tolerance)
+        stuck_run = np.where(same, self._stuck_run[slots] + 1, np.where(valid, 0, self._stuck_run[slots]))
+        self._stuck_run[slots] = stuck_run
+        self._last[slots] = np.where(valid, raw, last)
+        stuck = stuck_run == cfg.stuck_readings - 1     # n identical readings = n-1 repeats
+
+        # Drift: window mean against a slow EWMA baseline, seeded from the first full window
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_now = s / n
+            var_now = np.maximum(ss / n - mean_now ** 2, 0.0)
+        base_mean, base_var = self._base_mean[slots], self._base_var[slots]
+        seed = (count[:, None] >= window) & np.isnan(base_mean) & (n > 0)
+        base_mean = np.where(seed, mean_now, base_mean)
+        base_var = np.where(seed, var_now, base_var)
+        tracking = valid & ~seed & ~np.isnan(base_mean)
+        alpha = cfg.baseline_alpha
+        delta = np.where(tracking, Xq - base_mean, 0.0)
+        base_mean = base_mean + alpha * delta
+        base_var = np.where(tracking, (1 - alpha) * (base_var + alpha * delta * delta), base_var)
+        self._base_mean[slots], self._base_var[slots] = base_mean, base_var
+
+        floor = 1e-9 + 1e-6 * np.abs(base_mean)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            drift_score = np.abs(mean_now - base_mean) / np.maximum(np.sqrt(base_var / n), floor)
+        drift_on = (n >= cfg.min_samples) & (drift_score > cfg.drift_z)
+        drift_on &= ~np.isnan(drift_score)
+        drift = drift_on & ~self._drift_active[slots]
+        self._drift_active[slots] = drift_on
+
+        events = []
+        for kind, mask, score in (("spike", spike, spike_score), ("stuck", stuck, stuck_run + 1),
+                                  ("drift", drift, drift_score)):
+            for i, j in zip(*np.nonzero(mask)):
+                events.append(FaultEvent(unit_ids[i], self.sensor_names[j], kind, float(X[i, j]), float(score[i, j])))
+        return events
+
+    def unit_stats(self, unit_id: Hashable) -> dict:
+        """Current window statistics of one unit, per sensor"""
+        slot = self._slots.get(unit_id)
+        if slot is None:
+            return None
+        n = self._n[slot]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self._sum[slot] / n
+            var = np.maximum(self._sumsq[slot] / n - mean ** 2, 0.0)
+        return {
+            "readings": int(self._count[slot]),
+            "sensors": {
+                name: {
+                    "window_count": int(n[j]),
+                    "mean": float(mean[j]),
+                    "variance": float(var[j]),
+                    "rate_of_change": float(self._roc[slot, j]),
+                    "stuck_run": int(self._stuck_run[slot, j]) + 1 if self._stuck_run[slot, j] else 0,
+                    "baseline_mean": float(self._base_mean[slot, j]),
+                    "drifting": bool(self._drift_active[slot, j]),
+                }
+                for j, name in enumerate(self.sensor_names)
+            },
+        }
+
+    def memory_bytes(self) -> int:
+        if not self._allocated:
+            return 0
+        arrays = (self._buffer, self._pos, self._count, self._n, self._sum, self._sumsq, self._last,
+                  self._roc, self._stuck_run, self._base_mean, self._base_var, self._drift_active)
+        return int(sum(a.nbytes for a in arrays))
+
+    def stats(self) -> dict:
+        return {
+            "tracked_units": len(self._slots),
+            "capacity": self.config.capacity,
+            "evictions": self.evictions,
+            "events": dict(self.event_counts),
+            "memory_bytes": self.memory_bytes(),
+        }
+
+    def collect_metrics(self):
+        """Metrics collector: tracked units, evictions and events by kind"""
+        yield "stream_tracked_units", "gauge", "Sensor units with live window state", {}, len(self._slots)
+        yield "stream_evictions_total", "counter", "Units evicted to stay within capacity", {}, self.evictions
+        for kind, count in self.event_counts.items():
+            yield "stream_fault_events_total", "counter", "Streaming fault events by kind", {"kind": kind}, count
@@ -1,13 +1,39 @@
 import sys
 import os
+import glob
+import time
+import argparse
+from dataclasses import asdict
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Imports
-from src.logger import logger
+from src import utils
+from src.logger import logger, configure_logging
 from src.exception import CustomException
+from src.utils import load_numpy_array_data
+from src.components import data_ingestion, data_calibration, data_transformation, feature_selection, model_trainer
 from src.components.data_ingestion import DataIngestion
+from src.components.data_calibration import DataCalibration
 from src.components.data_transformation import DataTransformation
+from src.components.feature_selection import FeatureSelection, load_selected_features
 from src.components.model_trainer import ModelTrainer
+from src.components.data_transformation import DataTransformationConfig
+from src.components.incremental_trainer import IncrementalTrainer
+from src.pipelines import calibration, knn_imputer, compiled_preprocessor, model_export
+from src.pipelines.model_registry import file_sha256
+from src.pipelines.artifact_store import FALLBACK_PREFIX
+from src.pipelines.water_properties import WATER_PROPERTY_RANGES
+from src.pipelines.stage_cache import StageCache, StageCacheConfig, fingerprint, code_version
+
+
+def _fallback_path(path: str) -> str:
+    """artifacts/model.pkl -> artifacts/fallback_model.pkl"""
+    return os.path.join(os.path.dirname(path), FALLBACK_PREFIX + os.path.basename(path))
+
+
+def _written_since(start: float, paths: list) -> list:
+    """The paths that exist and were modified at or after start (a time.time() value)"""
+    return [p for p in dict.fromkeys(paths) if os.path.exists(p) and os.path.getmtime(p) >= start]
 
 
 class TrainingPipeline:
@@ -16,53 +42,262 @@ class TrainingPipeline:
     def __init__(self):
         pass
 
-    def start_training(self):
+    def start_training(self, streaming: bool = False, source_paths: list = None, use_cache: bool = True):
         """
         Start the complete training pipeline
 
+        Each stage is keyed by the content of its inputs, its config and its
+        code; a stage whose key is in the stage cache restores its outputs
+        instead of running, and so does each model's hyperparameter search.
+
+        Args:
+            streaming: ingest the wafer dumps chunk by chunk (bounded memory) instead of one CSV
+            source_paths: files to stream (default: the ingestion config's glob)
+            use_cache: skip unchanged stages (False always runs every stage)
+
         Returns:
             Model accuracy score
         """
         try:
             logger.info("Training pipeline started")
+            start = time.perf_counter()
+            cache = StageCache(StageCacheConfig(enabled=use_cache))
 
             # 1. Data Ingestion
             logger.info("Starting Data Ingestion")
-            data_ingestion = DataIngestion()
-            train_data_path, test_data_path = data_ingestion.initiate_data_ingestion()
+            source_paths = self.source_paths(streaming, source_paths)
+            train_data_path, test_data_path = self.run_ingestion(cache, streaming, source_paths)
             logger.info("Data Ingestion completed")
 
-            # 2. Data Transformation (will now automatically use RescaleToWaterProperty)
+            if not streaming:
+                logger.info("Starting Data Calibration")
+                self.run_calibration(cache, train_data_path)
+                logger.info("Data Calibration completed")
+
+            # 2. Feature Selection over every channel of the train split
+            logger.info("Starting Feature Selection")
+            features = self.run_feature_selection(cache, train_data_path)
+            logger.info("Feature Selection completed")
+
+            # 3. Data Transformation (will now automatically use RescaleToWaterProperty)
             logger.info("Starting Data Transformation")
-            data_transformation = DataTransformation()
-            train_arr, test_arr, preprocessor_path = data_transformation.initiate_data_transformation(
-                train_data_path, test_data_path
-            )
+            train_arr, test_arr, preprocessor_path = self.run_transformation(cache, train_data_path, test_data_path,
+                                                                             features)
             logger.info("Data Transformation completed")
 
             # train_arr and test_arr shape: (n_samples, n_features+1)
-            # Last column is target
+            # Last column is target. Both are read-only memmaps in Fortran order,
+            # so these slices are views of the mapped files, not copies
             X_train, y_train = train_arr[:, :-1], train_arr[:, -1]
             X_test, y_test   = test_arr[:, :-1], test_arr[:, -1]
 
-            # 3. Model Training
+            # 4. Model Training (each candidate's search is cached on its own)
             logger.info("Starting Model Training")
-            model_trainer = ModelTrainer()
-            accuracy = model_trainer.initiate_model_trainer(
+            trainer = ModelTrainer()
+            accuracy = trainer.initiate_model_trainer(
                 X_train, y_train,
                 X_test, y_test,
-                preprocessor_path=preprocessor_path  # optional if trainer needs it
+                preprocessor_path=preprocessor_path,  # optional if trainer needs it
+                cache=cache
             )
             logger.info("Model Training completed")
 
-            logger.info(f"Training pipeline completed with accuracy: {accuracy}")
+            # 5. Fallback model on the water-property channels, for the form and clients that send only those
+            logger.info("Starting Fallback Model Training")
+            fallback_accuracy = self.run_fallback(cache, train_data_path, test_data_path, features)
+            logger.info("Fallback Model Training completed")
+
+            # 6. Publish: a new artifact version, served as soon as CURRENT points at it.
+            # An unchanged re-run reuses the version built from the same inputs
+            version = trainer.publish(preprocessor_path, metrics={
+                "mode": "full",
+                "accuracy": accuracy,
+                "best_model": trainer.best_model_name,
+                "test_scores": {name: r["test_score"] for name, r in trainer.model_report.items()},
+                "fallback_accuracy": fallback_accuracy,
+                "batches": {file_sha256(path): path for path in source_paths},
+            }, key=self.run_key(trainer, preprocessor_path) if use_cache else None)
+
+            seconds = time.perf_counter() - start
+            logger.info(f"Training pipeline completed with accuracy: {accuracy} in {seconds:.2f}s, version {version} "
+                        f"({cache.hits} cached stage(s), {cache.saved_seconds:.2f}s of work skipped)")
+            # Baseline that incremental runs are compared against: the cost without the cache
+            IncrementalTrainer().record_full_training(seconds + cache.saved_seconds, accuracy)
             return accuracy
 
         except Exception as e:
             logger.error("Error in training pipeline")
             raise CustomException(e, sys)
 
+    @staticmethod
+    def source_paths(streaming: bool, source_paths: list = None) -> list:
+        """Files the run ingests"""
+        config = DataIngestion().ingestion_config
+        if streaming:
+            return source_paths or sorted(glob.glob(config.stream_source_glob))
+        return [config.source_data_path]
+
+    @staticmethod
+    def run_key(trainer: ModelTrainer, preprocessor_path: str) -> str:
+        """Fingerprint of everything the published model was built from"""
+        transformation_config = DataTransformationConfig()
+        matrices = [transformation_config.train_arr_file_path, transformation_config.test_arr_file_path]
+        inputs = [preprocessor_path, *matrices, DataCalibration().calibration_config.calibration_params_path]
+        inputs += [_fallback_path(path) for path in [preprocessor_path, *matrices]]
+        return fingerprint("publish", inputs=[file_sha256(path) if os.path.exists(path) else None
+                                              for path in inputs],
+                           config=asdict(trainer.model_trainer_config),
+                           code=code_version(model_trainer, model_export, utils))
+
+    def run_ingestion(self, cache: StageCache, streaming: bool, source_paths: list) -> tuple:
+        """Ingest the source data, or restore the splits of an identical earlier run"""
+        ingestion = DataIngestion()
+        config = ingestion.ingestion_config
+        modules = [data_ingestion, utils] + ([data_calibration] if streaming else [])
+        key = fingerprint("ingestion", streaming=streaming, config=asdict(config),
+                          sources=[(path, file_sha256(path)) for path in source_paths],
+                          code=code_version(*modules))
+        if cache.restore(key) is not None:
+            return cache.load_result(key)
+
+        started, start = time.time(), time.perf_counter()
+        if streaming:
+            # Calibration stats are accumulated during the streaming pass
+            paths = ingestion.initiate_streaming_ingestion(source_paths)
+        else:
+            paths = ingestion.initiate_data_ingestion()
+
+        calib_config = DataCalibration().calibration_config
+        outputs = [config.train_data_path, config.test_data_path, config.raw_data_path, *paths,
+                   config.format_report_path, calib_config.calibration_params_path, calib_config.calibration_stats_path]
+        outputs += [os.path.splitext(p)[0] + ".csv" for p in outputs]
+        cache.put(key, "ingestion", _written_since(started, outputs), result=paths,
+                  seconds=time.perf_counter() - start)
+        return paths
+
+    def run_calibration(self, cache: StageCache, train_data_path: str):
+        """Calibration params for the train split, restored when that split is unchanged"""
+        calib = DataCalibration()
+        config = calib.calibration_config
+        key = fingerprint("calibration", train=file_sha256(train_data_path), config=asdict(config),
+                          code=code_version(data_calibration, calibration))
+        if cache.restore(key) is not None:
+            return
+
+        start = time.perf_counter()
+        calib.initiate_calibration([train_data_path])
+        cache.put(key, "calibration", [config.calibration_params_path, config.calibration_stats_path],
+                  seconds=time.perf_counter() - start)
+
+    def run_feature_selection(self, cache: StageCache, train_data_path: str) -> list:
+        """Selected channels of the train split, restored when that split is unchanged"""
+        selection = FeatureSelection()
+        config = selection.feature_selection_config
+        key = fingerprint("feature_selection", train=file_sha256(train_data_path), config=asdict(config),
+                          code=code_version(feature_selection, data_calibration))
+        if cache.restore(key) is not None:
+            return load_selected_features(config.selected_features_path)
+
+        start = time.perf_counter()
+        features = selection.initiate_feature_selection(train_data_path)
+        cache.put(key, "feature_selection", [config.selected_features_path], seconds=time.perf_counter() - start)
+        return features
+
+    def run_transformation(self, cache: StageCache, train_data_path: str, test_data_path: str,
+                           features: list = None, config: DataTransformationConfig = None) -> tuple:
+        """Fitted preprocessor and transformed arrays, restored when splits, features and calibration are unchanged"""
+        transformation = DataTransformation()
+        if config is not None:
+            transformation.data_transformation_config = config
+        config = transformation.data_transformation_config
+        calibration_params_path = DataCalibration().calibration_config.calibration_params_path
+        key = fingerprint("transformation", train=file_sha256(train_data_path), test=file_sha256(test_data_path),
+                          calibration=file_sha256(calibration_params_path), config=asdict(config), features=features,
+                          code=code_version(data_transformation, calibration, knn_imputer, compiled_preprocessor))
+        if cache.restore(key) is not None:
+            return (load_numpy_array_data(config.train_arr_file_path, mmap_mode="r"),
+                    load_numpy_array_data(config.test_arr_file_path, mmap_mode="r"),
+                    config.preprocessor_obj_file_path)
+
+        start = time.perf_counter()
+        result = transformation.initiate_data_transformation(train_data_path, test_data_path, features)
+        cache.put(key, "transformation",
+                  [config.preprocessor_obj_file_path, config.train_arr_file_path, config.test_arr_file_path],
+                  seconds=time.perf_counter() - start)
+        return result
+
+    def run_fallback(self, cache: StageCache, train_data_path: str, test_data_path: str, features: list):
+        """
+        Preprocessor and model on the water-property channels alone, written
+        next to the main ones with the fallback_ prefix
+
+        Readings that carry only those channels (the dashboard form, older
+        clients) are scored with it instead of imputing the other selected
+        features. Like the form's range check, it takes water-property
+        units. Returns its accuracy, or None when the fallback could not
+        be trained.
+        """
+        default = DataTransformationConfig()
+        config = DataTransformationConfig(
+            preprocessor_obj_file_path=_fallback_path(default.preprocessor_obj_file_path),
+            train_arr_file_path=_fallback_path(default.train_arr_file_path),
+            test_arr_file_path=_fallback_path(default.test_arr_file_path),
+            water_property_inputs=True,
+        )
+        trainer = ModelTrainer()
+        trainer_config = trainer.model_trainer_config
+        trainer_config.trained_model_file_path = _fallback_path(trainer_config.trained_model_file_path)
+        trainer_config.lite_model_file_path = _fallback_path(trainer_config.lite_model_file_path)
+        outputs = [config.preprocessor_obj_file_path, config.train_arr_file_path, config.test_arr_file_path,
+                   trainer_config.trained_model_file_path, trainer_config.lite_model_file_path]
+
+        channels = list(WATER_PROPERTY_RANGES)
+        try:
+            train_arr, test_arr, preprocessor_path = self.run_transformation(
+                cache, train_data_path, test_data_path, channels, config
+            )
+            return trainer.initiate_model_trainer(train_arr[:, :-1], train_arr[:, -1],
+                                                  test_arr[:, :-1], test_arr[:, -1],
+                                                  preprocessor_path=preprocessor_path, cache=cache)
+        except Exception as e:
+            logger.warning(f"No fallback model: {e}")
+            # A stale fallback from an earlier run must not be published with this one
+            for path in outputs:
+                if os.path.exists(path):
+                    os.remove(path)
+            return None
+
+    def start_incremental_training(self, batch_paths: list):
+        """
+        Update the trained model with new labeled batches; runs the full
+        pipeline instead when the batches drift from the training data
+
+        Returns:
+            IncrementalTrainingReport
+        """
+        try:
+            logger.info(f"Incremental training started on {len(batch_paths)} batch(es)")
+            report = IncrementalTrainer().initiate_incremental_training(batch_paths)
+            logger.info(f"Incremental training finished: mode={report.mode}, published={report.published}, "
+                        f"version={report.model_version}")
+            return report
+
+        except Exception as e:
+            logger.error("Error in incremental training")
+            raise CustomException(e, sys)
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the water sensor fault model")
+    parser.add_argument("--streaming", action="store_true", help="stream the wafer dumps chunk by chunk")
+    parser.add_argument("--no-cache", action="store_true", help="run every stage even if its inputs are unchanged")
+    parser.add_argument("--incremental", nargs="+", metavar="BATCH",
+                        help="update the current model with these labeled batch files instead of a full run")
+    args = parser.parse_args()
+
+    configure_logging()
     pipeline = TrainingPipeline()
-    pipeline.start_training()
+    if args.incremental:
+        pipeline.start_incremental_training(args.incremental)
+    else:
+        pipeline.start_training(streaming=args.streaming, use_cache=not args.no_cache)
@@ -0,0 +1,238 @@
+"""
+Batch evaluator for decision trees and tree ensembles on packed node arrays.
+
+sklearn predicts an ensemble one estimator at a time through Python; here
+every (row, tree) pair is walked at once. Nodes of all trees live in flat
+arrays (the packing of model_export.pack_trees, renumbered so siblings
+are adjacent): each round of gather/compare/add moves all pairs one level
+down, and once pairs start reaching leaves they drop out of later rounds.
+
+This is a small-batch optimisation: it removes sklearn's per-estimator
+Python overhead, which dominates for a few rows. For large batches of
+random forest or gradient boosting models, sklearn's compiled per-tree
+walk is faster (see benchmarks/bench_trees.py), so PredictPipeline only
+uses the evaluator up to TREE_EVALUATOR_MAX_ROWS rows. Batches are
+evaluated in chunk_rows pieces to bound the (rows, trees) scratch arrays.
+
+Outputs are bit-for-bit those of the sklearn estimator:
+  * features are compared in float32 against thresholds rounded down to
+    float32, which is exactly sklearn's float32 <= float64 test;
+  * each node stores the contribution sklearn computes from that leaf
+    (normalised class fractions, learning_rate * value, SAMME.R terms,
+    SAMME votes), and contributions are added tree by tree in estimator
+    order, like the sklearn loops.
+Only NumPy is imported, so LiteModel uses the same evaluator.
+"""
+import sys
+
+import numpy as np
+
+from src.exception import CustomException
+
+TREE_MODEL_TYPES = ("decision_tree", "random_forest", "gradient_boosting", "adaboost")
+
+
+def labels_from_decision(decision: np.ndarray, classes: np.ndarray, model_type: str) -> np.ndarray:
+    """Turn decision values into class labels the way the matching sklearn estimator does"""
+    if decision.ndim == 1:
+        # Binary decision functions: positive means the second class
+        encoded = (decision > 0).astype(int)
+    elif model_type == "gradient_boosting" and decision.shape[1] == 1:
+        # Binomial deviance: compare expit(raw) with its complement
+        p = 1.0 / (1.0 + np.exp(-decision[:, 0]))
+        encoded = (p > 1.0 - p).astype(int)
+    else:
+        encoded = np.argmax(decision, axis=1)
+    return classes.take(encoded)
+
+
+def _sibling_layout(left: np.ndarray, right: np.ndarray, offsets: np.ndarray):
+    """
+    Renumber packed nodes breadth-first so both children of a node are adjacent.
+
+    Returns (order, first_child, depth): order[i] is the packed index of
+    evaluator node i, first_child[i] its left child (the right one is
+    first_child[i] + 1; a leaf points to itself) and depth[i] its depth.
+    Roots become nodes 0..n_trees-1.
+    """
+    n_trees = offsets.size - 1
+    new_id = np.empty(left.size, dtype=np.intp)
+    depth = np.empty(left.size, dtype=np.intp)
+    frontier = offsets[:-1]
+    new_id[frontier] = np.arange(n_trees)
+    depth[frontier] = 0
+    next_id, level = n_trees, 0
+    while frontier.size:
+        inner = frontier[left[frontier] >= 0]
+        first = next_id + 2 * np.arange(inner.size)
+        new_id[left[inner]], new_id[right[inner]] = first, first + 1
+        depth[left[inner]] = depth[right[inner]] = level + 1
+        next_id += 2 * inner.size
+        frontier = np.concatenate([left[inner], right[inner]])
+        level += 1
+
+    order = np.empty(left.size, dtype=np.intp)
+    order[new_id] = np.arange(left.size)
+    first_child = np.arange(left.size, dtype=np.intp)
+    inner_old = np.flatnonzero(left >= 0)
+    first_child[new_id[inner_old]] = new_id[left[inner_old]]
+    return order, first_child, depth[order]
+
+
+class TreeEnsembleEvaluator:
+    """
+    Evaluate a packed tree model for whole batches.
+
+    Args:
+        meta: model description from model_export.export_model ("type", ...)
+        arrays: packed node arrays (left, right, feature, threshold, value,
+                offsets, classes, plus estimator_weights / init_raw)
+        chunk_rows: rows evaluated at once; bounds the (rows, trees) scratch arrays
+    """
+
+    def __init__(self, meta: dict, arrays: dict, chunk_rows: int = 2048):
+        try:
+            self.model_type = meta["type"]
+            if self.model_type not in TREE_MODEL_TYPES:
+                raise ValueError(f"{self.model_type!r} is not a tree model")
+            self.classes_ = arrays["classes"]
+            self.chunk_rows = chunk_rows
+
+            left, right = arrays["left"], arrays["right"]
+            self.n_trees = arrays["offsets"].size - 1
+            order, first_child, depth = _sibling_layout(left, right, arrays["offsets"])
+            is_leaf = left[order] < 0
+
+            # Leaves keep first_child == themselves and an infinite threshold, so extra rounds are no-ops
+            self.first_child = first_child
+            self.feature = np.where(is_leaf, 0, arrays["feature"][order]).astype(np.intp)
+            # x32 <= t (in float64) holds exactly when x32 <= the largest float32 not above t
+            threshold = arrays["threshold"][order]
+            threshold32 = threshold.astype(np.float32)
+            above = threshold32.astype(np.float64) > threshold
+            threshold32[above] = np.nextafter(threshold32[above], np.float32(-np.inf))
+            threshold32[is_leaf] = np.inf
+            self.threshold = threshold32
+            self.is_leaf = is_leaf
+            # Rounds every pair needs, and the round from which some pairs may be done
+            self.max_depth = int(depth.max(initial=0))
+            self.min_leaf_depth = int(depth[is_leaf].min(initial=0))
+
+            contrib, self.init, self.scale = self._contributions(meta, arrays)
+            self.contrib = contrib[order]
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _contributions(self, meta: dict, arrays: dict):
+        """Per-node values summed over trees, the starting value and the final divisor"""
+        value = arrays["value"]
+        n_classes = self.classes_.size
+
+        def fractions():
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            return value / normalizer
+
+        if self.model_type == "decision_tree":
+            return value, None, None
+        if self.model_type == "random_forest":
+            return fractions(), None, float(self.n_trees)
+        if self.model_type == "gradient_boosting":
+            return meta["learning_rate"] * value[:, :1], arrays["init_raw"], None
+
+        # AdaBoost
+        weights = arrays["estimator_weights"]
+        if meta["algorithm"] == "SAMME.R":
+            proba = fractions()
+            np.clip(proba, np.finfo(proba.dtype).eps, None, out=proba)
+            log_proba = np.log(proba)
+            contrib = (n_classes - 1) * (log_proba - (1.0 / n_classes) * log_proba.sum(axis=1)[:, np.newaxis])
+        else:
+            # Each node votes for its class with its tree's weight
+            tree_of_node = np.repeat(np.arange(self.n_trees), np.diff(arrays["offsets"]))
+            votes = np.argmax(value, axis=1)
+            contrib = (votes[:, np.newaxis] == np.arange(n_classes)) * weights[tree_of_node][:, np.newaxis]
+        return contrib, None, weights.sum()
+
+    def apply(self, X32: np.ndarray) -> np.ndarray:
+        """Leaf node (in evaluator order) of every (row, tree) pair, shape (n_rows, n_trees)"""
+        n_rows, n_features = X32.shape
+        # NaN takes the right branch in sklearn (NaN <= t is false); +inf does the same here
+        flat = np.where(np.isnan(X32), np.float32(np.inf), X32).ravel()
+        node = np.tile(np.arange(self.n_trees, dtype=np.intp), n_rows)
+        row_base = np.repeat(np.arange(n_rows, dtype=np.intp) * n_features, self.n_trees)
+        # Shallow levels: no pair can be on a leaf yet
+        for _ in range(self.min_leaf_depth):
+            node = self.first_child[node] + (flat[row_base + self.feature[node]] > self.threshold[node])
+        if self.max_depth == self.min_leaf_depth:
+            return node.reshape(n_rows, self.n_trees)
+
+        # Deeper levels: pairs that reached a leaf drop out of the next round
+        leaves = node
+        pos = np.flatnonzero(~self.is_leaf[node])
+        node, row_base = node[pos], row_base[pos]
+        while node.size:
+            node = self.first_child[node] + (flat[row_base + self.feature[node]] > self.threshold[node])
+            done = self.is_leaf[node]
+            if done.any():
+                leaves[pos[done]] = node[done]
+                inner = ~done
+                node, pos, row_base = node[inner], pos[inner], row_base[inner]
+        return leaves.reshape(n_rows, self.n_trees)
+
+    def _decision_chunk(self, X32: np.ndarray) -> np.ndarray:
+        leaves = self.apply(X32)
+        if self.model_type == "decision_tree":
+            return self.contrib[leaves[:, 0]]
+
+        values = self.contrib[leaves]                 # (n_rows, n_trees, n_outputs)
+        if self.model_type == "gradient_boosting":
+            # estimators_ is (n_stages, K): tree t feeds raw column t % K, after the init score
+            k_outputs = self.init.size
+            values = values[:, :, 0].reshape(len(X32), -1, k_outputs)
+            values = np.concatenate([np.broadcast_to(self.init, (len(X32), 1, k_outputs)), values], axis=1)
+            # accumulate adds strictly in order, like sklearn's per-stage loop
+            return np.add.accumulate(values, axis=1)[:, -1]
+
+        acc = np.add.accumulate(values, axis=1)[:, -1]
+        acc /= self.scale
+        if self.model_type == "adaboost" and self.classes_.size == 2:
+            acc[:, 0] *= -1
+            return acc.sum(axis=1)
+        return acc
+
+    def decision_function(self, X) -> np.ndarray:
+        """Decision values in the layout of the sklearn estimator (before class selection)"""
+        try:
+            X32 = np.ascontiguousarray(X, dtype=np.float32)
+            n_rows = X32.shape[0]
+            if n_rows <= self.chunk_rows:
+                return self._decision_chunk(X32)
+            return np.concatenate([self._decision_chunk(X32[s:s + self.chunk_rows])
+                                   for s in range(0, n_rows, self.chunk_rows)])
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def predict(self, X) -> np.ndarray:
+        return labels_from_decision(self.decision_function(X), self.classes_, self.model_type)
+
+
+def build_tree_evaluator(model, **kwargs):
+    """TreeEnsembleEvaluator for a fitted sklearn tree model, or None for other estimators"""
+    from src.pipelines.model_export import export_model
+
+    try:
+        meta, arrays = export_model(model)
+    except ValueError:
+        return None
+    if meta["type"] not in TREE_MODEL_TYPES:
+        return None
+    return TreeEnsembleEvaluator(meta, arrays, **kwargs)
+
+
+def load_tree_evaluator(file_path: str):
+    """Registry loader: unpickle a model and pack it, or None when it is not a tree model"""
+    from src.utils import load_object
+
+    return build_tree_evaluator(load_object(file_path))
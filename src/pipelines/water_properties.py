@@ -0,0 +1,22 @@
+# src/pipelines/water_properties.py
+# Target water-property range (ymin, ymax) per wafer channel
+WATER_PROPERTY_RANGES = {
+    "Sensor-1": (0.0, 14.0),     # pH
+    "Sensor-2": (0.0, 100.0),    # Turbidity
+    "Sensor-3": (0.0, 2000.0),   # Conductivity
+    "Sensor-4": (0.0, 50.0),     # Dissolved Oxygen
+    "Sensor-5": (0.0, 10.0),     # Chlorine Level
+    "Sensor-6": (0.0, 50.0),     # Nitrate
+    "Sensor-7": (0.0, 14.0),     # Hardness
+    "Sensor-8": (0.0, 500.0),    # Temperature
+    "Sensor-9": (0.0, 200.0),    # Iron Content
+    "Sensor-10": (0.0, 10.0),    # BOD
+}
+
+
+def build_calibration_params(xmin: dict, xmax: dict) -> dict:
+    """Combine observed wafer ranges with the target water-property ranges"""
+    return {
+        ch: {"xmin": xmin[ch], "xmax": xmax[ch], "ymin": ymin, "ymax": ymax}
+        for ch, (ymin, ymax) in WATER_PROPERTY_RANGES.items()
+    }
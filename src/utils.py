@@ -2,11 +2,11 @@
 
 import os
 import sys
+import time
 import pickle
+import tracemalloc
 import numpy as np
 import pandas as pd
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
-import dill
 #import yaml
 #from box import ConfigBox
 from pathlib import Path
@@ -58,6 +58,9 @@ def save_object(file_path, obj):
     """
     Save object to a pickle file
     
+    The pickle is written to a temporary file in the same directory and
+    renamed over file_path, so a reader never sees a half-written file.
+
     Args:
         file_path: Path where object will be saved
         obj: Object to be saved
@@ -65,10 +68,12 @@ def save_object(file_path, obj):
     try:
         dir_path = os.path.dirname(file_path)
         
-        os.makedirs(dir_path, exist_ok=True)
+        os.makedirs(dir_path or ".", exist_ok=True)
 
-        with open(file_path, "wb") as file_obj:
+        tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file_obj:
             pickle.dump(obj, file_obj)
+        os.replace(tmp_path, file_path)
         
         logger.info(f"Object saved at {file_path}")
 
@@ -110,58 +115,350 @@ def save_numpy_array_data(file_path: str, array: np.array):
         raise CustomException(e, sys)
 
 
-def load_numpy_array_data(file_path: str) -> np.array:
+def load_numpy_array_data(file_path: str, mmap_mode: str = None) -> np.array:
     """
     load numpy array data from file
     Args:
         file_path: str location of file to load
+        mmap_mode: "r" (or "r+", "c") to map the file instead of reading it into memory
     Returns:
-        np.array data loaded
+        np.array data loaded (an np.memmap when mmap_mode is set)
     """
     try:
-        with open(file_path, "rb") as file_obj:
-            return np.load(file_obj)
+        return np.load(file_path, mmap_mode=mmap_mode)
     except Exception as e:
         raise CustomException(e, sys)
 
 
-def evaluate_models(X_train, y_train, X_test, y_test, models, param):
+def save_numpy_column_blocks(file_path: str, blocks: list, dtype=np.float64) -> np.memmap:
     """
-    Evaluate multiple models and return their scores
-    
+    Write column blocks side by side into one Fortran-order .npy file and map it read-only
+
+    Each block (2-D, or 1-D for a single column) is copied once, straight into
+    the mapped file, instead of being joined in memory with np.c_ first. In
+    Fortran order every column range is contiguous, so arr[:, :-1] and
+    arr[:, -1] are views that need no copy. The file is written under a
+    temporary name and swapped in with os.replace, so processes that still
+    map an older version keep reading it.
+
     Args:
-        X_train, y_train: Training data
-        X_test, y_test: Testing data
-        models: Dictionary of models to evaluate
-        param: Parameters for hyperparameter tuning
-        
+        file_path: .npy file to write
+        blocks: arrays with the same number of rows
+        dtype: dtype of the stored matrix
     Returns:
-        Dictionary with model scores
+        the file opened with mmap_mode="r"
     """
     try:
-        report = {}
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        blocks = [np.asarray(b).reshape(len(b), -1) for b in blocks]
+        n_rows = blocks[0].shape[0]
+        if any(b.shape[0] != n_rows for b in blocks):
+            raise ValueError("All column blocks must have the same number of rows")
+
+        tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        out = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=dtype, shape=(n_rows, sum(b.shape[1] for b in blocks)), fortran_order=True
+        )
+        col = 0
+        for b in blocks:
+            out[:, col:col + b.shape[1]] = b
+            col += b.shape[1]
+        out.flush()
+        del out
+        os.replace(tmp_path, file_path)
+        return load_numpy_array_data(file_path, mmap_mode="r")
 
-        for i in range(len(list(models))):
-            model = list(models.values())[i]
-            para = param[list(models.keys())[i]]
+    except Exception as e:
+        raise CustomException(e, sys)
 
-            # GridSearchCV for hyperparameter tuning
-            from sklearn.model_selection import GridSearchCV
-            gs = GridSearchCV(model, para, cv=3)
-            gs.fit(X_train, y_train)
 
-            model.set_params(**gs.best_params_)
-            model.fit(X_train, y_train)
+COLUMNAR_FORMATS = (".parquet", ".feather")
 
-            # Model prediction
-            y_train_pred = model.predict(X_train)
-            y_test_pred = model.predict(X_test)
 
-            train_model_score = accuracy_score(y_train, y_train_pred)
-            test_model_score = accuracy_score(y_test, y_test_pred)
+def _columnar_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def save_dataframe(file_path: str, df: pd.DataFrame, export_csv: bool = False) -> str:
+    """
+    Save a DataFrame in a typed columnar format (Parquet/Feather, by extension)
 
-            report[list(models.keys())[i]] = test_model_score
+    Args:
+        file_path: target path ending in .parquet or .feather (.csv is written as is)
+        df: DataFrame to save
+        export_csv: also write a human-readable .csv next to it
+
+    Returns:
+        path actually written; falls back to .csv when pyarrow is not installed
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        stem, ext = os.path.splitext(file_path)
+        csv_path = stem + ".csv"
+
+        if ext in COLUMNAR_FORMATS and not _columnar_available():
+            logger.warning(f"pyarrow not installed, writing {csv_path} instead of {file_path}")
+            file_path, ext, export_csv = csv_path, ".csv", False
+
+        if ext == ".parquet":
+            df.to_parquet(file_path, index=False)
+        elif ext == ".feather":
+            df.reset_index(drop=True).to_feather(file_path)
+        else:
+            df.to_csv(file_path, index=False, header=True)
+
+        if export_csv and ext != ".csv":
+            df.to_csv(csv_path, index=False, header=True)
+        return file_path
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def load_dataframe(file_path: str, columns: list = None) -> pd.DataFrame:
+    """
+    Load a DataFrame saved by save_dataframe, optionally only some columns
+
+    Columnar files read just the requested columns from disk. If the
+    columnar file does not exist but a .csv with the same stem does
+    (artifacts from older runs), the CSV is read instead.
+    """
+    try:
+        stem, ext = os.path.splitext(file_path)
+        if ext in COLUMNAR_FORMATS and not os.path.exists(file_path) and os.path.exists(stem + ".csv"):
+            file_path, ext = stem + ".csv", ".csv"
 
+        if ext == ".parquet":
+            return pd.read_parquet(file_path, columns=columns)
+        if ext == ".feather":
+            return pd.read_feather(file_path, columns=columns)
+        return pd.read_csv(file_path, usecols=columns)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+class ChunkedDataFrameWriter:
+    """Appends DataFrame chunks to one file (Parquet row groups, or CSV when pyarrow is missing)"""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        if file_path.endswith(".parquet") and not _columnar_available():
+            self.file_path = os.path.splitext(file_path)[0] + ".csv"
+        os.makedirs(os.path.dirname(self.file_path) or ".", exist_ok=True)
+        self.rows = 0
+        self._writer = None
+        self._schema = None
+
+    def write(self, chunk: pd.DataFrame):
+        if chunk.empty:
+            return
+        if self.file_path.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._writer is None:
+                self._schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                self._writer = pq.ParquetWriter(self.file_path, self._schema)
+            self._writer.write_table(pa.Table.from_pandas(chunk, schema=self._schema, preserve_index=False))
+        else:
+            chunk.to_csv(self.file_path, mode="a" if self.rows else "w", header=not self.rows, index=False)
+        self.rows += len(chunk)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def compare_artifact_formats(columnar_path: str, csv_path: str, columns: list = None) -> dict:
+    """Size and read-time of a columnar artifact against its CSV export"""
+    try:
+        start = time.perf_counter()
+        pd.read_csv(csv_path)
+        csv_read_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        load_dataframe(columnar_path)
+        columnar_read_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        load_dataframe(columnar_path, columns=columns)
+        columnar_subset_read_s = time.perf_counter() - start
+
+        csv_bytes, columnar_bytes = os.path.getsize(csv_path), os.path.getsize(columnar_path)
+        return {
+            "csv_bytes": csv_bytes,
+            "columnar_bytes": columnar_bytes,
+            "size_ratio": csv_bytes / columnar_bytes,
+            "csv_read_s": csv_read_s,
+            "columnar_read_s": columnar_read_s,
+            "columnar_subset_read_s": columnar_subset_read_s,
+            "read_speedup": csv_read_s / columnar_read_s,
+            "subset_read_speedup": csv_read_s / columnar_subset_read_s,
+        }
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def _build_search(model, para, n_samples, cv_n_jobs=None, search_mode="grid", search_budget=None, halving_factor=3):
+    """
+    Build the hyperparameter search for one candidate.
+
+    search_mode="grid" is an exhaustive GridSearchCV. search_mode="halving"
+    runs successive halving: every configuration starts on a small subsample
+    and only the best 1/halving_factor move on to factor-times more samples.
+    search_budget caps the total sample-fits (samples x fits) per model by
+    choosing the starting subsample size.
+    """
+    from sklearn.model_selection import GridSearchCV, ParameterGrid
+
+    cv = 3
+    if search_mode == "grid":
+        return GridSearchCV(model, para, cv=cv, n_jobs=cv_n_jobs)
+    if search_mode != "halving":
+        raise ValueError(f"Unknown search_mode: {search_mode}")
+
+    from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+    from sklearn.model_selection import HalvingGridSearchCV
+
+    min_resources = "exhaust"
+    if search_budget is not None:
+        # cost ~= cv * n_candidates * min_resources * n_iterations
+        n_candidates = len(ParameterGrid(para))
+        n_iterations = int(np.ceil(np.log(max(n_candidates, 1)) / np.log(halving_factor))) + 1
+        min_resources = int(search_budget // (cv * n_candidates * n_iterations))
+        min_resources = int(np.clip(min_resources, 4 * cv, n_samples))
+
+    return HalvingGridSearchCV(
+        model, para, cv=cv, factor=halving_factor, resource="n_samples",
+        min_resources=min_resources, n_jobs=cv_n_jobs, random_state=42
+    )
+
+
+def _fit_candidate(name, model, para, X_train, y_train, X_test, y_test, cv_n_jobs=None,
+                   search_mode="grid", search_budget=None, halving_factor=3):
+    """
+    Search hyperparameters for one candidate model and score its best estimator.
+
+    Runs inside a pool worker; peak memory is traced with tracemalloc, which
+    also covers the CV folds since joblib runs nested jobs in threads.
+    """
+    from sklearn.metrics import accuracy_score
+
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    gs = _build_search(model, para, len(y_train), cv_n_jobs, search_mode, search_budget, halving_factor)
+    gs.fit(X_train, y_train)
+
+    # refit=True already trained best_estimator_ on the full training set
+    best_model = gs.best_estimator_
+    train_model_score = accuracy_score(y_train, best_model.predict(X_train))
+    test_model_score = accuracy_score(y_test, best_model.predict(X_test))
+
+    wall_time = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Compute spent, in sample-fits (samples used x number of fits)
+    if hasattr(gs, "n_resources_"):
+        n_candidates = int(gs.n_candidates_[0])
+        budget_used = int(gs.n_splits_ * sum(c * r for c, r in zip(gs.n_candidates_, gs.n_resources_)))
+    else:
+        n_candidates = len(gs.cv_results_["params"])
+        budget_used = int(gs.n_splits_ * n_candidates * len(y_train))
+
+    return name, {
+        "model": best_model,
+        "best_params": gs.best_params_,
+        "train_score": train_model_score,
+        "test_score": test_model_score,
+        "wall_time_s": wall_time,
+        "peak_memory_mb": peak_memory / (1024 * 1024),
+        "n_candidates": n_candidates,
+        "budget_used": budget_used,
+    }
+
+
+def _search_cache_key(name, model, para, data_hash, search_mode, search_budget, halving_factor) -> str:
+    """Stage-cache key of one candidate's search: estimator params, grid, search settings, data and code"""
+    import joblib
+    from src.pipelines.stage_cache import fingerprint, code_version
+
+    return fingerprint(
+        "model_search", model=name, estimator=type(model).__name__, params=joblib.hash(model.get_params()),
+        grid=para, search_mode=search_mode, search_budget=search_budget, halving_factor=halving_factor,
+        data=data_hash, code=code_version(sys.modules[__name__])
+    )
+
+
+def evaluate_models(X_train, y_train, X_test, y_test, models, param, n_jobs=1, cv_n_jobs=None,
+                    search_mode="grid", search_budget=None, halving_factor=3, cache=None):
+    """
+    Grid-search and score multiple models, candidates in parallel
+
+    Args:
+        X_train, y_train: Training data
+        X_test, y_test: Testing data
+            (np.memmap views, as DataTransformation returns them, reach the
+            pool workers as a reference to the mapped file instead of a copy)
+        models: Dictionary of models to evaluate
+        param: Parameters for hyperparameter tuning
+        n_jobs: Number of worker processes across candidate models (-1 = all cores)
+        cv_n_jobs: Number of parallel CV fits inside each grid search
+        search_mode: "grid" (exhaustive) or "halving" (successive halving)
+        search_budget: Max sample-fits per model in halving mode (None = let sklearn decide)
+        halving_factor: Fraction of candidates kept / growth of the subsample per halving round
+        cache: optional StageCache; a candidate whose data, estimator, grid and search
+            settings are unchanged is loaded from it instead of searched again
+
+    Returns:
+        Dictionary keyed by model name with the fitted best estimator ("model"),
+        best_params, train_score, test_score, wall_time_s, peak_memory_mb,
+        n_candidates and budget_used (sample-fits); cached results also have cached=True
+    """
+    try:
+        import joblib
+        from joblib import Parallel, delayed
+
+        report, keys = {}, {}
+        if cache is not None:
+            data_hash = joblib.hash([X_train, y_train, X_test, y_test])
+            for name, model in models.items():
+                keys[name] = _search_cache_key(name, model, param[name], data_hash,
+                                               search_mode, search_budget, halving_factor)
+                if cache.get(keys[name]) is not None:
+                    report[name] = {**cache.load_result(keys[name]), "cached": True}
+            if report:
+                logger.info(f"Search results unchanged for {list(report)}; fitting {len(models) - len(report)} model(s)")
+
+        pending = {name: model for name, model in models.items() if name not in report}
+        results = Parallel(n_jobs=n_jobs, backend="loky")(
+            delayed(_fit_candidate)(
+                name, model, param[name], X_train, y_train, X_test, y_test, cv_n_jobs,
+                search_mode, search_budget, halving_factor
+            )
+            for name, model in pending.items()
+        )
+        for name, result in results:
+            if cache is not None:
+                cache.put(keys[name], "model_search", result=result, seconds=result["wall_time_s"])
+            report[name] = result
+
+        report = {name: report[name] for name in models}
+        for name, result in report.items():
+            logger.info(
+                f"{name}: test={result['test_score']:.4f} train={result['train_score']:.4f} "
+                f"params={result['best_params']} time={result['wall_time_s']:.2f}s "
+                f"peak_mem={result['peak_memory_mb']:.1f}MB "
+                f"candidates={result['n_candidates']} budget_used={result['budget_used']} sample-fits"
+                + (" (cached)" if result.get("cached") else "")
+            )
         return report
 
     except Exception as e:
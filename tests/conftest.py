@@ -0,0 +1,51 @@
+"""Small fitted preprocessing pipeline shared by the parity tests"""
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.components.data_transformation import DataTransformation
+from src.pipelines.water_properties import WATER_PROPERTY_RANGES, build_calibration_params
+
+# Water-property channels plus one uncalibrated channel (selected features may include those)
+CHANNELS = list(WATER_PROPERTY_RANGES) + ["Sensor-50"]
+
+
+def make_readings(n_rows: int, seed: int, missing_rate: float = 0.1) -> pd.DataFrame:
+    """Wafer-unit readings with some missing cells"""
+    rng = np.random.default_rng(seed)
+    values = rng.normal(loc=np.arange(len(CHANNELS)) * 10.0, scale=5.0, size=(n_rows, len(CHANNELS)))
+    values[rng.random(values.shape) < missing_rate] = np.nan
+    return pd.DataFrame(values, columns=CHANNELS)
+
+
+@pytest.fixture(scope="session")
+def train_df() -> pd.DataFrame:
+    return make_readings(300, seed=0)
+
+
+@pytest.fixture(scope="session")
+def test_df() -> pd.DataFrame:
+    return make_readings(200, seed=1, missing_rate=0.3)
+
+
+@pytest.fixture(scope="session")
+def labels(train_df) -> np.ndarray:
+    """Labels in the dataset's encoding (1 good, -1 bad) from a rule on two channels"""
+    filled = train_df.fillna(train_df.median())
+    return np.where(filled["Sensor-1"] + filled["Sensor-3"] > 20.0, 1, -1)
+
+
+@pytest.fixture(scope="session")
+def pipeline(train_df, tmp_path_factory):
+    """The rescale -> KNN imputer -> RobustScaler pipeline, fitted like DataTransformation does"""
+    params_path = tmp_path_factory.mktemp("calibration") / "calibration_params.pkl"
+    joblib.dump(build_calibration_params(train_df.min().to_dict(), train_df.max().to_dict()), params_path)
+    preprocessor = DataTransformation().get_data_transformer_object()
+    preprocessor.set_params(rescale__param_path=str(params_path))
+    return preprocessor.fit(train_df)
+
+
+@pytest.fixture(scope="session")
+def X_train(pipeline, train_df) -> np.ndarray:
+    return pipeline.transform(train_df)
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from src.exception import CustomException
+from src.pipelines.compiled_preprocessor import CompiledPreprocessor, check_parity, compile_preprocessor
+
+
+def test_pipeline_is_compilable(pipeline):
+    assert CompiledPreprocessor.is_compilable(pipeline)
+    assert isinstance(compile_preprocessor(pipeline), CompiledPreprocessor)
+
+
+@pytest.mark.parametrize("data", ["train_df", "test_df"])
+def test_matches_sklearn_bit_for_bit(pipeline, data, request):
+    X = request.getfixturevalue(data)
+    expected = pipeline.transform(X)
+    actual = CompiledPreprocessor(pipeline).transform(X)
+    assert actual.shape == expected.shape
+    assert np.array_equal(actual, expected, equal_nan=True)
+    assert check_parity(pipeline, CompiledPreprocessor(pipeline), X)
+
+
+def test_single_rows_and_reordered_columns(pipeline, test_df):
+    compiled = CompiledPreprocessor(pipeline)
+    for i in range(5):
+        row = test_df.iloc[[i]]
+        assert np.array_equal(compiled.transform(row), pipeline.transform(row), equal_nan=True)
+    shuffled = test_df[test_df.columns[::-1]]
+    assert np.array_equal(compiled.transform(shuffled), pipeline.transform(test_df), equal_nan=True)
+
+
+def test_check_parity_raises_on_mismatch(pipeline, test_df):
+    compiled = CompiledPreprocessor(pipeline)
+    compiled.center_ = compiled.center_ + 1.0
+    with pytest.raises(CustomException):
+        check_parity(pipeline, compiled, test_df)
@@ -0,0 +1,40 @@
+import os
+
+import joblib
+import numpy as np
+
+from src.components.data_transformation import DataTransformation, DataTransformationConfig
+from src.pipelines.calibration import RescaleToWaterProperty
+from src.pipelines.water_properties import WATER_PROPERTY_RANGES, build_calibration_params
+from src.utils import load_object
+
+CHANNELS = list(WATER_PROPERTY_RANGES)
+
+
+def test_water_property_inputs_match_calibrated_pipeline(train_df, test_df, labels, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("artifacts")
+    joblib.dump(build_calibration_params(train_df.min().to_dict(), train_df.max().to_dict()),
+                os.path.join("artifacts", "calibration_params.pkl"))
+    train_df.assign(**{"Good/Bad": labels}).to_csv("train.csv", index=False)
+    test_df.assign(**{"Good/Bad": -1}).to_csv("test.csv", index=False)
+
+    transformation = DataTransformation()
+    transformation.initiate_data_transformation("train.csv", "test.csv", CHANNELS)
+    fallback = DataTransformation()
+    fallback.data_transformation_config = DataTransformationConfig(
+        preprocessor_obj_file_path=os.path.join("artifacts", "fallback_preprocessor.pkl"),
+        train_arr_file_path=os.path.join("artifacts", "fallback_train_arr.npy"),
+        test_arr_file_path=os.path.join("artifacts", "fallback_test_arr.npy"),
+        water_property_inputs=True,
+    )
+    fallback.initiate_data_transformation("train.csv", "test.csv", CHANNELS)
+
+    preprocessor = load_object(os.path.join("artifacts", "preprocessor.pkl"))
+    fallback_preprocessor = load_object(os.path.join("artifacts", "fallback_preprocessor.pkl"))
+    assert fallback_preprocessor.named_steps["rescale"].params_ == {}
+
+    # Readings in water-property units score like the wafer-unit readings they were calibrated from
+    calibrated = RescaleToWaterProperty().fit(test_df[CHANNELS]).transform(test_df[CHANNELS])
+    np.testing.assert_array_equal(fallback_preprocessor.transform(calibrated),
+                                  preprocessor.transform(test_df[CHANNELS]))
@@ -0,0 +1,30 @@
+import os
+
+import pandas as pd
+
+from src.components.data_ingestion import DataIngestionConfig
+from src.components.incremental_trainer import IncrementalTrainer
+from src.pipelines.model_registry import file_sha256
+from src.utils import load_dataframe
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_full_retrain_ingests_each_wafer_once(tmp_path, monkeypatch):
+    config = DataIngestionConfig()
+    source = pd.read_csv(os.path.join(REPO_ROOT, config.source_data_path))
+    monkeypatch.chdir(tmp_path)
+    source.to_csv(config.source_data_path, index=False)
+    batch = source.head(20).assign(**{config.split_key_column: [f"Wafer-batch-{i}" for i in range(20)]})
+    batch.to_csv("batch.csv", index=False)
+
+    trainer = IncrementalTrainer()
+    state = trainer.load_state()
+    # As recorded after a full run: the version's batches include the run's own source
+    state["batches"] = {file_sha256(path): path for path in (config.source_data_path, "batch.csv")}
+    trainer.run_full_retrain(state)
+
+    ids = pd.concat([load_dataframe(path, columns=[config.split_key_column])[config.split_key_column]
+                     for path in (config.train_data_path, config.test_data_path)])
+    assert ids.is_unique
+    assert len(ids) == len(source) + len(batch)
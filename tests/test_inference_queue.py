@@ -0,0 +1,52 @@
+import http.server
+import socket
+import threading
+
+import pytest
+
+from src.pipelines import inference_queue
+from src.pipelines.inference_queue import callback_opener, resolve_callback_url
+
+
+@pytest.fixture
+def callback_server():
+    """Local HTTP server recording the Host header of each POST"""
+    hosts = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            hosts.append(self.headers["Host"])
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_port, hosts
+    server.shutdown()
+
+
+def test_opener_connects_to_the_validated_address(callback_server, monkeypatch):
+    port, hosts = callback_server
+    # Environment proxies must not be used: this one does not exist
+    monkeypatch.setenv("http_proxy", "http://127.0.0.1:1")
+    # The host name does not resolve at all; only the pinned address is contacted
+    with callback_opener("127.0.0.1").open(f"http://callback.invalid:{port}/cb", data=b"{}", timeout=5) as response:
+        assert response.status == 204
+    assert hosts == [f"callback.invalid:{port}"]
+
+
+def test_resolve_returns_the_checked_address(monkeypatch):
+    answers = iter([[(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("93.184.216.34", 80))],
+                    [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("169.254.169.254", 80))]])
+    monkeypatch.setattr(inference_queue.socket, "getaddrinfo", lambda *args, **kwargs: next(answers))
+    assert resolve_callback_url("http://rebind.example/cb") == "93.184.216.34"
+    # The same host re-resolving to an internal address at send time is refused
+    with pytest.raises(ValueError, match="non-public"):
+        resolve_callback_url("http://rebind.example/cb")
+
+
+def test_allowed_hosts_resolve_normally():
+    assert resolve_callback_url("http://internal:8000/cb", ("internal",)) is None
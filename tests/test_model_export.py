@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from src.exception import CustomException
+from src.components.model_trainer import ModelTrainer
+from src.pipelines.lite_runtime import LiteModel
+from src.pipelines.model_export import (
+    check_all_model_types, check_lite_parity, export_lite_model, parity_inputs, parity_models
+)
+
+
+@pytest.mark.parametrize("name", list(parity_models()))
+def test_lite_bundle_matches_sklearn(name, pipeline, X_train, labels, test_df, tmp_path):
+    model = parity_models()[name].fit(X_train, labels)
+    lite = LiteModel.load(export_lite_model(pipeline, model, str(tmp_path / "model_lite.npz")))
+
+    expected = model.predict(pipeline.transform(test_df))
+    assert np.array_equal(lite.predict(test_df), expected)
+    assert np.allclose(lite.transform(test_df), pipeline.transform(test_df), rtol=1e-9, atol=1e-12)
+    check_lite_parity(pipeline, model, lite, parity_inputs(pipeline))
+
+
+def test_check_all_model_types(pipeline, X_train, labels, test_df):
+    results = check_all_model_types(pipeline, X_train, labels, test_df)
+    assert set(results) == set(parity_models())
+
+
+def test_trainer_reports_a_parity_failure(pipeline, X_train, labels, tmp_path, monkeypatch):
+    trainer = ModelTrainer()
+    trainer.model_trainer_config.lite_model_file_path = str(tmp_path / "model_lite.npz")
+    model = parity_models()["Decision Tree"].fit(X_train, labels)
+    monkeypatch.setattr(LiteModel, "predict", lambda self, X, preprocessed=False: -model.predict(X))
+    with pytest.raises(CustomException, match="Lite model predictions differ"):
+        trainer.export_lite_model(pipeline, model, X_train)
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from src.pipelines.model_export import parity_models
+from src.pipelines.tree_evaluator import TreeEnsembleEvaluator, build_tree_evaluator
+
+TREE_MODELS = ["Decision Tree", "Random Forest", "Gradient Boosting", "AdaBoost SAMME.R", "AdaBoost SAMME"]
+
+
+def threshold_inputs(model, X: np.ndarray) -> np.ndarray:
+    """Rows whose values sit exactly on split thresholds, where float32/float64 rounding matters"""
+    estimators = np.ravel(getattr(model, "estimators_", [model]))
+    rows = X[:50].copy()
+    for i, tree in enumerate(estimators[:50]):
+        split = tree.tree_.feature >= 0
+        if split.any():
+            node = np.flatnonzero(split)[0]
+            rows[i, tree.tree_.feature[node]] = tree.tree_.threshold[node]
+    return rows
+
+
+@pytest.mark.parametrize("name", TREE_MODELS)
+def test_predictions_match_sklearn(name, pipeline, X_train, labels, test_df):
+    model = parity_models()[name].fit(X_train, labels)
+    evaluator = build_tree_evaluator(model)
+    assert isinstance(evaluator, TreeEnsembleEvaluator)
+
+    X = np.vstack([pipeline.transform(test_df), threshold_inputs(model, X_train)])
+    assert np.array_equal(evaluator.predict(X), model.predict(X))
+    # Batches above chunk_rows are evaluated piece by piece with the same result
+    assert np.array_equal(build_tree_evaluator(model, chunk_rows=7).predict(X), model.predict(X))
+    for i in range(3):
+        assert np.array_equal(evaluator.predict(X[i:i + 1]), model.predict(X[i:i + 1]))
+
+
+def test_gradient_boosting_decision_function_is_exact(pipeline, X_train, labels, test_df):
+    model = parity_models()["Gradient Boosting"].fit(X_train, labels)
+    X = pipeline.transform(test_df)
+    # Binomial raw scores come back as one column; sklearn ravels them
+    assert np.array_equal(build_tree_evaluator(model).decision_function(X).ravel(), model.decision_function(X))
+
+
+def test_non_tree_models_are_not_packed(X_train, labels):
+    assert build_tree_evaluator(parity_models()["Logistic Regression"].fit(X_train, labels)) is None